@@ -0,0 +1,245 @@
+"""
+Performance benchmarks for the analysis, data and database hot paths.
+
+    python benchmark.py run --sizes 10000,100000 --output benchmarks/baseline.json
+    python benchmark.py run --sizes 10000,100000 --output benchmarks/current.json
+    python benchmark.py compare benchmarks/baseline.json benchmarks/current.json
+
+Histories are synthetic (Simulator.simulate_draw), so any size can be measured;
+`--sizes 1000000 --bets 1000000` gives the million-draw / million-bet runs.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+import core.data
+from core.analysis import Simulator, Predictor, Backtester, AnalysisUtils, calculate_omission
+from core.data import DataLoader
+from core.db import Database
+from core.lottery import GameType, get_config
+from core.verify import verify_pending_bets
+
+# --- Synthetic Data ---
+
+def synthetic_history(game_type: GameType, n_draws: int, seed: int = 0) -> pd.DataFrame:
+    """
+    n_draws random draws in the layout of the history CSV, oldest first.
+    Dates are every other day, compressed for very long histories so they stay
+    within the datetime range.
+    """
+    rng = np.random.default_rng(seed)
+    config = get_config(game_type)
+    draws = [Simulator.simulate_draw(game_type, rng) for _ in range(n_draws)]
+    data = {'issue': [str(10000000 + i) for i in range(n_draws)]}
+    reds = np.array([d[0] for d in draws], dtype=np.int64).reshape(n_draws, config.red_count)
+    blues = np.array([d[1] for d in draws], dtype=np.int64).reshape(n_draws, config.blue_count)
+    for j in range(config.red_count):
+        data[f'red{j + 1}'] = reds[:, j]
+    if config.blue_count == 1:
+        data['blue'] = blues[:, 0]
+    else:
+        for j in range(config.blue_count):
+            data[f'blue{j + 1}'] = blues[:, j]
+    offsets = np.arange(n_draws) * 60000 // max(n_draws, 30000)
+    data['date'] = np.datetime_as_string(np.datetime64('2003-02-23') + offsets, unit='D')
+    return pd.DataFrame(data)
+
+def populate_bets(db: Database, game_type: GameType, history_df: pd.DataFrame, n_bets: int, pending_share: float = 0.01, n_users: int = 1000, seed: int = 0):
+    """
+    Bulk-insert n_bets random bets spread over n_users and the drawn issues.
+    A pending_share of them stay pending; the rest are settled.
+    Returns the ids of the pending bets.
+    """
+    rng = np.random.default_rng(seed)
+    config = get_config(game_type)
+    issues = history_df['issue'].to_numpy()
+    n_pending = int(n_bets * pending_share)
+    pending_ids = [f"bench{k:08d}" for k in range(n_pending)]
+    rows = []
+    for chunk_start in range(0, n_bets, 100000):
+        size = min(100000, n_bets - chunk_start)
+        # Random selections without replacement: first k of a random permutation per row
+        red_pool = config.red_range[1] - config.red_range[0] + 1
+        blue_pool = config.blue_range[1] - config.blue_range[0] + 1
+        reds = np.sort(rng.random((size, red_pool)).argsort(axis=1)[:, :config.red_count] + config.red_range[0], axis=1).tolist()
+        blues = np.sort(rng.random((size, blue_pool)).argsort(axis=1)[:, :config.blue_count] + config.blue_range[0], axis=1).tolist()
+        for j in range(size):
+            k = chunk_start + j
+            rows.append((f"bench{k:08d}", f"user{k % n_users}", game_type.value, str(issues[k % len(issues)]),
+                         json.dumps(reds[j]), json.dumps(blues[j]), 'pending' if k < n_pending else 'settled', "",
+                         f"2024-01-01 {k // 3600000 % 24:02d}:{k // 60000 % 60:02d}:{k // 1000 % 60:02d}"))
+    with db.conn:
+        db.conn.executemany('''
+            INSERT INTO bets (id, user_id, game_type, issue, reds, blues, status, note, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+    return pending_ids
+
+# --- Timing ---
+
+def best_of(func, repeat: int = 3, setup=None) -> float:
+    """Fastest of `repeat` runs in seconds; setup (untimed) runs before each."""
+    best = float('inf')
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def _bench_analysis(game_type: GameType, df: pd.DataFrame, repeat: int) -> dict:
+    config = get_config(game_type)
+    return {
+        "calculate_omission": best_of(lambda: calculate_omission(df, config.red_range[1], 'red'), repeat),
+        "analyze_recent_trends": best_of(lambda: AnalysisUtils.analyze_recent_trends(df, game_type, 30), repeat),
+        "composite_predict": best_of(lambda: Predictor.composite_predict(game_type, df, seed=1), repeat),
+        "predict_many_1000": best_of(lambda: Predictor.predict_many(game_type, df, 1000, seed_base=1), repeat),
+        "run_backtest_100x10": best_of(lambda: Backtester.run_backtest(game_type, Predictor.composite_predict, df, 100, bets_per_issue=10), repeat),
+    }
+
+def _bench_load_data(game_type: GameType, df: pd.DataFrame, repeat: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        dl = DataLoader(tmp)
+        path = dl.get_data_path(game_type)
+        df.to_csv(path, index=False)
+
+        def drop_cache():
+            core.data._history_memo.clear()
+            shutil.rmtree(dl.get_history_dir(game_type), ignore_errors=True)
+
+        results = {
+            "load_data_csv": best_of(lambda: dl.load_data(game_type), repeat, setup=drop_cache),
+            "load_data_cache": best_of(lambda: dl.load_data(game_type), repeat, setup=core.data._history_memo.clear),
+            "load_data_memo": best_of(lambda: dl.load_data(game_type), repeat),
+        }
+        core.data._history_memo.clear()
+        return results
+
+def _bench_db(game_type: GameType, df: pd.DataFrame, n_bets: int, repeat: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"))
+        start = time.perf_counter()
+        pending_ids = populate_bets(db, game_type, df, n_bets)
+        insert_seconds = time.perf_counter() - start
+
+        def reset_pending():
+            with db.conn:
+                db.conn.executemany("UPDATE bets SET status = 'pending', prize_level = NULL, win_amount = 0 WHERE id = ?", [(i,) for i in pending_ids])
+
+        results = {
+            "db_insert": insert_seconds,
+            "verify_pending_bets": best_of(lambda: verify_pending_bets(db, game_type, df), repeat, setup=reset_pending),
+            "get_bets_user": best_of(lambda: db.get_bets(user_id="user7"), repeat),
+            "get_pending_bets": best_of(lambda: db.get_pending_bets(game_type.value), repeat, setup=reset_pending),
+        }
+        db.close()
+        return results
+
+def run(sizes: list, n_bets: int, games: list, repeat: int) -> dict:
+    results = []
+    for game_type in games:
+        for size in sizes:
+            start = time.perf_counter()
+            df = synthetic_history(game_type, size)
+            print(f"[{game_type.value} {size}] generated in {time.perf_counter() - start:.1f}s")
+
+            timings = {}
+            timings.update(_bench_analysis(game_type, df, repeat))
+            timings.update(_bench_load_data(game_type, df, repeat))
+            for name, seconds in timings.items():
+                results.append({"name": name, "game": game_type.value, "size": size, "seconds": seconds})
+                print(f"  {name:<24} {seconds * 1000:10.2f} ms")
+
+        # Bets are verified against the smallest history
+        df = synthetic_history(game_type, min(sizes))
+        for name, seconds in _bench_db(game_type, df, n_bets, repeat).items():
+            results.append({"name": name, "game": game_type.value, "size": n_bets, "seconds": seconds})
+            print(f"  {name:<24} {seconds * 1000:10.2f} ms  ({n_bets} bets)")
+
+    return {
+        "meta": {
+            "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+# --- Comparison ---
+
+def compare(baseline: dict, current: dict, threshold: float = 1.25, noise_floor: float = 0.001) -> list:
+    """
+    Rows (name, game, size, baseline, current, ratio, regressed) for every benchmark
+    in both runs. A benchmark regresses when it got slower by more than
+    `threshold` times and by more than noise_floor seconds.
+    """
+    base = {(r["name"], r["game"], r["size"]): r["seconds"] for r in baseline["results"]}
+    rows = []
+    for r in current["results"]:
+        key = (r["name"], r["game"], r["size"])
+        if key not in base:
+            continue
+        ratio = r["seconds"] / base[key] if base[key] > 0 else float('inf')
+        regressed = ratio > threshold and r["seconds"] - base[key] > noise_floor
+        rows.append((*key, base[key], r["seconds"], ratio, regressed))
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lottery platform benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="run the benchmarks and save a JSON result")
+    run_parser.add_argument("--sizes", default="10000,100000", help="comma-separated history sizes (draws)")
+    run_parser.add_argument("--bets", type=int, default=100000, help="bets in the verification database")
+    run_parser.add_argument("--games", default="ssq,dlt")
+    run_parser.add_argument("--repeat", type=int, default=3)
+    run_parser.add_argument("--output", default=os.path.join("benchmarks", "latest.json"))
+
+    cmp_parser = sub.add_parser("compare", help="compare a result against a baseline")
+    cmp_parser.add_argument("baseline")
+    cmp_parser.add_argument("current")
+    cmp_parser.add_argument("--threshold", type=float, default=1.25, help="slowdown ratio that counts as a regression")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        sizes = [int(s) for s in args.sizes.split(",")]
+        games = [GameType(g) for g in args.games.split(",")]
+        result = run(sizes, args.bets, games, args.repeat)
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Saved {len(result['results'])} results to {args.output}")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    rows = compare(baseline, current, args.threshold)
+    print(f"{'benchmark':<24} {'game':<4} {'size':>8} {'baseline ms':>12} {'current ms':>12} {'ratio':>7}")
+    for name, game, size, base_s, cur_s, ratio, regressed in rows:
+        flag = "  ❌ REGRESSION" if regressed else ""
+        print(f"{name:<24} {game:<4} {size:>8} {base_s * 1000:12.2f} {cur_s * 1000:12.2f} {ratio:7.2f}{flag}")
+    regressions = sum(1 for row in rows if row[-1])
+    if regressions:
+        print(f"\n❌ {regressions} regression(s) over {args.threshold}x")
+        return 1
+    print(f"\n✅ No regressions over {args.threshold}x")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+import threading
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+from core.lottery import GameType, get_config
+from core.features import get_ball_matrix, calculate_omission_array
+
+# Columns of the recent-draws table and their display names
+RECENT_COLUMNS = {
+    GameType.SSQ: (['issue', 'date', 'red1', 'red2', 'red3', 'red4', 'red5', 'red6', 'blue'],
+                   ['期号', '日期', '红1', '红2', '红3', '红4', '红5', '红6', '蓝']),
+    GameType.DLT: (['issue', 'date', 'red1', 'red2', 'red3', 'red4', 'red5', 'blue1', 'blue2'],
+                   ['期号', '日期', '红1', '红2', '红3', '红4', '红5', '蓝1', '蓝2']),
+}
+
+@dataclass(frozen=True)
+class DashboardAggregates:
+    """
+    Everything the dashboard view shows for one data version.
+    Shared by all sessions: treat the Series/DataFrames as read-only.
+    """
+    version: tuple
+    red_counts: pd.Series     # number -> appearances over the whole history
+    blue_counts: pd.Series
+    red_omission: pd.Series   # number -> draws since last seen
+    recent_draws: pd.DataFrame # newest draws first, display column names
+
+def data_version(game_type: GameType, df: pd.DataFrame) -> tuple:
+    """Identifies a history by its size and newest issue; changes whenever draws arrive."""
+    return (game_type.value, len(df), str(df['issue'].iloc[-1]) if len(df) else None)
+
+def _counts(matrix: np.ndarray, low: int, high: int) -> pd.Series:
+    values = matrix.ravel()
+    counts = np.bincount(values[(values >= low) & (values <= high)], minlength=high + 1)
+    return pd.Series(counts[low:], index=range(low, high + 1))
+
+def compute_dashboard_aggregates(game_type: GameType, df: pd.DataFrame, recent: int = 20) -> DashboardAggregates:
+    config = get_config(game_type)
+    reds = get_ball_matrix(df, 'red')
+    blues = get_ball_matrix(df, 'blue')
+    omission = calculate_omission_array(reds, config.red_range[1])
+
+    cols, display_cols = (list(c) for c in RECENT_COLUMNS[game_type])
+    # Handle missing date column gracefully
+    if 'date' not in df.columns:
+        cols.remove('date')
+        display_cols.remove('日期')
+    recent_draws = df[cols].iloc[::-1].head(recent).copy()
+    recent_draws.columns = display_cols
+
+    return DashboardAggregates(
+        version=data_version(game_type, df),
+        red_counts=_counts(reds, *config.red_range),
+        blue_counts=_counts(blues, *config.blue_range),
+        red_omission=pd.Series(omission[config.red_range[0]:], index=range(config.red_range[0], config.red_range[1] + 1)),
+        recent_draws=recent_draws,
+    )
+
+# --- Cross-session cache ---
+
+_cache = {}   # game_type -> DashboardAggregates of the newest version seen
+_locks = {g: threading.Lock() for g in GameType}
+
+def get_dashboard_aggregates(game_type: GameType, df: pd.DataFrame) -> DashboardAggregates:
+    """
+    Aggregates for df, computed once per data version and shared by every
+    caller in the process. A new version replaces (evicts) the old one.
+    """
+    version = data_version(game_type, df)
+    cached = _cache.get(game_type)
+    if cached is not None and cached.version == version:
+        return cached
+    with _locks[game_type]:
+        # Another session may have computed it while we waited
+        cached = _cache.get(game_type)
+        if cached is None or cached.version != version:
+            cached = compute_dashboard_aggregates(game_type, df)
+            _cache[game_type] = cached
+        return cached
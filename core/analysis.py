@@ -1,39 +1,76 @@
-import random
+import inspect
+import multiprocessing
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
 import pandas as pd
-from collections import Counter
 from core.lottery import GameType, get_config
-from core.prize import PrizeCalculator
+from core.prize import PrizeCalculator, LEVEL_NAMES
+from core import bitmask
+from core.features import FeatureState, get_ball_matrix, calculate_omission_array
+from core.metrics import span
+from core.params import CompositeParams, load_params
+from core.rng import make_rng, spawn_rngs
+from core.odds import TICKET_PRICE
 
 # --- Helper Functions ---
 
-def weighted_sample_without_replacement(population, weights, k):
+def weighted_sample_without_replacement(population, weights, k, rng: np.random.Generator = None):
     """
-    Weighted random sample without replacement.
+    Weighted random sample without replacement (keys u ^ (1 / w), u drawn from rng).
     """
-    v = [random.random() ** (1 / w) if w > 0 else 0 for w in weights]
-    order = sorted(range(len(population)), key=lambda i: v[i], reverse=True)
-    return sorted([population[i] for i in order[:k]])
+    weights = np.asarray(weights, dtype=float)
+    u = make_rng(rng).random(len(weights))
+    v = np.zeros(len(weights))
+    positive = weights > 0
+    v[positive] = u[positive] ** (1 / weights[positive])
+    order = np.argsort(-v, kind="stable")
+    return sorted([population[i] for i in order[:k].tolist()])
 
-def calculate_omission(df: pd.DataFrame, max_num: int, prefix: str = 'red') -> dict:
+def gumbel_top_k(population: np.ndarray, weights: np.ndarray, k: int, size: int, rng: np.random.Generator) -> np.ndarray:
     """
-    Calculate current omission for each number.
+    Draw `size` weighted samples of k items without replacement in one go
+    (Gumbel-top-k, same distribution as weighted_sample_without_replacement).
+    Returns a (size, k) array with each row sorted.
     """
-    omission_counts = {i: 0 for i in range(1, max_num + 1)}
-    cols = [c for c in df.columns if prefix in c]
+    with np.errstate(divide='ignore'):
+        keys = np.log(weights) + rng.gumbel(size=(size, len(population)))
+    top = np.argpartition(-keys, k - 1, axis=1)[:, :k]
+    return np.sort(population[top], axis=1)
+
+def consecutive_counts(reds: np.ndarray) -> np.ndarray:
+    """Adjacent pairs (n, n + 1) per row of a matrix of sorted numbers."""
+    return (np.diff(reds, axis=1) == 1).sum(axis=1)
+
+def composite_filter_mask(reds: np.ndarray, target_min: int, target_max: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Boolean mask of the candidate rows (sorted reds) passing the composite filters.
+    """
+    # Filter 1: Sum
+    sums = reds.sum(axis=1)
+    mask = (sums >= target_min) & (sums <= target_max)
     
-    # Iterate backwards from the last row
-    reversed_df = df.iloc[::-1]
+    # Filter 2: Consecutive
+    # 60% chance to reject if no consecutive (Relaxed from 80% to allow some variety)
+    has_consecutive = consecutive_counts(reds) > 0
+    mask &= has_consecutive | (rng.random(len(reds)) >= 0.6)
     
-    for num in range(1, max_num + 1):
-        count = 0
-        for _, row in reversed_df.iterrows():
-            row_values = row[cols].values
-            if num in row_values:
-                break
-            count += 1
-        omission_counts[num] = count
-        
-    return omission_counts
+    # Filter 3: Zone Balance
+    # Zone 1: 1-11, Zone 2: 12-22, Zone 3: 23-33 (approx)
+    z1 = (reds <= 11).sum(axis=1)
+    z2 = ((reds > 11) & (reds <= 22)).sum(axis=1)
+    z3 = (reds > 22).sum(axis=1)
+    # Reject if any zone has > 4 numbers (too clumped) or if 2 zones are empty (all in 1 zone)
+    mask &= (z1 <= 4) & (z2 <= 4) & (z3 <= 4)
+    mask &= (z1 > 0).astype(int) + (z2 > 0) + (z3 > 0) >= 2
+    return mask
+
+def calculate_omission(df: pd.DataFrame, max_num: int, prefix: str = 'red') -> dict:
+    """
+    Calculate current omission for each number.
+    """
+    omission = calculate_omission_array(get_ball_matrix(df, prefix), max_num)
+    return {i: int(omission[i]) for i in range(1, max_num + 1)}
 
 def calculate_metrics(numbers: list, max_val: int):
     """
@@ -125,291 +162,471 @@ class AnalysisUtils:
 
 
 def check_consecutive(numbers: list) -> int:
-    sorted_nums = sorted(numbers)
-    count = 0
-    for i in range(len(sorted_nums) - 1):
-        if sorted_nums[i+1] == sorted_nums[i] + 1:
-            count += 1
-    return count
+    """Adjacent pairs in one ticket; the same rule composite_filter_mask applies."""
+    return int(consecutive_counts(np.sort(np.asarray(numbers, dtype=np.int64))[None, :])[0])
 
 # --- Main Classes ---
 
 class Simulator:
     @staticmethod
-    def simulate_draw(game_type: GameType):
+    def simulate_draw(game_type: GameType, rng: np.random.Generator = None):
         config = get_config(game_type)
-        reds = sorted(random.sample(range(config.red_range[0], config.red_range[1] + 1), config.red_count))
-        blues = sorted(random.sample(range(config.blue_range[0], config.blue_range[1] + 1), config.blue_count))
+        rng = make_rng(rng)
+        reds = sorted(rng.choice(np.arange(config.red_range[0], config.red_range[1] + 1), config.red_count, replace=False).tolist())
+        blues = sorted(rng.choice(np.arange(config.blue_range[0], config.blue_range[1] + 1), config.blue_count, replace=False).tolist())
         return reds, blues
 
 class Predictor:
     @staticmethod
-    def random_predict(game_type: GameType, history_df: pd.DataFrame = None):
-        return Simulator.simulate_draw(game_type)
+    @span("predictor.random_predict")
+    def random_predict(game_type: GameType, history_df: pd.DataFrame = None, rng: np.random.Generator = None):
+        return Simulator.simulate_draw(game_type, rng)
 
     @staticmethod
-    def frequency_predict(game_type: GameType, history_df: pd.DataFrame, top_n: int = 100):
+    @span("predictor.frequency_predict")
+    def frequency_predict(game_type: GameType, history_df: pd.DataFrame, top_n: int = 100, features: FeatureState = None, rng: np.random.Generator = None):
+        if features is None:
+            features = FeatureState.from_history(game_type, history_df, freq_window=top_n)
         config = get_config(game_type)
-        recent = history_df.tail(top_n)
-        
-        red_cols = [c for c in recent.columns if 'red' in c]
-        red_numbers = recent[red_cols].values.flatten()
-        red_counts = Counter(red_numbers)
-        
-        blue_cols = [c for c in recent.columns if 'blue' in c]
-        blue_numbers = recent[blue_cols].values.flatten()
-        blue_counts = Counter(blue_numbers)
-        
-        red_pop = list(range(config.red_range[0], config.red_range[1] + 1))
-        red_weights = [red_counts.get(float(n), 0.1) for n in red_pop]
-        
-        blue_pop = list(range(config.blue_range[0], config.blue_range[1] + 1))
-        blue_weights = [blue_counts.get(float(n), 0.1) for n in blue_pop]
+        red_pop, red_weights, blue_pop, blue_weights = Predictor.frequency_weights(game_type, features)
 
-        pred_reds = weighted_sample_without_replacement(red_pop, red_weights, config.red_count)
-        pred_blues = weighted_sample_without_replacement(blue_pop, blue_weights, config.blue_count)
+        rng = make_rng(rng)
+        pred_reds = weighted_sample_without_replacement(red_pop.tolist(), red_weights, config.red_count, rng)
+        pred_blues = weighted_sample_without_replacement(blue_pop.tolist(), blue_weights, config.blue_count, rng)
         
         return pred_reds, pred_blues
 
     @staticmethod
-    def omission_predict(game_type: GameType, history_df: pd.DataFrame):
+    @span("predictor.omission_predict")
+    def omission_predict(game_type: GameType, history_df: pd.DataFrame, features: FeatureState = None, rng: np.random.Generator = None):
         """
         Predict based on Omission (Gambler's Fallacy Strategy: Pick cold numbers).
         Higher omission = Higher weight.
         """
+        if features is None:
+            features = FeatureState.from_history(game_type, history_df)
         config = get_config(game_type)
+        red_pop, red_weights, blue_pop, blue_weights = Predictor.omission_weights(game_type, features)
         
-        # Red Omission
-        red_omission = calculate_omission(history_df, config.red_range[1], 'red')
-        red_pop = list(range(config.red_range[0], config.red_range[1] + 1))
-        # Weight = (omission + 1) ^ 2 to emphasize cold numbers
-        red_weights = [ (red_omission.get(n, 0) + 1) ** 2 for n in red_pop ]
-        
-        # Blue Omission
-        blue_omission = calculate_omission(history_df, config.blue_range[1], 'blue')
-        blue_pop = list(range(config.blue_range[0], config.blue_range[1] + 1))
-        blue_weights = [ (blue_omission.get(n, 0) + 1) ** 2 for n in blue_pop ]
-        
-        pred_reds = weighted_sample_without_replacement(red_pop, red_weights, config.red_count)
-        pred_blues = weighted_sample_without_replacement(blue_pop, blue_weights, config.blue_count)
+        rng = make_rng(rng)
+        pred_reds = weighted_sample_without_replacement(red_pop.tolist(), red_weights, config.red_count, rng)
+        pred_blues = weighted_sample_without_replacement(blue_pop.tolist(), blue_weights, config.blue_count, rng)
         
         return pred_reds, pred_blues
 
+    # --- Sampling Weights ---
+    # Each returns (red_pop, red_weights, blue_pop, blue_weights) as arrays.
+
+    @staticmethod
+    def uniform_weights(game_type: GameType, features: FeatureState = None):
+        config = get_config(game_type)
+        red_pop = np.arange(config.red_range[0], config.red_range[1] + 1)
+        blue_pop = np.arange(config.blue_range[0], config.blue_range[1] + 1)
+        return red_pop, np.ones(len(red_pop)), blue_pop, np.ones(len(blue_pop))
+
+    @staticmethod
+    def frequency_weights(game_type: GameType, features: FeatureState):
+        """Counts over the feature window, 0.1 for numbers not seen."""
+        red_pop, _, blue_pop, _ = Predictor.uniform_weights(game_type)
+        red_weights = features.red_counts[red_pop].astype(float)
+        red_weights[red_weights == 0] = 0.1
+        blue_weights = features.blue_counts[blue_pop].astype(float)
+        blue_weights[blue_weights == 0] = 0.1
+        return red_pop, red_weights, blue_pop, blue_weights
+
     @staticmethod
-    def composite_predict(game_type: GameType, history_df: pd.DataFrame, seed: int = None):
+    def omission_weights(game_type: GameType, features: FeatureState):
+        """Weight = (omission + 1) ^ 2 to emphasize cold numbers."""
+        red_pop, _, blue_pop, _ = Predictor.uniform_weights(game_type)
+        red_weights = (features.red_omission_array()[red_pop] + 1.0) ** 2
+        blue_weights = (features.blue_omission_array()[blue_pop] + 1.0) ** 2
+        return red_pop, red_weights, blue_pop, blue_weights
+
+    @staticmethod
+    @span("predictor.composite_predict")
+    def composite_predict(game_type: GameType, history_df: pd.DataFrame, seed: int = None, features: FeatureState = None, rng: np.random.Generator = None):
         """
         Enhanced Smart Trend Strategy (Optimized for ROI):
         1. Blue Ball Focus: High weight on recent hot blue numbers (easier to hit).
         2. Red Ball Kill: Remove 1-2 absolutely coldest numbers to slightly improve odds.
         3. Trend: Boost Repeat Numbers.
         4. Filter: Golden Sum & Consecutive.
-        """
-        if seed is not None:
-            random.seed(seed)
-
-        config = get_config(game_type)
-        recent = history_df.tail(100)
         
-        # 0. Get Last Draw Numbers (for Repeat Logic)
-        last_draw = history_df.iloc[-1]
-        last_reds = []
-        if game_type == GameType.SSQ:
-            last_reds = [int(last_draw[f'red{j}']) for j in range(1, 7)]
-        else:
-            last_reds = [int(last_draw[f'red{j}']) for j in range(1, 6)]
+        `features` may carry precomputed history features (e.g. from the backtester);
+        otherwise they are derived from history_df. rng, if given, is used instead of seed.
+        """
+        return Predictor.predict_many(game_type, history_df, 1, seed_base=seed, features=features, rng=rng)[0]
 
-        # 1. Frequency Analysis
-        red_cols = [c for c in recent.columns if 'red' in c]
-        red_counts = Counter(recent[red_cols].values.flatten())
-        
-        blue_cols = [c for c in recent.columns if 'blue' in c]
-        blue_counts = Counter(recent[blue_cols].values.flatten())
+    @staticmethod
+    def composite_inputs(game_type: GameType, features: FeatureState) -> dict:
+        """
+        The history-derived inputs of composite_weights. They don't depend on
+        CompositeParams, so the tuner computes them once per issue for all configs.
+        """
+        # 1. Frequency Analysis (last 100 draws), 0.5 for numbers not seen
+        red_counts = features.red_counts.astype(float)
+        red_counts[red_counts == 0] = 0.5
+        blue_counts = features.blue_counts.astype(float)
+        blue_counts[blue_counts == 0] = 0.5
         
         # 2. Omission Analysis
-        red_omission = calculate_omission(history_df, config.red_range[1], 'red')
-        blue_omission = calculate_omission(history_df, config.blue_range[1], 'blue')
+        red_omission = features.red_omission_array()
         
         # 3. Trend Analysis (Auto-Tune Logic)
-        trends = AnalysisUtils.analyze_recent_trends(history_df, game_type)
+        trends = features.trends()
+        
+        return {
+            'red_counts': red_counts,
+            'blue_counts': blue_counts,
+            'red_omission': red_omission,
+            'last_reds': np.array(features.last_reds, dtype=np.int64),
+            'hot_road': trends['hot_road'],
+            'hot_odd_even': trends['hot_odd_even'],
+            'avg_sum': trends['avg_sum'],
+        }
+
+    @staticmethod
+    def composite_weights(game_type: GameType, features: FeatureState, params: CompositeParams = None):
+        """
+        Sampling weights and sum window of the composite strategy.
+        Returns (red_pop, red_weights, blue_pop, blue_weights, (target_min, target_max)).
+        params defaults to the tuned parameters of the game (core.params.load_params).
+        """
+        return Predictor.weights_from_inputs(game_type, Predictor.composite_inputs(game_type, features), params)
+
+    @staticmethod
+    def weights_from_inputs(game_type: GameType, inputs: dict, params: CompositeParams = None):
+        """composite_weights for precomputed composite_inputs."""
+        config = get_config(game_type)
+        params = params or load_params(game_type)
+        red_counts = inputs['red_counts']
+        red_omission = inputs['red_omission']
         
-        # Calculate Weights
-        red_pop = list(range(config.red_range[0], config.red_range[1] + 1))
-        blue_pop = list(range(config.blue_range[0], config.blue_range[1] + 1))
+        red_pop = np.arange(config.red_range[0], config.red_range[1] + 1)
+        blue_pop = np.arange(config.blue_range[0], config.blue_range[1] + 1)
         
-        # KILL LOGIC: Remove the bottom 3 coldest red numbers (Highest Omission)
+        # KILL LOGIC: Remove the coldest red numbers (Highest Omission)
         # Aggressive killing to improve efficiency
-        sorted_red_omission = sorted(red_omission.items(), key=lambda x: x[1], reverse=True)
-        kill_reds = [x[0] for x in sorted_red_omission[:3]]
+        kill_reds = red_pop[np.argsort(-red_omission[red_pop], kind='stable')[:params.kill_count]]
+        red_pop = red_pop[~np.isin(red_pop, kill_reds)]
         
-        # Filter population
-        red_pop = [r for r in red_pop if r not in kill_reds]
+        # Strategy:
+        # For Blue: Chase HOT numbers. Short cycle.
+        # For Red: Chase HOT + REPEAT, but protect against extreme COLD.
         
-        def get_weight(n, counts, omission, is_repeat=False, is_blue=False):
-            freq_w = counts.get(float(n), 0.5) # Base weight from frequency
-            omission_val = omission.get(n, 0)
-            
-            weight = freq_w + 1
-            
-            # Strategy:
-            # For Blue: Chase HOT numbers. Short cycle.
-            # For Red: Chase HOT + REPEAT, but protect against extreme COLD.
-            
-            if is_blue:
-                # Blue Strategy: Heavily favor hot numbers (recent 100 draws)
-                # Omission doesn't matter as much for Blue in short term
-                weight = weight * 3.0 # Increased weight for hot blues
-            else:
-                # Red Strategy
-                # Boost if extremely cold (Omission > 20)
-                if omission_val > 20:
-                    weight *= 1.5
-                
-                # Boost if Repeat (Trend)
-                if is_repeat:
-                    weight *= 2.5 # Increased repeat weight
-                
-                # Boost based on Hot Road (012)
-                if n % 3 == trends['hot_road']:
-                    weight *= 1.2
-                
-                # Boost based on Hot Odd/Even
-                is_odd = n % 2 != 0
-                if (trends['hot_odd_even'] == 'odd' and is_odd) or \
-                   (trends['hot_odd_even'] == 'even' and not is_odd):
-                    weight *= 1.2
-            
-            return weight
-
-        red_weights = [get_weight(n, red_counts, red_omission, n in last_reds, is_blue=False) for n in red_pop]
-        blue_weights = [get_weight(n, blue_counts, blue_omission, is_blue=True) for n in blue_pop]
+        # Blue Strategy: Heavily favor hot numbers (recent 100 draws)
+        # Omission doesn't matter as much for Blue in short term
+        blue_weights = (inputs['blue_counts'][blue_pop] + 1) * params.blue_weight
+        
+        # Red Strategy
+        red_weights = red_counts[red_pop] + 1
+        # Boost if extremely cold
+        red_weights[red_omission[red_pop] > params.cold_omission] *= params.cold_boost
+        # Boost if Repeat (Trend)
+        red_weights[np.isin(red_pop, inputs['last_reds'])] *= params.repeat_boost
+        # Boost based on Hot Road (012)
+        red_weights[red_pop % 3 == inputs['hot_road']] *= params.road_boost
+        # Boost based on Hot Odd/Even
+        is_odd = red_pop % 2 != 0
+        red_weights[is_odd if inputs['hot_odd_even'] == 'odd' else ~is_odd] *= params.odd_even_boost
         
         # Define Sum Range (Dynamic based on trend)
-        avg_sum = trends['avg_sum']
-        target_min = int(avg_sum * 0.8)
-        target_max = int(avg_sum * 1.2)
-            
-        # Retry loop for filtering
-        for _ in range(2000): 
-            pred_reds = weighted_sample_without_replacement(red_pop, red_weights, config.red_count)
-            pred_blues = weighted_sample_without_replacement(blue_pop, blue_weights, config.blue_count)
-            
-            # Filter 1: Sum
-            s = sum(pred_reds)
-            if not (target_min <= s <= target_max):
-                continue
-
-            # Filter 2: Consecutive
-            if check_consecutive(pred_reds) == 0:
-                # 60% chance to reject if no consecutive (Relaxed from 80% to allow some variety)
-                if random.random() < 0.6: 
-                    continue
-
-            # Filter 3: Zone Balance (New)
-            # Zone 1: 1-11, Zone 2: 12-22, Zone 3: 23-33 (approx)
-            z1 = len([r for r in pred_reds if r <= 11])
-            z2 = len([r for r in pred_reds if 11 < r <= 22])
-            z3 = len([r for r in pred_reds if r > 22])
-            
-            # Reject if any zone has > 4 numbers (too clumped) or if all numbers are in 1 zone (impossible)
-            if z1 > 4 or z2 > 4 or z3 > 4:
-                continue
-            if (z1==0 and z2==0) or (z1==0 and z3==0) or (z2==0 and z3==0):
-                 # Reject if 2 zones are empty (all in 1 zone)
-                 continue
-            
-            return pred_reds, pred_blues
-                
-        # Fallback
-        return weighted_sample_without_replacement(red_pop, red_weights, config.red_count), \
-               weighted_sample_without_replacement(blue_pop, blue_weights, config.blue_count)
+        avg_sum = inputs['avg_sum']
+        sum_range = (int(avg_sum * params.sum_low), int(avg_sum * params.sum_high))
+        
+        return red_pop, red_weights, blue_pop, blue_weights, sum_range
 
     @staticmethod
-    def predict_many(game_type: GameType, history_df: pd.DataFrame, count: int = 5, seed_base: int = None):
-        predictions = []
-        for i in range(count):
-            current_seed = seed_base + i if seed_base is not None else None
-            predictions.append(Predictor.composite_predict(game_type, history_df, seed=current_seed))
-        return predictions
+    @span("predictor.predict_many")
+    def predict_many(game_type: GameType, history_df: pd.DataFrame, count: int = 5, seed_base: int = None, features: FeatureState = None, params: CompositeParams = None, rng: np.random.Generator = None):
+        """
+        Generate `count` composite tickets from one batch of candidates.
+        The same seed_base and count always yield the same tickets (the
+        candidate batches scale with count, so a smaller batch is not a prefix
+        of a larger one); an explicit rng (e.g. a spawned sub-stream) replaces it.
+        params defaults to the tuned parameters of the game.
+        """
+        if features is None:
+            features = FeatureState.from_history(game_type, history_df)
+        params = params or load_params(game_type)
+        weights = Predictor.composite_weights(game_type, features, params)
+        reds, blues = sample_composite(game_type, weights, count, rng if rng is not None else np.random.default_rng(seed_base), params.max_retries)
+        return list(zip(reds.tolist(), blues.tolist()))
+
+def sample_composite(game_type: GameType, weights: tuple, count: int, rng: np.random.Generator, max_retries: int = 2000):
+    """
+    `count` composite tickets for composite_weights output as (reds, blues) arrays.
+    Candidates are drawn in batches and kept when they pass the filters,
+    giving up after max_retries candidates per requested ticket.
+    """
+    config = get_config(game_type)
+    red_pop, red_weights, blue_pop, blue_weights, (target_min, target_max) = weights
+    batch_size = max(64, count * 4)
+    accepted_reds = []
+    accepted_blues = []
+    n_accepted = 0
+    n_drawn = 0
+    while n_accepted < count and n_drawn < max_retries * count:
+        reds = gumbel_top_k(red_pop, red_weights, config.red_count, batch_size, rng)
+        blues = gumbel_top_k(blue_pop, blue_weights, config.blue_count, batch_size, rng)
+        mask = composite_filter_mask(reds, target_min, target_max, rng)
+        accepted_reds.append(reds[mask])
+        accepted_blues.append(blues[mask])
+        n_accepted += int(mask.sum())
+        n_drawn += batch_size
+    
+    # Fallback: unfiltered candidates for whatever could not be filled
+    if n_accepted < count:
+        accepted_reds.append(gumbel_top_k(red_pop, red_weights, config.red_count, count - n_accepted, rng))
+        accepted_blues.append(gumbel_top_k(blue_pop, blue_weights, config.blue_count, count - n_accepted, rng))
+    
+    return np.concatenate(accepted_reds)[:count], np.concatenate(accepted_blues)[:count]
 
 class Backtester:
     @staticmethod
-    def run_backtest(game_type: GameType, strategy_func, history_df: pd.DataFrame, test_count: int = 50, bets_per_issue: int = 1, progress_callback=None):
-        results = []
+    @span("backtest.run_backtest")
+    def run_backtest(game_type: GameType, strategy_func, history_df: pd.DataFrame, test_count: int = 50, bets_per_issue: int = 1, progress_callback=None, workers: int = None):
+        """
+        Replay strategy_func over the last test_count issues.
+        
+        With workers > 1 the issues are sharded across a process pool. Every issue
+        seeds its own RNG, so the result is identical to the serial run.
+        strategy_func must then be picklable (a module-level function or a
+        Predictor static method). Workers are started with "spawn", so callers
+        may be multi-threaded (e.g. the Streamlit server), and receive the
+        history once each through the pool initializer.
+        """
         if len(history_df) < test_count + 10:
             return pd.DataFrame() 
             
         start_idx = len(history_df) - test_count
         total_steps = len(history_df) - start_idx
         
-        for idx_step, i in enumerate(range(start_idx, len(history_df))):
-            # Update progress
+        if not workers or workers <= 1:
+            results = _backtest_issues(game_type, strategy_func, history_df, start_idx, len(history_df), bets_per_issue, progress_callback)
+            return pd.DataFrame(results)
+        
+        # Contiguous shards, several per worker so progress stays smooth
+        n_shards = min(total_steps, workers * 4)
+        bounds = [start_idx + total_steps * j // n_shards for j in range(n_shards + 1)]
+        shard_results = [None] * n_shards
+        done_steps = 0
+        
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_backtest_worker, initargs=(game_type, strategy_func, history_df, bets_per_issue)) as pool:
+            futures = {pool.submit(_backtest_shard, bounds[j], bounds[j + 1]): j for j in range(n_shards)}
+            for future in as_completed(futures):
+                j = futures[future]
+                shard_results[j] = future.result()
+                done_steps += bounds[j + 1] - bounds[j]
+                if progress_callback:
+                    progress_callback(done_steps / total_steps)
+        
+        return pd.DataFrame([row for shard in shard_results for row in shard])
+
+    @staticmethod
+    @span("backtest.compare_strategies")
+    def compare_strategies(game_type: GameType, strategies: dict, history_df: pd.DataFrame, test_count: int = None, bets_per_issue: int = 1, progress_callback=None):
+        """
+        Backtest several strategies ({name: strategy_func}) over the same issues at once.
+        
+        Features are advanced once per issue and shared by every strategy; the
+        tickets of all strategies x issues x bets are scored as one bitmask tensor
+        and priced with one table lookup. test_count=None tests the whole history
+        (after a 10-draw warm-up).
+        
+        Returns (summary, curves): one summary row per strategy and the cumulative
+        net profit per issue, one column per strategy.
+        """
+        n = len(history_df)
+        if test_count is None:
+            test_count = n - 10
+        if test_count <= 0 or n < test_count + 10:
+            return pd.DataFrame(), pd.DataFrame()
+        
+        config = get_config(game_type)
+        names = list(strategies)
+        start = n - test_count
+        red_tickets = np.zeros((len(names), test_count, bets_per_issue), dtype=np.uint64)
+        blue_tickets = np.zeros((len(names), test_count, bets_per_issue), dtype=np.uint64)
+        placed = np.zeros((len(names), test_count, bets_per_issue), dtype=bool) # failed predictions stay False
+        
+        features = FeatureState.from_history(game_type, history_df.iloc[:start])
+        red_matrix = get_ball_matrix(history_df, 'red')
+        blue_matrix = get_ball_matrix(history_df, 'blue')
+        issues = history_df['issue'].tolist()
+        
+        for t, i in enumerate(range(start, n)):
             if progress_callback:
-                progress_callback(idx_step / total_steps)
-                
-            history_subset = history_df.iloc[:i]
-            current_row = history_df.iloc[i]
-            
-            # Extract actual
-            if game_type == GameType.SSQ:
-                act_reds = [int(current_row[f'red{j}']) for j in range(1, 7)]
-                act_blues = [int(current_row['blue'])]
-            elif game_type == GameType.DLT:
-                act_reds = [int(current_row[f'red{j}']) for j in range(1, 6)]
-                act_blues = [int(current_row[f'blue{j}']) for j in range(1, 3)]
-                
-            # Predict multiple bets
-            issue_prizes = 0
-            issue_hits_summary = []
-            
-            # IMPORTANT: For backtesting, we should NOT use a fixed seed based on today's date,
-            # otherwise every backtest step would produce the same numbers if not handled carefully.
-            # But we want randomness relative to the 'issue' being tested.
-            # Let's seed based on issue number to make backtest reproducible but different per issue.
-            
-            # However, strategy_func signature in main.py might not accept seed if we pass the raw function.
-            # We need to handle arguments.
-            # Simple hack: check if strategy_func accepts seed, or wrap it.
-            # But composite_predict is a static method.
-            
-            for k in range(bets_per_issue):
+                progress_callback(t / test_count)
+            for j, name in enumerate(names):
                 try:
-                    # Pass seed if it's composite_predict
-                    if strategy_func == Predictor.composite_predict:
-                        # Seed = Issue Number + Bet Index
-                        current_seed = int(current_row['issue']) + k
-                        pred_reds, pred_blues = strategy_func(game_type, history_subset, seed=current_seed)
-                    else:
-                        # Other strategies might not accept seed yet, update them?
-                        # For now assume others are random enough or don't support seed in this call
-                        # We can inspect or just try/except
-                         pred_reds, pred_blues = strategy_func(game_type, history_subset)
-
-                except TypeError:
-                     # Fallback for functions that don't take seed
-                     pred_reds, pred_blues = strategy_func(game_type, history_subset)
+                    reds, blues = _strategy_batch(game_type, strategies[name], history_df, i, features, bets_per_issue, int(issues[i]))
                 except Exception as e:
-                    print(f"Prediction failed at index {i}: {e}")
+                    print(f"Prediction failed at index {i} ({name}): {e}")
                     continue
-                
-                # Check hits
-                red_hits = len(set(pred_reds) & set(act_reds))
-                blue_hits = len(set(pred_blues) & set(act_blues))
-                
-                # Calculate Prize
-                prize_res = PrizeCalculator.calculate(game_type, red_hits, blue_hits)
-                issue_prizes += prize_res.amount
-                issue_hits_summary.append(f"{red_hits}+{blue_hits}")
-            
-            cost = 2 * bets_per_issue # 2 RMB per bet
-            
-            results.append({
-                'issue': current_row['issue'],
-                'bets_count': bets_per_issue,
-                'cost': cost,
-                'prize': issue_prizes,
-                'net_profit': issue_prizes - cost,
-                'hits_summary': ", ".join(issue_hits_summary[:5]) + ("..." if bets_per_issue > 5 else ""),
-                'actual': (act_reds, act_blues)
-            })
+                if len(reds):
+                    red_tickets[j, t, :len(reds)] = bitmask.encode_matrix(reds)
+                    blue_tickets[j, t, :len(blues)] = bitmask.encode_matrix(blues)
+                    placed[j, t, :len(reds)] = True
+            features.advance(red_matrix[i].tolist(), blue_matrix[i].tolist())
+        
+        # Score everything at once: (strategies, issues, bets)
+        draw_reds = bitmask.encode_matrix(red_matrix[start:])[None, :, None]
+        draw_blues = bitmask.encode_matrix(blue_matrix[start:])[None, :, None]
+        red_hits = bitmask.hits(red_tickets, draw_reds)
+        blue_hits = bitmask.hits(blue_tickets, draw_blues)
+        amounts, codes = PrizeCalculator.calculate_many(game_type, red_hits, blue_hits)
+        amounts = np.where(placed, amounts, 0)
+        
+        cost = TICKET_PRICE * bets_per_issue # failed bets are charged too, as in run_backtest
+        prize = amounts.sum(axis=2)
+        net = prize - cost
+        curves = pd.DataFrame(net.cumsum(axis=1).T, index=issues[start:], columns=names)
+        curves.index.name = 'issue'
+        
+        n_levels = int(PrizeCalculator.table(game_type)[1].max()) + 1
+        rows = []
+        for j, name in enumerate(names):
+            n_placed = int(placed[j].sum())
+            total_cost = cost * test_count
+            total_prize = int(prize[j].sum())
+            level_counts = np.bincount(codes[j][placed[j]], minlength=n_levels)
+            row = {
+                'strategy': name,
+                'issues': test_count,
+                'bets': test_count * bets_per_issue,
+                'failed_bets': test_count * bets_per_issue - n_placed,
+                'cost': total_cost,
+                'prize': total_prize,
+                'net_profit': total_prize - total_cost,
+                'roi': (total_prize - total_cost) / total_cost,
+                'win_rate': float((prize[j] > 0).mean()),        # issues with any prize
+                'bet_win_rate': float((amounts[j] > 0).mean()),  # winning bets
+                'max_drawdown': float((np.maximum.accumulate(np.maximum(net[j].cumsum(), 0)) - net[j].cumsum()).max()),
+            }
+            for code in range(1, n_levels):
+                row[LEVEL_NAMES[code]] = int(level_counts[code])
+            rows.append(row)
+        return pd.DataFrame(rows), curves
+
+def _backtest_issues(game_type: GameType, strategy_func, history_df: pd.DataFrame, start: int, stop: int, bets_per_issue: int, progress_callback=None) -> list:
+    """
+    Backtest issues history_df[start:stop], each predicted from the draws before it.
+    Module-level so process pool workers can run it.
+    """
+    results = []
+    total_steps = stop - start
+    
+    # Rolling features for the prefix before the first tested issue;
+    # advanced by one draw per step instead of re-deriving from history_df.iloc[:i]
+    features = FeatureState.from_history(game_type, history_df.iloc[:start])
+    red_matrix = get_ball_matrix(history_df, 'red')
+    blue_matrix = get_ball_matrix(history_df, 'blue')
+    red_masks = bitmask.encode_matrix(red_matrix)
+    blue_masks = bitmask.encode_matrix(blue_matrix)
+    issues = history_df['issue'].tolist()
+    
+    # Tickets come from _strategy_batch, like in compare_strategies, so both
+    # engines derive the same streams per issue and report the same numbers.
+    for idx_step, i in enumerate(range(start, stop)):
+        # Update progress
+        if progress_callback:
+            progress_callback(idx_step / total_steps)
             
-        return pd.DataFrame(results)
+        act_reds = red_matrix[i].tolist()
+        act_blues = blue_matrix[i].tolist()
+        
+        try:
+            reds, blues = _strategy_batch(game_type, strategy_func, history_df, i, features, bets_per_issue, int(issues[i]))
+        except Exception as e:
+            print(f"Prediction failed at index {i}: {e}")
+            reds = blues = []
+        
+        # Check hits (popcount over ball bitmasks) and price all bets at once;
+        # a failed prediction wins nothing but its bet is still charged
+        n_bets = len(reds)
+        issue_prizes = 0
+        issue_hits_summary = []
+        if n_bets:
+            bet_red_hits = bitmask.hits(bitmask.encode_matrix(reds), red_masks[i])
+            bet_blue_hits = bitmask.hits(bitmask.encode_matrix(blues), blue_masks[i])
+            amounts, _ = PrizeCalculator.calculate_many(game_type, bet_red_hits, bet_blue_hits)
+            issue_prizes = int(amounts.sum())
+            issue_hits_summary = [f"{r}+{b}" for r, b in zip(bet_red_hits[:5].tolist(), bet_blue_hits[:5].tolist())]
+        
+        cost = TICKET_PRICE * bets_per_issue
+        
+        features.advance(act_reds, act_blues)
+        
+        results.append({
+            'issue': issues[i],
+            'bets_count': bets_per_issue,
+            'cost': cost,
+            'prize': issue_prizes,
+            'net_profit': issue_prizes - cost,
+            'hits_summary': ", ".join(issue_hits_summary[:5]) + ("..." if bets_per_issue > 5 else ""),
+            'actual': (act_reds, act_blues)
+        })
+        
+    return results
+
+# Process pool workers receive the backtest inputs once, through the initializer
+_backtest_worker = {}
+
+def _init_backtest_worker(game_type: GameType, strategy_func, history_df: pd.DataFrame, bets_per_issue: int):
+    _backtest_worker.update(game_type=game_type, strategy_func=strategy_func, history_df=history_df, bets_per_issue=bets_per_issue)
+
+def _backtest_shard(start: int, stop: int) -> list:
+    w = _backtest_worker
+    return _backtest_issues(w['game_type'], w['strategy_func'], w['history_df'], start, stop, w['bets_per_issue'])
+
+def _strategy_batch(game_type: GameType, strategy_func, history_df: pd.DataFrame, i: int, features: FeatureState, count: int, issue: int):
+    """
+    `count` tickets of strategy_func for row i as (reds, blues) arrays.
+    
+    Shared by run_backtest and compare_strategies, so both report the same
+    tickets. The composite strategy is one predict_many batch seeded by the
+    issue; the known weighted strategies are sampled in one batch from a
+    stream seeded by (issue, strategy name). Any other callable is called once
+    per bet with seed issue + k, or with the k-th stream spawned from the
+    issue; bets whose prediction fails are left out.
+    """
+    if strategy_func == Predictor.composite_predict:
+        bets = Predictor.predict_many(game_type, None, count, seed_base=issue, features=features)
+        return np.array([b[0] for b in bets]), np.array([b[1] for b in bets])
+    
+    config = get_config(game_type)
+    weights_func = BATCH_WEIGHTS.get(strategy_func)
+    if weights_func is not None:
+        rng = np.random.default_rng([issue, zlib.crc32(strategy_func.__name__.encode())])
+        red_pop, red_weights, blue_pop, blue_weights = weights_func(game_type, features)
+        reds = gumbel_top_k(red_pop, red_weights, config.red_count, count, rng)
+        blues = gumbel_top_k(blue_pop, blue_weights, config.blue_count, count, rng)
+        return reds, blues
+    
+    params = inspect.signature(strategy_func).parameters
+    history_subset = history_df.iloc[:i]
+    pass_rng = 'rng' in params and 'seed' not in params
+    rngs = spawn_rngs(issue, count) if pass_rng else None
+    bets = []
+    for k in range(count):
+        kwargs = {}
+        if 'seed' in params:
+            kwargs['seed'] = issue + k
+        if pass_rng:
+            kwargs['rng'] = rngs[k]
+        if 'features' in params:
+            kwargs['features'] = features
+        try:
+            bets.append(strategy_func(game_type, history_subset, **kwargs))
+        except Exception as e:
+            print(f"Prediction failed at index {i}: {e}") # left out: charged, but wins nothing
+    return np.array([b[0] for b in bets]).reshape(len(bets), config.red_count), np.array([b[1] for b in bets]).reshape(len(bets), config.blue_count)
+
+# Strategies the comparison engine can sample in batches (weights from shared features)
+BATCH_WEIGHTS = {
+    Predictor.random_predict: Predictor.uniform_weights,
+    Predictor.frequency_predict: Predictor.frequency_weights,
+    Predictor.omission_predict: Predictor.omission_weights,
+}
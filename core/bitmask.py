@@ -0,0 +1,56 @@
+import numpy as np
+
+# Ball numbers map to bit positions (number n -> bit n). Reds go up to 35,
+# so every selection fits in one uint64; bit 0 is never used.
+
+_M1 = np.uint64(0x5555555555555555)
+_M2 = np.uint64(0x3333333333333333)
+_M4 = np.uint64(0x0F0F0F0F0F0F0F0F)
+_H01 = np.uint64(0x0101010101010101)
+
+def encode(numbers) -> int:
+    """
+    Bitmask of one selection, e.g. [1, 3] -> 0b1010.
+    """
+    mask = 0
+    for n in numbers:
+        mask |= 1 << int(n)
+    return mask
+
+def decode(mask: int) -> list:
+    """
+    Sorted numbers set in a bitmask.
+    """
+    mask = int(mask)
+    return [n for n in range(1, 64) if mask >> n & 1]
+
+def encode_matrix(matrix) -> np.ndarray:
+    """
+    uint64 masks for an (n, k) matrix of numbers, one mask per row.
+    Zeros (missing values) are ignored.
+    """
+    matrix = np.asarray(matrix, dtype=np.uint64)
+    if matrix.ndim == 1:
+        matrix = matrix[None, :]
+    bits = np.left_shift(np.uint64(1), matrix)
+    return np.bitwise_or.reduce(bits, axis=1) & ~np.uint64(1)
+
+def popcount(x: np.ndarray) -> np.ndarray:
+    """
+    Number of set bits per element of a uint64 array.
+    """
+    x = np.asarray(x, dtype=np.uint64)
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(x)
+    # SWAR fallback for NumPy < 2.0
+    x = x - ((x >> np.uint64(1)) & _M1)
+    x = (x & _M2) + ((x >> np.uint64(2)) & _M2)
+    x = (x + (x >> np.uint64(4))) & _M4
+    return ((x * _H01) >> np.uint64(56)).astype(np.uint8)
+
+def hits(ticket_masks, draw_masks) -> np.ndarray:
+    """
+    Matching numbers between tickets and draws, broadcasting like any
+    NumPy binary op (e.g. tickets[:, None] vs draws[None, :] for all pairs).
+    """
+    return popcount(np.bitwise_and(np.asarray(ticket_masks, dtype=np.uint64), np.asarray(draw_masks, dtype=np.uint64)))
@@ -1,23 +1,62 @@
 import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from requests.adapters import HTTPAdapter
 import pandas as pd
 from datetime import datetime
 from core.lottery import GameType
+from core.draw_calendar import next_draw_time
+from core.history import DrawHistory, store_lock
+from core.parser import parse_history_page
+from core.metrics import span
 
 DATA_DIR = "data"
+BASE_URL = "https://datachart.500.com"
+
+# Draws requested by an incremental update (~10 weeks of draws)
+INCREMENTAL_LIMIT = 30
+
+# Transient HTTP statuses worth retrying
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# In-process memo of loaded histories: (history dir, source key) -> DrawHistory
+_history_memo = {}
+_memo_lock = threading.Lock()
 
 class LotteryFetcher:
-    def __init__(self):
+    """
+    Fetches history pages over one pooled session (safe to share between threads).
+    
+    Pages are requested conditionally: the ETag/Last-Modified of the last
+    response per URL is sent back, and a 304 reuses the table parsed last time.
+    Connection errors, timeouts and RETRY_STATUSES are retried with jittered
+    exponential backoff.
+    """
+    def __init__(self, base_url: str = BASE_URL, retries: int = 3, backoff: float = 0.5, timeout: float = 30):
+        self.base_url = base_url
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         }
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=len(GameType) * 2)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        
+        # url -> (etag, last_modified, parsed DataFrame)
+        self._conditional = {}
+        self._lock = threading.Lock()
+        self._jitter = random.Random()
 
     def fetch_data(self, game_type: GameType, limit: int = 100000) -> pd.DataFrame:
-        if game_type == GameType.SSQ:
-            url = f"https://datachart.500.com/ssq/history/newinc/history.php?limit={limit}&sort=0"
-            return self._fetch_and_parse(url, game_type)
-        elif game_type == GameType.DLT:
-            url = f"https://datachart.500.com/dlt/history/newinc/history.php?limit={limit}&sort=0"
+        if game_type in (GameType.SSQ, GameType.DLT):
+            url = f"{self.base_url}/{game_type.value}/history/newinc/history.php?limit={limit}&sort=0"
             return self._fetch_and_parse(url, game_type)
         else:
             raise ValueError(f"Unsupported game type: {game_type}")
@@ -25,64 +64,136 @@ class LotteryFetcher:
     def _fetch_and_parse(self, url: str, game_type: GameType) -> pd.DataFrame:
         try:
             print(f"Fetching data from {url}...")
-            response = requests.get(url, headers=self.headers, timeout=30)
-            response.raise_for_status()
-            response.encoding = 'utf-8'
+            with self._lock:
+                cached = self._conditional.get(url)
+            headers = {}
+            if cached:
+                etag, last_modified, _ = cached
+                if etag:
+                    headers["If-None-Match"] = etag
+                if last_modified:
+                    headers["If-Modified-Since"] = last_modified
             
-            dfs = pd.read_html(response.text)
-            if not dfs:
-                raise ValueError("No tables found in response")
+            response = self._get(url, headers)
+            if response.status_code == 304 and cached:
+                print(f"{game_type.value}: not modified since last fetch")
+                return cached[2].copy()
+            response.raise_for_status()
             
-            df = dfs[0]
-            return self._clean_data(df, game_type)
+            df = parse_history_page(response.content, game_type).to_frame()
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            if etag or last_modified:
+                with self._lock:
+                    self._conditional[url] = (etag, last_modified, df.copy())
+            return df
             
         except Exception as e:
             print(f"Error fetching data for {game_type.value}: {e}")
             raise
 
-    def _clean_data(self, df: pd.DataFrame, game_type: GameType) -> pd.DataFrame:
-        if game_type == GameType.SSQ:
-            # SSQ: Issue(0), Red1-6(1-6), Blue(7), Date(15)
-            target_indices = [0, 1, 2, 3, 4, 5, 6, 7, 15]
-            column_names = ['issue', 'red1', 'red2', 'red3', 'red4', 'red5', 'red6', 'blue', 'date']
-        elif game_type == GameType.DLT:
-            # DLT: Issue(0), Red1-5(1-5), Blue1-2(6-7), Date(14)
-            target_indices = [0, 1, 2, 3, 4, 5, 6, 7, 14]
-            column_names = ['issue', 'red1', 'red2', 'red3', 'red4', 'red5', 'blue1', 'blue2', 'date']
-        
-        # Check if indices are valid for this dataframe
-        max_idx = df.shape[1] - 1
-        if any(idx > max_idx for idx in target_indices):
-             # Fallback if table structure changed or date column missing
-             print(f"Warning: Table structure mismatch. Expected max index {max(target_indices)}, got {max_idx}. Skipping date.")
-             if game_type == GameType.SSQ:
-                 target_indices = [0, 1, 2, 3, 4, 5, 6, 7]
-                 column_names = ['issue', 'red1', 'red2', 'red3', 'red4', 'red5', 'red6', 'blue']
-             else:
-                 target_indices = [0, 1, 2, 3, 4, 5, 6, 7]
-                 column_names = ['issue', 'red1', 'red2', 'red3', 'red4', 'red5', 'blue1', 'blue2']
-        
-        df_subset = df.iloc[:, target_indices].copy()
-        df_subset.columns = column_names
-        
-        # Clean Issue
-        df_subset['issue'] = df_subset['issue'].astype(str)
-        # Filter rows where issue is numeric
-        df_subset = df_subset[df_subset['issue'].str.match(r'^\d+$')]
-        
-        # Sort
-        df_subset = df_subset.sort_values('issue', ascending=True)
-        return df_subset
+    def _get(self, url: str, headers: dict) -> requests.Response:
+        """GET with retries on transient failures (full-jitter exponential backoff)."""
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
+                if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                    return response
+                reason = f"HTTP {response.status_code}"
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.retries:
+                    raise
+                reason = type(e).__name__
+            delay = self._jitter.uniform(0, self.backoff * 2 ** attempt)
+            print(f"Retrying {url} in {delay:.2f}s ({reason}, attempt {attempt + 1}/{self.retries})")
+            time.sleep(delay)
 
 class DataLoader:
-    def __init__(self, data_dir: str = DATA_DIR):
+    def __init__(self, data_dir: str = DATA_DIR, fetcher: LotteryFetcher = None):
         self.data_dir = data_dir
         os.makedirs(self.data_dir, exist_ok=True)
-        self.fetcher = LotteryFetcher()
+        self.fetcher = fetcher or LotteryFetcher()
 
     def get_data_path(self, game_type: GameType) -> str:
         return os.path.join(self.data_dir, f"{game_type.value}_history.csv")
 
+    def get_history_dir(self, game_type: GameType) -> str:
+        return os.path.join(self.data_dir, f"{game_type.value}_history")
+
+    def _source_key(self, game_type: GameType) -> list:
+        """Identity of the CSV a binary history was ingested from."""
+        st = os.stat(self.get_data_path(game_type))
+        return [st.st_mtime_ns, st.st_size]
+
+    def load_history(self, game_type: GameType) -> DrawHistory:
+        """
+        Typed, memory-mapped DrawHistory for the local data, shared through an
+        in-process memo. The CSV is only parsed when the binary cache next to it
+        is missing or was built from a different version (mtime, size) of the file.
+        No network fetch happens here.
+
+        The CSV stays the source of truth (it is what updates append to); the
+        binary store is a cache of it. Rebuilds hold the store lock, so the web
+        app and the scheduler never build the same store at once.
+        """
+        history_dir = self.get_history_dir(game_type)
+        source = self._source_key(game_type)
+        memo_key = (os.path.abspath(history_dir), tuple(source))
+        
+        with _memo_lock:
+            history = _history_memo.get(memo_key)
+        if history is not None:
+            return history
+        
+        history = self._load_store(history_dir, source)
+        if history is None:
+            with store_lock(history_dir):
+                # Another process may have rebuilt it (or rewritten the CSV) meanwhile
+                source = self._source_key(game_type)
+                history = self._load_store(history_dir, source)
+                if history is None:
+                    print(f"Building binary cache for {game_type.value} from CSV...")
+                    df = pd.read_csv(self.get_data_path(game_type), dtype={'issue': str})
+                    history = self._save_history(game_type, df)
+        
+        # Supersedes any older version of this history in the memo
+        self._remember(game_type, history, source)
+        return history
+
+    @staticmethod
+    def _load_store(history_dir: str, source: list):
+        """The stored history if it was built from source, else None."""
+        try:
+            if DrawHistory.exists(history_dir) and DrawHistory.read_meta(history_dir).get("source") == source:
+                return DrawHistory.load(history_dir)
+        except (OSError, ValueError):
+            pass
+        return None
+
+    def _remember(self, game_type: GameType, history: DrawHistory, source: list):
+        memo_key = (os.path.abspath(self.get_history_dir(game_type)), tuple(source))
+        with _memo_lock:
+            for key in [k for k in _history_memo if k[0] == memo_key[0]]:
+                del _history_memo[key]
+            _history_memo[memo_key] = history
+
+    def _touch(self, game_type: GameType, history: DrawHistory):
+        """
+        Reset the staleness clock (CSV mtime) after a poll found nothing new.
+        Only the store's source key follows; its arrays and the memo are kept.
+        """
+        os.utime(self.get_data_path(game_type))
+        source = self._source_key(game_type)
+        DrawHistory.set_source(self.get_history_dir(game_type), source)
+        self._remember(game_type, history, source)
+
+    def _save_history(self, game_type: GameType, df: pd.DataFrame) -> DrawHistory:
+        """Ingest df into the binary cache, keyed to the current CSV."""
+        history_dir = self.get_history_dir(game_type)
+        DrawHistory.from_frame(game_type, df).save(history_dir, source=self._source_key(game_type))
+        return DrawHistory.load(history_dir)
+
+    @span("data.load_data")
     def load_data(self, game_type: GameType, force_update: bool = False) -> pd.DataFrame:
         path = self.get_data_path(game_type)
         
@@ -99,15 +210,102 @@ class DataLoader:
         if not os.path.exists(path) or should_update:
             print(f"Data for {game_type.value} not found or update requested. Fetching...")
             try:
-                df = self.fetcher.fetch_data(game_type)
-                df.to_csv(path, index=False)
-                return df
+                return self.update_data(game_type)
             except Exception as e:
                 print(f"Failed to fetch data: {e}")
                 if os.path.exists(path):
                     print("Falling back to existing local data.")
-                    return pd.read_csv(path, dtype={'issue': str})
+                    return self.load_history(game_type).to_frame()
                 else:
                     return pd.DataFrame()
         
-        return pd.read_csv(path, dtype={'issue': str})
+        return self.load_history(game_type).to_frame()
+
+    @span("data.load_all")
+    def load_all(self, game_types: list = None, force_update: bool = False) -> dict:
+        """
+        load_data for several games concurrently (their fetches overlap).
+        Returns {game_type: DataFrame}; a game that fails gets an empty DataFrame.
+        """
+        game_types = list(game_types or GameType)
+        with ThreadPoolExecutor(max_workers=len(game_types)) as pool:
+            futures = {g: pool.submit(self.load_data, g, force_update) for g in game_types}
+        results = {}
+        for game_type, future in futures.items():
+            try:
+                results[game_type] = future.result()
+            except Exception as e:
+                print(f"Failed to load {game_type.value}: {e}")
+                results[game_type] = pd.DataFrame()
+        return results
+
+    @span("data.update_data")
+    def update_data(self, game_type: GameType, full: bool = False) -> pd.DataFrame:
+        """
+        Bring the local history up to date and return it.
+        
+        Incremental by default: only the most recent INCREMENTAL_LIMIT draws are
+        requested and draws newer than the local ones are appended to the CSV.
+        Falls back to a full download when there is no local file, when the
+        recent window does not continue the newest local issue (a gap, see
+        window_continues), or when full=True. Runs under the store lock, so
+        concurrent updaters never append the same draws twice.
+        """
+        with store_lock(self.get_history_dir(game_type)):
+            return self._update_locked(game_type, full)
+
+    def _update_locked(self, game_type: GameType, full: bool) -> pd.DataFrame:
+        path = self.get_data_path(game_type)
+        if full or not os.path.exists(path):
+            return self._full_update(game_type)
+        
+        history = self.load_history(game_type)
+        local = history.to_frame()
+        if local.empty:
+            return self._full_update(game_type)
+        
+        recent = self.fetcher.fetch_data(game_type, limit=INCREMENTAL_LIMIT)
+        if recent.empty or list(recent.columns) != list(local.columns) or not window_continues(game_type, local, recent):
+            print(f"Incremental window for {game_type.value} does not continue local data. Full fetch...")
+            return self._full_update(game_type)
+        
+        last_issue = int(local['issue'].iloc[-1])
+        new_rows = recent[recent['issue'].astype(int) > last_issue]
+        if new_rows.empty:
+            print(f"{game_type.value} is up to date (latest issue {local['issue'].iloc[-1]})")
+            self._touch(game_type, history)
+            return local
+        
+        print(f"Appending {len(new_rows)} new draws to {path}")
+        new_rows.to_csv(path, mode='a', header=False, index=False)
+        
+        df = pd.concat([local, new_rows], ignore_index=True)
+        return self._save_history(game_type, df).to_frame()
+
+    def _full_update(self, game_type: GameType) -> pd.DataFrame:
+        df = self.fetcher.fetch_data(game_type)
+        path = self.get_data_path(game_type)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        df.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        return self._save_history(game_type, df).to_frame()
+
+def window_continues(game_type: GameType, local: pd.DataFrame, recent: pd.DataFrame) -> bool:
+    """
+    True if the recent window leaves no draw missing after the newest local one:
+    it starts at or before the next issue. Issues are <year><3-digit number>
+    and restart every year, so a window starting at the next year's 001 only
+    continues when no draw was scheduled for the rest of the local last draw's
+    year (checked against the draw calendar, which needs the local date).
+    """
+    last = str(local['issue'].iloc[-1])
+    first = int(recent['issue'].astype(int).min())
+    if first <= int(last) + 1:
+        return True
+    year = last[:-3]
+    if not year.isdigit() or first != int(f"{int(year) + 1:0{len(year)}d}001"):
+        return False
+    last_date = pd.to_datetime(local['date'].iloc[-1], errors='coerce') if 'date' in local.columns else pd.NaT
+    if pd.isna(last_date):
+        return False
+    return next_draw_time(game_type, last_date.to_pydatetime().replace(hour=23, minute=59)).year > last_date.year
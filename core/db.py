@@ -1,19 +1,109 @@
 import sqlite3
 import os
+import threading
 from datetime import datetime
 import json
+from core.metrics import span
 
 DB_PATH = os.path.join("data", "lottery.db")
 
-class Database:
+# Ticket columns of bets added after the first schema; created on old databases too.
+# reds/blues hold every selected ball, bankers (胆码) are a subset of them.
+BET_TICKET_COLUMNS = (
+    ("bet_type", "TEXT DEFAULT 'single'"),   # single / compound / banker (core.tickets)
+    ("red_bankers", "TEXT DEFAULT '[]'"),
+    ("blue_bankers", "TEXT DEFAULT '[]'"),
+    ("bet_count", "INTEGER DEFAULT 1"),      # single bets the ticket expands to
+    ("cost", "INTEGER DEFAULT 2"),
+    ("prize_detail", "TEXT"),                # {level: winning bets} of a multi-bet ticket
+)
+
+# Applied to every new connection
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",      # readers don't block the writer (scheduler vs web app)
+    "PRAGMA synchronous=NORMAL",    # durable with WAL, no fsync per commit
+    "PRAGMA cache_size=-65536",     # 64 MB page cache
+    "PRAGMA mmap_size=268435456",   # 256 MB memory-mapped reads
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+
+class ConnectionManager:
+    """
+    Process-wide SQLite connections: one per thread and database path,
+    configured with PRAGMAS. Schema setup runs once per process per path.
+    """
     def __init__(self):
-        os.makedirs("data", exist_ok=True)
-        self.conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-        self.conn.row_factory = sqlite3.Row
-        self._init_tables()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._initialized = set()
 
-    def _init_tables(self):
-        cursor = self.conn.cursor()
+    def get(self, db_path: str, init_schema) -> sqlite3.Connection:
+        pid = os.getpid()
+        # Connections inherited through fork() must not be reused
+        if getattr(self._local, 'pid', None) != pid:
+            self._local.pid = pid
+            self._local.conns = {}
+        
+        conn = self._local.conns.get(db_path)
+        if conn is None:
+            conn = sqlite3.connect(db_path)
+            conn.row_factory = sqlite3.Row
+            for pragma in PRAGMAS:
+                conn.execute(pragma)
+            self._local.conns[db_path] = conn
+        
+        key = (pid, db_path)
+        if key not in self._initialized:
+            with self._lock:
+                if key not in self._initialized:
+                    init_schema(conn)
+                    self._initialized.add(key)
+        return conn
+
+    def close(self, db_path: str):
+        conns = getattr(self._local, 'conns', None)
+        if conns and db_path in conns:
+            conns.pop(db_path).close()
+
+connections = ConnectionManager()
+
+class Database:
+    def __init__(self, db_path: str = DB_PATH):
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.db_path = os.path.abspath(db_path)
+        self.conn # Open this thread's connection and set up the schema if needed
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        return connections.get(self.db_path, Database._init_tables)
+
+    @staticmethod
+    def _migrate_bets(conn: sqlite3.Connection):
+        """
+        Add missing BET_TICKET_COLUMNS. The check is repeated inside BEGIN
+        IMMEDIATE, so when the web app and the scheduler migrate at once the
+        second one waits for the first and then finds nothing to add.
+        """
+        def missing():
+            existing = {row[1] for row in conn.execute('PRAGMA table_info(bets)').fetchall()}
+            return [(name, decl) for name, decl in BET_TICKET_COLUMNS if name not in existing]
+
+        if not missing():
+            return
+        conn.commit()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            for name, decl in missing():
+                conn.execute(f'ALTER TABLE bets ADD COLUMN {name} {decl}')
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    @staticmethod
+    def _init_tables(conn: sqlite3.Connection):
+        cursor = conn.cursor()
         # Bets table with user_id for isolation
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS bets (
@@ -30,6 +120,7 @@ class Database:
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         ''')
+        Database._migrate_bets(conn)
         # Daily Recommendations Table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS daily_recommendations (
@@ -49,10 +140,42 @@ class Database:
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         ''')
-        self.conn.commit()
+
+        # Analytics snapshots written by the scheduler (one per game)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS feature_snapshots (
+                game_type TEXT PRIMARY KEY,
+                data_version TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # Scheduler job ledger: one row per (game, draw) job
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS job_ledger (
+                game_type TEXT NOT NULL,
+                draw_time TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER DEFAULT 0,
+                next_run_at TEXT,
+                detail TEXT,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (game_type, draw_time)
+            )
+        ''')
+
+        # Indexes for the actual query shapes:
+        # bet history per user (newest first), pending-bet verification, daily recommendation lookup
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_bets_user_created ON bets (user_id, created_at)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_bets_user_game_created ON bets (user_id, game_type, created_at)')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_bets_pending ON bets (game_type, user_id, issue) WHERE status = 'pending'")
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_recommendations_lookup ON daily_recommendations (user_id, date_str, game_type)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_recommendations_day ON daily_recommendations (date_str, game_type)')
+        conn.commit()
 
     def close(self):
-        self.conn.close()
+        connections.close(self.db_path)
 
     # --- User Management ---
     def create_user(self, username, password_hash):
@@ -71,6 +194,7 @@ class Database:
 
     # --- Daily Recommendations ---
     
+    @span("db.get_daily_recommendation")
     def get_daily_recommendation(self, user_id: str, date_str: str, game_type: str):
         cursor = self.conn.cursor()
         cursor.execute('''
@@ -82,6 +206,7 @@ class Database:
             return json.loads(row['predictions'])
         return None
 
+    @span("db.save_daily_recommendation")
     def save_daily_recommendation(self, user_id: str, date_str: str, game_type: str, predictions: list):
         # Generate ID
         rec_id = f"{user_id}_{date_str}_{game_type}"
@@ -92,14 +217,90 @@ class Database:
         ''', (rec_id, user_id, date_str, game_type, json.dumps(predictions)))
         self.conn.commit()
 
-    # --- CRUD Operations ---
+    @span("db.save_daily_recommendations")
+    def save_daily_recommendations(self, rows: list):
+        """
+        Bulk insert of (user_id, date_str, game_type, predictions) rows in one transaction.
+        Rows that already exist are kept (a user may have extended theirs on the page).
+        """
+        with self.conn:
+            self.conn.executemany('''
+                INSERT OR IGNORE INTO daily_recommendations (id, user_id, date_str, game_type, predictions)
+                VALUES (?, ?, ?, ?, ?)
+            ''', [(f"{user_id}_{date_str}_{game_type}", user_id, date_str, game_type, json.dumps(predictions))
+                  for user_id, date_str, game_type, predictions in rows])
 
-    def add_bet(self, bet_data: dict):
+    def get_recommendation_users(self, date_str: str, game_type: str) -> set:
+        """Users who already have a recommendation for the day and game."""
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT user_id FROM daily_recommendations WHERE date_str = ? AND game_type = ?', (date_str, game_type))
+        return {row['user_id'] for row in cursor.fetchall()}
+
+    def get_active_users(self, since: str) -> list:
+        """Users with a bet or a recommendation created since the given date (YYYY-MM-DD)."""
         cursor = self.conn.cursor()
         cursor.execute('''
-            INSERT INTO bets (id, user_id, game_type, issue, reds, blues, status, note, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
+            SELECT user_id FROM bets WHERE created_at >= ?
+            UNION
+            SELECT user_id FROM daily_recommendations WHERE created_at >= ?
+            ORDER BY user_id
+        ''', (since, since))
+        return [row['user_id'] for row in cursor.fetchall()]
+
+    # --- Analytics Snapshots ---
+
+    @span("db.get_snapshot")
+    def get_snapshot(self, game_type: str):
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT data_version, payload FROM feature_snapshots WHERE game_type = ?', (game_type,))
+        row = cursor.fetchone()
+        if row:
+            return row['data_version'], json.loads(row['payload'])
+        return None
+
+    @span("db.save_snapshot")
+    def save_snapshot(self, game_type: str, data_version: str, payload: dict):
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            INSERT OR REPLACE INTO feature_snapshots (game_type, data_version, payload, created_at)
+            VALUES (?, ?, ?, ?)
+        ''', (game_type, data_version, json.dumps(payload), datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+        self.conn.commit()
+
+    # --- Job Ledger ---
+    # draw_time / next_run_at are "%Y-%m-%d %H:%M" strings, so they sort chronologically
+
+    def get_job(self, game_type: str, draw_time: str):
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT * FROM job_ledger WHERE game_type = ? AND draw_time = ?', (game_type, draw_time))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+
+    def last_done_job(self, game_type: str):
+        """draw_time of the latest completed job, or None."""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT MAX(draw_time) FROM job_ledger WHERE game_type = ? AND status = 'done'", (game_type,))
+        return cursor.fetchone()[0]
+
+    def record_jobs(self, game_type: str, draw_times: list, status: str, attempts: int = 1, next_run_at: str = None, detail: str = ""):
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self.conn:
+            self.conn.executemany('''
+                INSERT OR REPLACE INTO job_ledger (game_type, draw_time, status, attempts, next_run_at, detail, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', [(game_type, d, status, attempts, next_run_at, detail, now) for d in draw_times])
+
+    # --- CRUD Operations ---
+
+    _INSERT_BET = '''
+        INSERT INTO bets (id, user_id, game_type, issue, reds, blues, status, note, created_at,
+                          bet_type, red_bankers, blue_bankers, bet_count, cost)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    '''
+
+    @staticmethod
+    def _bet_row(bet_data: dict, created_at: str) -> tuple:
+        return (
             bet_data['id'],
             bet_data['user_id'],
             bet_data['game_type'],
@@ -108,10 +309,28 @@ class Database:
             json.dumps(bet_data['blues']),
             'pending',
             bet_data.get('note', ''),
-            datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        ))
+            created_at,
+            bet_data.get('bet_type', 'single'),
+            json.dumps(bet_data.get('red_bankers', [])),
+            json.dumps(bet_data.get('blue_bankers', [])),
+            bet_data.get('bet_count', 1),
+            bet_data.get('cost', 2),
+        )
+
+    @span("db.add_bet")
+    def add_bet(self, bet_data: dict):
+        cursor = self.conn.cursor()
+        cursor.execute(self._INSERT_BET, self._bet_row(bet_data, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
         self.conn.commit()
 
+    @span("db.add_bets")
+    def add_bets(self, bets: list):
+        """Bulk add_bet in one transaction."""
+        created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self.conn:
+            self.conn.executemany(self._INSERT_BET, [self._bet_row(b, created_at) for b in bets])
+
+    @span("db.get_bets")
     def get_bets(self, user_id: str = None, game_type: str = None):
         query = "SELECT * FROM bets WHERE 1=1"
         params = []
@@ -134,9 +353,39 @@ class Database:
             d = dict(row)
             d['reds'] = json.loads(d['reds'])
             d['blues'] = json.loads(d['blues'])
+            d['red_bankers'] = json.loads(d['red_bankers'] or '[]')
+            d['blue_bankers'] = json.loads(d['blue_bankers'] or '[]')
+            d['prize_detail'] = json.loads(d['prize_detail']) if d['prize_detail'] else None
             results.append(d)
         return results
 
+    @span("db.get_pending_bets")
+    def get_pending_bets(self, game_type: str, user_id: str = None):
+        query = "SELECT id, user_id, issue, reds, blues, bet_type, red_bankers, blue_bankers FROM bets WHERE status = 'pending' AND game_type = ?"
+        params = [game_type]
+        if user_id:
+            query += " AND user_id = ?"
+            params.append(user_id)
+        cursor = self.conn.cursor()
+        cursor.execute(query, params)
+        return cursor.fetchall()
+
+    @span("db.update_bet_statuses")
+    def update_bet_statuses(self, updates: list):
+        """
+        Bulk version of update_bet_status: updates is a list of
+        (prize_level, win_amount, prize_detail, bet_id) tuples, written in one
+        transaction. prize_detail is a JSON string or None for single bets.
+        """
+        with self.conn:
+            cursor = self.conn.executemany('''
+                UPDATE bets 
+                SET status = 'checked', prize_level = ?, win_amount = ?, prize_detail = ?
+                WHERE id = ?
+            ''', updates)
+        return cursor.rowcount
+
+    @span("db.update_bet_status")
     def update_bet_status(self, bet_id: str, prize_level: str, win_amount: int):
         cursor = self.conn.cursor()
         cursor.execute('''
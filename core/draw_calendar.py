@@ -0,0 +1,34 @@
+from datetime import datetime, timedelta
+from core.lottery import GameType
+
+# Weekly draw calendar (Beijing time): weekdays (Mon=0) and draw time
+DRAW_SCHEDULE = {
+    GameType.SSQ: ([1, 3, 6], "21:15"), # Tue, Thu, Sun
+    GameType.DLT: ([0, 2, 5], "21:25"), # Mon, Wed, Sat
+}
+
+def _draw_on(game_type: GameType, day: datetime) -> datetime:
+    _, draw_time = DRAW_SCHEDULE[game_type]
+    hour, minute = (int(x) for x in draw_time.split(":"))
+    return day.replace(hour=hour, minute=minute, second=0, microsecond=0)
+
+def next_draw_time(game_type: GameType, now: datetime = None) -> datetime:
+    """First draw strictly after `now` (default: the current time)."""
+    now = now or datetime.now()
+    draw_days, _ = DRAW_SCHEDULE[game_type]
+    for i in range(0, 8):
+        future = now + timedelta(days=i)
+        if future.weekday() in draw_days:
+            target = _draw_on(game_type, future)
+            if target > now:
+                return target
+    raise ValueError(f"No draw day configured for {game_type.value}")
+
+def draw_times_between(game_type: GameType, start: datetime, end: datetime) -> list:
+    """Draw times in (start, end], oldest first."""
+    draws = []
+    current = next_draw_time(game_type, start)
+    while current <= end:
+        draws.append(current)
+        current = next_draw_time(game_type, current)
+    return draws
@@ -0,0 +1,210 @@
+from collections import deque
+import numpy as np
+import pandas as pd
+from core.lottery import GameType, get_config
+
+# --- Helper Functions ---
+
+def get_ball_matrix(df: pd.DataFrame, prefix: str = 'red') -> np.ndarray:
+    """
+    Extract the ball columns matching prefix as an (n_draws, n_balls) int matrix.
+    Missing values become 0, which never matches a real ball number.
+    """
+    cols = [c for c in df.columns if prefix in c]
+    return df[cols].to_numpy(dtype=float, na_value=0.0).astype(np.int64)
+
+def calculate_omission_array(matrix: np.ndarray, max_num: int) -> np.ndarray:
+    """
+    Current omission for numbers 0..max_num from an (n_draws, n_balls) matrix,
+    oldest draw first. Index 0 is unused. Numbers never drawn get n_draws.
+    """
+    n = matrix.shape[0]
+    if n == 0:
+        return np.zeros(max_num + 1, dtype=np.int64)
+    matrix = np.where((matrix >= 1) & (matrix <= max_num), matrix, 0)
+    hit = np.zeros((n, max_num + 1), dtype=bool)
+    hit[np.arange(n)[:, None], matrix] = True
+    hit[:, 0] = False
+
+    # First hit scanning backwards from the latest draw = draws since last seen
+    rev = hit[::-1]
+    return np.where(rev.any(axis=0), rev.argmax(axis=0), n)
+
+def _draw_metrics(reds) -> tuple:
+    """(sum, span, road0, road1, road2, odd, even) for one draw's reds."""
+    roads = [0, 0, 0]
+    odd = 0
+    for n in reds:
+        roads[n % 3] += 1
+        odd += n % 2
+    return (sum(reds), max(reds) - min(reds), roads[0], roads[1], roads[2], odd, len(reds) - odd)
+
+# --- Main Classes ---
+
+class FeatureState:
+    """
+    Rolling history features that advance one draw at a time.
+
+    Holds what the strategies need from the history prefix: ball counts over
+    the last `freq_window` draws, the last-seen index of every number (for
+    omission) and running sum/span/012/odd-even totals over the last
+    `trend_lookback` draws (for trends).
+    """
+
+    def __init__(self, game_type: GameType, freq_window: int = 100, trend_lookback: int = 30):
+        self.game_type = game_type
+        self.config = get_config(game_type)
+        self.freq_window = freq_window
+        self.trend_lookback = trend_lookback
+
+        self.n_draws = 0
+        self.last_reds = []
+        self.last_blues = []
+
+        self.red_counts = np.zeros(self.config.red_range[1] + 1, dtype=np.int64)
+        self.blue_counts = np.zeros(self.config.blue_range[1] + 1, dtype=np.int64)
+        self.red_last_seen = np.full(self.config.red_range[1] + 1, -1, dtype=np.int64)
+        self.blue_last_seen = np.full(self.config.blue_range[1] + 1, -1, dtype=np.int64)
+
+        self._window = deque()
+        self._metrics = deque()
+        self._metric_totals = [0] * 7
+
+    @classmethod
+    def from_history(cls, game_type: GameType, history_df: pd.DataFrame, freq_window: int = 100, trend_lookback: int = 30):
+        """
+        Build the state for a whole history in bulk (no per-draw replay).
+        """
+        state = cls(game_type, freq_window, trend_lookback)
+        reds = get_ball_matrix(history_df, 'red')
+        blues = get_ball_matrix(history_df, 'blue')
+        n = len(reds)
+        state.n_draws = n
+        if n == 0:
+            return state
+
+        max_red = state.config.red_range[1]
+        max_blue = state.config.blue_range[1]
+        state.red_last_seen = n - 1 - calculate_omission_array(reds, max_red)
+        state.blue_last_seen = n - 1 - calculate_omission_array(blues, max_blue)
+
+        for r, b in zip(reds[-freq_window:].tolist(), blues[-freq_window:].tolist()):
+            state._window.append((r, b))
+        state.red_counts = state._bincount(reds[-freq_window:], max_red)
+        state.blue_counts = state._bincount(blues[-freq_window:], max_blue)
+
+        for r in reds[-trend_lookback:].tolist():
+            state._push_metrics(r)
+
+        state.last_reds = reds[-1].tolist()
+        state.last_blues = blues[-1].tolist()
+        return state
+
+    @staticmethod
+    def _bincount(matrix: np.ndarray, max_num: int) -> np.ndarray:
+        values = matrix.ravel()
+        values = values[(values >= 1) & (values <= max_num)]
+        return np.bincount(values, minlength=max_num + 1)
+
+    def _push_metrics(self, reds: list):
+        self._push_metrics_tuple(_draw_metrics(reds))
+
+    def _push_metrics_tuple(self, metrics: tuple):
+        self._metrics.append(metrics)
+        for j, v in enumerate(metrics):
+            self._metric_totals[j] += v
+        if len(self._metrics) > self.trend_lookback:
+            old = self._metrics.popleft()
+            for j, v in enumerate(old):
+                self._metric_totals[j] -= v
+
+    def advance(self, reds: list, blues: list):
+        """
+        Append one draw (the next in chronological order) to the state.
+        """
+        reds = [int(n) for n in reds]
+        blues = [int(n) for n in blues]
+        idx = self.n_draws
+
+        self.red_last_seen[reds] = idx
+        self.blue_last_seen[blues] = idx
+
+        self._window.append((reds, blues))
+        np.add.at(self.red_counts, reds, 1)
+        np.add.at(self.blue_counts, blues, 1)
+        if len(self._window) > self.freq_window:
+            old_reds, old_blues = self._window.popleft()
+            np.subtract.at(self.red_counts, old_reds, 1)
+            np.subtract.at(self.blue_counts, old_blues, 1)
+
+        self._push_metrics(reds)
+
+        self.last_reds = reds
+        self.last_blues = blues
+        self.n_draws += 1
+
+    # --- Serialization ---
+
+    def to_dict(self) -> dict:
+        """
+        JSON-serializable snapshot of the full state (see core.snapshot).
+        """
+        return {
+            "game_type": self.game_type.value,
+            "freq_window": self.freq_window,
+            "trend_lookback": self.trend_lookback,
+            "n_draws": self.n_draws,
+            "last_reds": list(self.last_reds),
+            "last_blues": list(self.last_blues),
+            "red_counts": self.red_counts.tolist(),
+            "blue_counts": self.blue_counts.tolist(),
+            "red_last_seen": self.red_last_seen.tolist(),
+            "blue_last_seen": self.blue_last_seen.tolist(),
+            "window": [list(draw) for draw in self._window],
+            "metrics": [list(m) for m in self._metrics],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "FeatureState":
+        state = cls(GameType(data["game_type"]), data["freq_window"], data["trend_lookback"])
+        state.n_draws = data["n_draws"]
+        state.last_reds = data["last_reds"]
+        state.last_blues = data["last_blues"]
+        state.red_counts = np.array(data["red_counts"], dtype=np.int64)
+        state.blue_counts = np.array(data["blue_counts"], dtype=np.int64)
+        state.red_last_seen = np.array(data["red_last_seen"], dtype=np.int64)
+        state.blue_last_seen = np.array(data["blue_last_seen"], dtype=np.int64)
+        state._window = deque((reds, blues) for reds, blues in data["window"])
+        for m in data["metrics"]:
+            state._push_metrics_tuple(tuple(m))
+        return state
+
+    # --- Feature Views ---
+
+    def red_omission_array(self) -> np.ndarray:
+        return self.n_draws - 1 - self.red_last_seen
+
+    def blue_omission_array(self) -> np.ndarray:
+        return self.n_draws - 1 - self.blue_last_seen
+
+    def red_omission(self) -> dict:
+        """Same shape as calculate_omission(df, max_red, 'red')."""
+        omission = self.red_omission_array()
+        return {i: int(omission[i]) for i in range(1, self.config.red_range[1] + 1)}
+
+    def blue_omission(self) -> dict:
+        """Same shape as calculate_omission(df, max_blue, 'blue')."""
+        omission = self.blue_omission_array()
+        return {i: int(omission[i]) for i in range(1, self.config.blue_range[1] + 1)}
+
+    def trends(self) -> dict:
+        """Same result as AnalysisUtils.analyze_recent_trends(df, game_type, trend_lookback)."""
+        count = len(self._metrics)
+        sum_total, span_total, road0, road1, road2, odd, even = self._metric_totals
+        road_counts = [road0, road1, road2]
+        return {
+            "avg_sum": sum_total / count,
+            "hot_road": road_counts.index(max(road_counts)),
+            "hot_odd_even": 'odd' if odd > even else 'even',
+            "avg_span": span_total / count
+        }
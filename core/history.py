@@ -0,0 +1,226 @@
+import os
+import json
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+from core.lottery import GameType, get_config
+
+try:
+    import fcntl
+except ImportError: # Windows
+    fcntl = None
+    import msvcrt
+
+# lock path -> [thread lock, hold depth, open lock file]
+_store_locks = {}
+_store_locks_guard = threading.Lock()
+
+@contextmanager
+def store_lock(directory: str):
+    """
+    Exclusive lock on a history store (the file <directory>.lock), held across
+    processes (web app, scheduler) and threads. Re-entrant within a thread.
+    """
+    path = os.path.abspath(directory) + ".lock"
+    with _store_locks_guard:
+        entry = _store_locks.setdefault(path, [threading.RLock(), 0, None])
+    with entry[0]:
+        if entry[1] == 0:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            f = open(path, "a+")
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            else:
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            entry[2] = f
+        entry[1] += 1
+        try:
+            yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                f, entry[2] = entry[2], None
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+                f.close()
+
+class DrawHistory:
+    """
+    Compact draw history: int32 issues, int8 ball matrices, datetime64 dates.
+
+    Saved as one .npy file per array and memory-mapped on load, so every
+    process reading the same directory shares one page-cached copy.
+    """
+
+    ARRAYS = ("issues", "reds", "blues", "dates")
+
+    # The store is a directory of immutable versions (v<ns>-<id>/ holding the
+    # arrays and meta.json) plus a CURRENT pointer naming the live one
+    POINTER = "CURRENT"
+
+    def __init__(self, game_type: GameType, issues: np.ndarray, reds: np.ndarray, blues: np.ndarray, dates: np.ndarray = None, issue_width: int = 5):
+        self.game_type = game_type
+        self.config = get_config(game_type)
+        self.issues = issues
+        self.reds = reds
+        self.blues = blues
+        self.dates = dates if dates is not None else np.full(len(issues), np.datetime64("NaT"), dtype="datetime64[D]")
+        self.issue_width = issue_width
+
+    def __len__(self):
+        return len(self.issues)
+
+    @classmethod
+    def from_frame(cls, game_type: GameType, df: pd.DataFrame) -> "DrawHistory":
+        """
+        Typed ingest of a history DataFrame (issue, red*, blue*, optional date columns).
+        Rows with missing balls are dropped, issues are deduplicated and ordered,
+        and out-of-range balls raise ValueError.
+        """
+        config = get_config(game_type)
+        red_cols = [c for c in df.columns if 'red' in c]
+        blue_cols = [c for c in df.columns if 'blue' in c]
+        if len(red_cols) != config.red_count or len(blue_cols) != config.blue_count:
+            raise ValueError(f"Unexpected ball columns for {game_type.value}: {red_cols + blue_cols}")
+
+        df = df.dropna(subset=red_cols + blue_cols)
+        issue_str = df['issue'].astype(str)
+        issue_num = issue_str.astype(np.int64)
+        df = df.assign(_issue=issue_num).drop_duplicates('_issue', keep='last').sort_values('_issue', kind='stable')
+        issue_str = df['issue'].astype(str)
+
+        red_values = df[red_cols].to_numpy(dtype=float)
+        blue_values = df[blue_cols].to_numpy(dtype=float)
+        if ((red_values < config.red_range[0]) | (red_values > config.red_range[1])).any() or \
+           ((blue_values < config.blue_range[0]) | (blue_values > config.blue_range[1])).any():
+            raise ValueError(f"Ball numbers out of range in {game_type.value} history")
+
+        issues = np.ascontiguousarray(df['_issue'].to_numpy(), dtype=np.int32)
+        reds = np.ascontiguousarray(red_values, dtype=np.int8)
+        blues = np.ascontiguousarray(blue_values, dtype=np.int8)
+        if 'date' in df.columns:
+            dates = pd.to_datetime(df['date'], errors='coerce').to_numpy().astype("datetime64[D]")
+        else:
+            dates = None
+        issue_width = int(issue_str.str.len().max()) if len(df) else 5
+        return cls(game_type, issues, reds, blues, dates, issue_width)
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        DataFrame in the layout of the history CSV (zero-padded str issues).
+        """
+        data = {'issue': np.char.zfill(self.issues.astype(str), self.issue_width)}
+        for j in range(self.reds.shape[1]):
+            data[f'red{j + 1}'] = self.reds[:, j].astype(np.int64)
+        if self.blues.shape[1] == 1:
+            data['blue'] = self.blues[:, 0].astype(np.int64)
+        else:
+            for j in range(self.blues.shape[1]):
+                data[f'blue{j + 1}'] = self.blues[:, j].astype(np.int64)
+        if not np.isnat(self.dates).all():
+            data['date'] = np.datetime_as_string(self.dates, unit='D')
+        df = pd.DataFrame(data)
+        df['issue'] = df['issue'].astype(str)
+        return df
+
+    # --- Persistence ---
+
+    def save(self, directory: str, source: list = None):
+        """
+        Write the arrays and meta.json into a new version subdirectory, then
+        swap the CURRENT pointer to it with one os.replace: readers see either
+        the old or the new set of files, never a mix. The version before is
+        kept for readers that resolved the old pointer; older ones are removed.
+        `source` identifies the file the history was ingested from (see DataLoader).
+        """
+        os.makedirs(directory, exist_ok=True)
+        version = f"v{time.time_ns()}-{uuid.uuid4().hex[:8]}"
+        version_dir = os.path.join(directory, version)
+        os.makedirs(version_dir)
+        for name in self.ARRAYS:
+            with open(os.path.join(version_dir, f"{name}.npy"), "wb") as f:
+                np.save(f, getattr(self, name))
+        meta = {"game_type": self.game_type.value, "issue_width": self.issue_width, "count": len(self)}
+        with open(os.path.join(version_dir, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+        previous = DrawHistory._read_pointer(directory).get("version") if DrawHistory.exists(directory) else None
+        DrawHistory._write_pointer(directory, {"version": version, "source": source})
+        DrawHistory._prune(directory, older_than=previous or version)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "DrawHistory":
+        """
+        Load the current version, memory-mapping the arrays read-only by default.
+        """
+        mode = 'r' if mmap else None
+        for attempt in range(3):
+            try:
+                meta = cls.read_meta(directory)
+                version_dir = os.path.join(directory, meta["version"])
+                arrays = {name: np.load(os.path.join(version_dir, f"{name}.npy"), mmap_mode=mode) for name in cls.ARRAYS}
+                break
+            except FileNotFoundError:
+                # Pruned between reading the pointer and opening it: a newer one is live
+                if attempt == 2:
+                    raise
+        if any(len(a) != meta["count"] for a in arrays.values()):
+            raise ValueError(f"Inconsistent history store at {version_dir}")
+        return cls(GameType(meta["game_type"]), arrays["issues"], arrays["reds"], arrays["blues"], arrays["dates"], meta["issue_width"])
+
+    @staticmethod
+    def read_meta(directory: str) -> dict:
+        """meta.json of the current version plus the pointer's 'version' and 'source'."""
+        pointer = DrawHistory._read_pointer(directory)
+        with open(os.path.join(directory, pointer["version"], "meta.json")) as f:
+            return {**json.load(f), **pointer}
+
+    @staticmethod
+    def set_source(directory: str, source: list):
+        """Re-key the current version to another source without rewriting it."""
+        DrawHistory._write_pointer(directory, {**DrawHistory._read_pointer(directory), "source": source})
+
+    @staticmethod
+    def _read_pointer(directory: str) -> dict:
+        with open(os.path.join(directory, DrawHistory.POINTER)) as f:
+            return json.load(f)
+
+    @staticmethod
+    def _write_pointer(directory: str, pointer: dict):
+        # Unique temp name: concurrent writers never share (or clobber) a temp file
+        tmp_path = os.path.join(directory, f".{DrawHistory.POINTER}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(pointer, f)
+        os.replace(tmp_path, os.path.join(directory, DrawHistory.POINTER))
+
+    @staticmethod
+    def _version_time(name: str) -> int:
+        try:
+            return int(name[1:].split("-")[0])
+        except ValueError:
+            return -1
+
+    @staticmethod
+    def _prune(directory: str, older_than: str):
+        """
+        Remove versions created before older_than (versions written concurrently
+        are newer, so never removed half-written), and files of the old flat layout.
+        """
+        cutoff = DrawHistory._version_time(older_than)
+        for entry in os.listdir(directory):
+            path = os.path.join(directory, entry)
+            if entry.startswith("v") and os.path.isdir(path) and DrawHistory._version_time(entry) < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+            elif entry == "meta.json" or (entry.endswith(".npy") and entry[:-4] in DrawHistory.ARRAYS):
+                os.remove(path)
+
+    @staticmethod
+    def exists(directory: str) -> bool:
+        return os.path.exists(os.path.join(directory, DrawHistory.POINTER))
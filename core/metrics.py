@@ -0,0 +1,166 @@
+import bisect
+import os
+import threading
+import time
+from contextlib import ContextDecorator, contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Latency histogram buckets in seconds (upper bounds, Prometheus style)
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+METRIC_NAME = "lottery_span_seconds"
+
+class SpanStats:
+    """Count, total and bucket counts of one span's latencies."""
+    __slots__ = ("count", "total", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1) # last one is +Inf
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+
+class Registry:
+    """
+    Process-wide span statistics. Thread-safe; the web app sessions, the
+    scheduler stages and pool workers each record into their own process.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._local = threading.local()
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = SpanStats()
+            stats.observe(seconds)
+        recording = getattr(self._local, 'recording', None)
+        if recording is not None:
+            recording.append((name, self._local.depth, seconds))
+
+    def snapshot(self) -> dict:
+        """{name: (count, total, bucket counts)} copy of the current statistics."""
+        with self._lock:
+            return {name: (s.count, s.total, list(s.buckets)) for name, s in self._stats.items()}
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    # --- Per-thread recording (one Streamlit rerun, one scheduler run) ---
+
+    def start_recording(self) -> list:
+        """
+        Collect the spans finished in this thread from now on as a list of
+        (name, depth, seconds), in completion order (children before parents).
+        """
+        spans = []
+        self._local.recording = spans
+        return spans
+
+    def stop_recording(self):
+        self._local.recording = None
+
+    @contextmanager
+    def record(self):
+        """start_recording/stop_recording around a block."""
+        previous = getattr(self._local, 'recording', None)
+        spans = self.start_recording()
+        try:
+            yield spans
+        finally:
+            self._local.recording = previous
+
+    def _enter(self):
+        self._local.depth = getattr(self._local, 'depth', 0) + 1
+
+    def _exit(self):
+        self._local.depth -= 1
+
+registry = Registry()
+
+class span(ContextDecorator):
+    """
+    Time a block or a function under `name`:
+
+        with span("scheduler.update"):
+            ...
+
+        @span("data.load_data")
+        def load_data(...):
+            ...
+    """
+    def __init__(self, name: str, registry: Registry = registry):
+        self.name = name
+        self.registry = registry
+        self._starts = threading.local()
+
+    def __enter__(self):
+        self.registry._enter()
+        starts = getattr(self._starts, 'stack', None)
+        if starts is None:
+            starts = self._starts.stack = []
+        starts.append(time.perf_counter())
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self._starts.stack.pop()
+        self.registry._exit()
+        self.registry.observe(self.name, seconds)
+        return False
+
+# --- Export ---
+
+def to_prometheus(reg: Registry = registry) -> str:
+    """All spans as a Prometheus text-format histogram."""
+    lines = [
+        f"# HELP {METRIC_NAME} Latency of instrumented code spans.",
+        f"# TYPE {METRIC_NAME} histogram",
+    ]
+    for name, (count, total, buckets) in sorted(reg.snapshot().items()):
+        cumulative = 0
+        for bound, n in zip(BUCKETS + (float('inf'),), buckets):
+            cumulative += n
+            le = "+Inf" if bound == float('inf') else repr(bound)
+            lines.append(f'{METRIC_NAME}_bucket{{span="{name}",le="{le}"}} {cumulative}')
+        lines.append(f'{METRIC_NAME}_sum{{span="{name}"}} {total:.6f}')
+        lines.append(f'{METRIC_NAME}_count{{span="{name}"}} {count}')
+    return "\n".join(lines) + "\n"
+
+def write_textfile(path: str, reg: Registry = registry):
+    """
+    Write the Prometheus text to path atomically (node_exporter textfile
+    collector format), e.g. after every scheduler run.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp" # concurrent writers don't share a temp file
+    with open(tmp_path, "w") as f:
+        f.write(to_prometheus(reg))
+    os.replace(tmp_path, path)
+
+def start_http_server(port: int, host: str = "127.0.0.1", reg: Registry = registry) -> ThreadingHTTPServer:
+    """Serve GET /metrics in a daemon thread; returns the server."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = to_prometheus(reg).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,67 @@
+from fractions import Fraction
+from math import comb
+from core.lottery import GameType, get_config
+from core.prize import PrizeCalculator
+
+TICKET_PRICE = 2 # 2 RMB per bet
+
+# Exact odds of a single random ticket. A ticket and a draw pick the same number
+# of balls from each pool, so the hits in each pool are hypergeometric and the
+# red and blue pools are independent.
+
+def _hit_distribution(pool: int, picks: int) -> list:
+    """P(h matches) for h = 0..picks when a ticket and a draw both pick `picks` of `pool`."""
+    total = comb(pool, picks)
+    return [Fraction(comb(picks, h) * comb(pool - picks, picks - h), total) for h in range(picks + 1)]
+
+def outcome_probabilities(game_type: GameType) -> dict:
+    """
+    Exact probability (Fraction) of every (red_hits, blue_hits) outcome.
+    """
+    config = get_config(game_type)
+    red_pool = config.red_range[1] - config.red_range[0] + 1
+    blue_pool = config.blue_range[1] - config.blue_range[0] + 1
+    red_p = _hit_distribution(red_pool, config.red_count)
+    blue_p = _hit_distribution(blue_pool, config.blue_count)
+    return {(r, b): red_p[r] * blue_p[b] for r in range(len(red_p)) for b in range(len(blue_p))}
+
+def tier_probabilities(game_type: GameType) -> list:
+    """
+    One row per prize level, highest prize first:
+    {level, amount, description, probability, odds} where odds is "1 in N".
+    """
+    tiers = {}
+    for (r, b), p in outcome_probabilities(game_type).items():
+        prize = PrizeCalculator.calculate(game_type, r, b)
+        if prize.amount == 0:
+            continue
+        row = tiers.setdefault(prize.level, {"level": prize.level, "amount": prize.amount, "description": prize.description, "probability": Fraction(0)})
+        row["probability"] += p
+    rows = sorted(tiers.values(), key=lambda row: -row["amount"])
+    for row in rows:
+        row["odds"] = float(1 / row["probability"])
+        row["probability"] = float(row["probability"])
+    return rows
+
+def ticket_expectation(game_type: GameType, price: int = TICKET_PRICE) -> dict:
+    """
+    Expected prize, net and ROI of one random ticket, plus its chance of winning anything.
+    Floating top prizes count at the fixed estimate PrizeCalculator uses.
+    """
+    expected_prize = Fraction(0)
+    win_probability = Fraction(0)
+    for (r, b), p in outcome_probabilities(game_type).items():
+        amount = PrizeCalculator.calculate(game_type, r, b).amount
+        expected_prize += p * amount
+        if amount > 0:
+            win_probability += p
+    return {
+        "expected_prize": float(expected_prize),
+        "expected_net": float(expected_prize - price),
+        "roi": float((expected_prize - price) / price),
+        "win_probability": float(win_probability),
+    }
+
+def issue_win_probability(game_type: GameType, bets: int) -> float:
+    """Chance that at least one of `bets` independent random tickets wins in an issue."""
+    return 1 - (1 - ticket_expectation(game_type)["win_probability"]) ** bets
@@ -0,0 +1,77 @@
+import json
+import os
+import threading
+from dataclasses import dataclass, asdict, fields
+from core.lottery import GameType
+
+TUNING_DIR = os.path.join("data", "tuning")
+
+# Best composite parameters per game, written by the tuner (tune.py)
+PARAMS_PATH = os.path.join(TUNING_DIR, "composite_params.json")
+
+@dataclass(frozen=True)
+class CompositeParams:
+    """Tuning of Predictor.composite_predict / predict_many."""
+    kill_count: int = 3          # coldest reds (highest omission) excluded
+    blue_weight: float = 3.0     # blue weight = (count + 1) * blue_weight
+    repeat_boost: float = 2.5    # reds of the last draw
+    cold_omission: int = 20      # reds missing for more draws than this ...
+    cold_boost: float = 1.5      # ... get this boost
+    road_boost: float = 1.2      # reds on the hot 012 road
+    odd_even_boost: float = 1.2  # reds of the hot parity
+    sum_low: float = 0.8         # red sum window, relative to the recent average
+    sum_high: float = 1.2
+    max_retries: int = 2000      # candidates drawn per ticket before giving up on the filters
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "CompositeParams":
+        """Unknown keys are ignored, missing ones keep their defaults; values are cast to the field types."""
+        types = {f.name: f.type for f in fields(cls)}
+        return cls(**{k: types[k](v) for k, v in data.items() if k in types})
+
+    def key(self) -> str:
+        """Stable string identifying the parameter values (cache key)."""
+        return json.dumps(self.to_dict(), sort_keys=True)
+
+# path -> ((mtime, size), {game: CompositeParams})
+_params_memo = {}
+_memo_lock = threading.Lock()
+
+def load_params(game_type: GameType, path: str = PARAMS_PATH) -> CompositeParams:
+    """
+    Saved parameters for game_type, or the defaults. The file is re-read only
+    when it changes, so predict_many can call this every time.
+    """
+    try:
+        stat = os.stat(path)
+        mtime = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return CompositeParams()
+    with _memo_lock:
+        cached = _params_memo.get(path)
+        if cached is None or cached[0] != mtime:
+            try:
+                with open(path) as f:
+                    saved = json.load(f)
+                cached = (mtime, {game: CompositeParams.from_dict(entry["params"]) for game, entry in saved.items()})
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                print(f"Ignoring tuned parameters in {path}: {e}")
+                cached = (mtime, {})
+            _params_memo[path] = cached
+    return cached[1].get(game_type.value, CompositeParams())
+
+def save_params(game_type: GameType, params: CompositeParams, info: dict = None, path: str = PARAMS_PATH):
+    """Store params (plus e.g. their backtest metrics) as the game's tuned configuration."""
+    saved = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            saved = json.load(f)
+    saved[game_type.value] = {"params": params.to_dict(), **(info or {})}
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(saved, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
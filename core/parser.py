@@ -0,0 +1,139 @@
+import re
+from io import BytesIO
+import numpy as np
+from lxml import etree
+from core.lottery import GameType, get_config
+from core.history import DrawHistory
+
+# Header captions of the columns we read (first header row of the 500.com table)
+ISSUE_HEADERS = ("期号",)
+BALL_HEADERS = ("中奖号码", "开奖号码")
+DATE_HEADERS = ("开奖日期", "日期")
+
+# Chinese sites often declare gb2312, whose superset gb18030 decodes them safely
+_CHARSET = re.compile(rb"""charset=["']?([A-Za-z0-9_-]+)""")
+_CHARSET_ALIASES = {"gb2312": "gb18030", "gbk": "gb18030"}
+
+def detect_encoding(content: bytes) -> str:
+    """Encoding declared in the page's <meta> (first 4 KB), utf-8 if none."""
+    match = _CHARSET.search(content[:4096])
+    if not match:
+        return "utf-8"
+    charset = match.group(1).decode("ascii").lower()
+    return _CHARSET_ALIASES.get(charset, charset)
+
+def _text(elem) -> str:
+    return "".join(elem.itertext()).strip()
+
+def _cells(row) -> list:
+    # Real pages put commented-out cells in rows; only element children count
+    return [c for c in row if isinstance(c.tag, str) and c.tag in ("td", "th")]
+
+def detect_layout(header_row, game_type: GameType) -> dict:
+    """
+    Column positions from the first header row: {'issue': i, 'balls': [j, ...], 'date': k or None}.
+    Positions count colspans, so grouped headers (一等奖 注数/奖金) keep later columns aligned.
+    """
+    config = get_config(game_type)
+    layout = {'issue': None, 'balls': None, 'date': None}
+    col = 0
+    for cell in _cells(header_row):
+        span = int(cell.get("colspan", 1) or 1)
+        caption = _text(cell)
+        if caption in ISSUE_HEADERS:
+            layout['issue'] = col
+        elif caption in BALL_HEADERS:
+            layout['balls'] = list(range(col, col + span))
+        elif caption in DATE_HEADERS:
+            layout['date'] = col
+        col += span
+
+    n_balls = config.red_count + config.blue_count
+    if layout['issue'] is None or layout['balls'] is None:
+        raise ValueError(f"History table header not recognized for {game_type.value}")
+    if len(layout['balls']) != n_balls:
+        raise ValueError(f"Expected {n_balls} ball columns for {game_type.value}, header spans {len(layout['balls'])}")
+    return layout
+
+def parse_history_page(content: bytes, game_type: GameType) -> DrawHistory:
+    """
+    Stream the draw table out of a 500.com history page into a DrawHistory
+    (typed arrays, oldest issue first).
+
+    The page is read with lxml iterparse; every row is converted as soon as it
+    is complete and then dropped from the tree, so memory stays flat however
+    many draws the page lists. The header row is found by its captions (期号,
+    中奖号码), whether its cells are <th> or <td>. Rows without a numeric issue,
+    with missing balls or with balls out of range are skipped (the latter
+    logged). Raises ValueError when no recognizable table is found.
+    """
+    config = get_config(game_type)
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+
+    layout = None
+    issues, balls, dates = [], [], []
+    issue_width = 0
+    table_depth = 0
+    n_reds = config.red_count
+    skipped = []
+
+    for event, elem in etree.iterparse(BytesIO(content), events=("start", "end"), html=True, encoding=detect_encoding(content)):
+        tag = elem.tag
+        if tag == "table":
+            table_depth += 1 if event == "start" else -1
+            continue
+        if event != "end" or tag != "tr" or table_depth == 0:
+            continue
+
+        cells = _cells(elem)
+        if layout is None:
+            if any(_text(c) in ISSUE_HEADERS for c in cells):
+                try:
+                    layout = detect_layout(elem, game_type)
+                except ValueError as e:
+                    print(f"Skipping table header: {e}") # e.g. a search form; keep looking
+        elif len(cells) > max(layout['balls']):
+            issue = _text(cells[layout['issue']])
+            row_balls = [_text(cells[j]) for j in layout['balls']]
+            if issue.isdigit() and all(b.isdigit() for b in row_balls):
+                row_balls = [int(b) for b in row_balls]
+                if all(config.red_range[0] <= b <= config.red_range[1] for b in row_balls[:n_reds]) and \
+                   all(config.blue_range[0] <= b <= config.blue_range[1] for b in row_balls[n_reds:]):
+                    issues.append(int(issue))
+                    issue_width = max(issue_width, len(issue))
+                    balls.append(row_balls)
+                    date_idx = layout['date']
+                    dates.append(_text(cells[date_idx]) if date_idx is not None and date_idx < len(cells) else "")
+                else:
+                    skipped.append(issue)
+
+        # Done with this row: free it and everything before it
+        elem.clear()
+        parent = elem.getparent()
+        if parent is not None:
+            while elem.getprevious() is not None:
+                del parent[0]
+
+    if layout is None:
+        raise ValueError("No draw table found in response")
+    if skipped:
+        print(f"Skipped {len(skipped)} {game_type.value} rows with balls out of range: {', '.join(skipped[:10])}")
+
+    issues = np.array(issues, dtype=np.int64)
+    balls = np.array(balls, dtype=np.int64).reshape(len(issues), config.red_count + config.blue_count)
+    reds, blues = balls[:, :n_reds], balls[:, n_reds:]
+
+    # Oldest first; a repeated issue keeps its last row
+    order = np.argsort(issues, kind="stable")
+    keep = np.append(issues[order][1:] != issues[order][:-1], True) if len(order) else np.zeros(0, dtype=bool)
+    order = order[keep]
+    date_values = np.array([d or "NaT" for d in dates], dtype="datetime64[D]") if any(dates) else None
+    return DrawHistory(
+        game_type,
+        issues[order].astype(np.int32),
+        reds[order].astype(np.int8),
+        blues[order].astype(np.int8),
+        date_values[order] if date_values is not None else None,
+        issue_width or 5,
+    )
@@ -1,8 +1,14 @@
+from collections import Counter
 from dataclasses import dataclass
 from enum import Enum
-from core.lottery import GameType
+from math import comb
+import numpy as np
+from core.lottery import GameType, get_config
 
-@dataclass
+# Level codes used by the lookup tables: 0 = no prize, n = the n-th prize (n等奖)
+LEVEL_NAMES = ["未中奖", "一等奖", "二等奖", "三等奖", "四等奖", "五等奖", "六等奖", "七等奖", "八等奖", "九等奖"]
+
+@dataclass(frozen=True)
 class PrizeResult:
     level: str      # 奖级 (如 "一等奖")
     amount: int     # 固定奖金金额 (浮动奖通常设为预估值)
@@ -53,9 +59,95 @@ class PrizeCalculator:
 
     @staticmethod
     def calculate(game_type: GameType, red_hits: int, blue_hits: int) -> PrizeResult:
-        if game_type == GameType.SSQ:
-            return PrizeCalculator.calc_ssq(red_hits, blue_hits)
-        elif game_type == GameType.DLT:
-            return PrizeCalculator.calc_dlt(red_hits, blue_hits)
-        else:
+        table = _RESULTS.get(game_type)
+        if table is None:
             return PrizeResult("未知", 0, "未知彩种")
+        # Outside the table (e.g. negative or too many hits) nothing is won
+        if not (0 <= red_hits < len(table) and 0 <= blue_hits < len(table[0])):
+            return PrizeResult("未中奖", 0, "未达标")
+        return table[red_hits][blue_hits]
+
+    @staticmethod
+    def calculate_many(game_type: GameType, red_hits, blue_hits):
+        """
+        Vectorized calculate: (amounts int64, level codes int8) for arrays of hits,
+        one fancy-index lookup into the (red_hits x blue_hits) tables.
+        Decode level codes with LEVEL_NAMES. Hit counts outside the table raise
+        ValueError.
+        """
+        amounts, codes = _TABLES[game_type]
+        red_hits = np.asarray(red_hits)
+        blue_hits = np.asarray(blue_hits)
+        for hits, size, name in ((red_hits, amounts.shape[0], "red"), (blue_hits, amounts.shape[1], "blue")):
+            if hits.size and (hits.min() < 0 or hits.max() >= size):
+                raise ValueError(f"{name} hits out of range 0..{size - 1} for {game_type.value}")
+        # Flat index in uint8 (hit counts are tiny): one cheap pass, then two takes
+        idx = red_hits.astype(np.uint8) * np.uint8(amounts.shape[1]) + blue_hits.astype(np.uint8)
+        return amounts.ravel()[idx], codes.ravel()[idx]
+
+    @staticmethod
+    def calculate_ticket(game_type: GameType, red_hits: int, blue_hits: int, n_reds: int, n_blues: int,
+                         red_bankers: int = 0, red_banker_hits: int = 0, blue_bankers: int = 0, blue_banker_hits: int = 0):
+        """
+        Prize of a compound (复式) or banker (胆拖) ticket without expanding it.
+
+        Hits and sizes are per pool: n_reds balls selected (bankers included) of
+        which red_hits were drawn; red_bankers of them are bankers with
+        red_banker_hits drawn. Every single bet has the bankers plus a choice of
+        drags, so the number of bets with each hit count is a product of binomials.
+        Returns (total amount, Counter {level name: winning bets}).
+        """
+        config = get_config(game_type)
+        red_counts = hit_combinations(n_reds, red_hits, red_bankers, red_banker_hits, config.red_count)
+        blue_counts = hit_combinations(n_blues, blue_hits, blue_bankers, blue_banker_hits, config.blue_count)
+        grid = _RESULTS[game_type]
+        total = 0
+        levels = Counter()
+        for r, n_r in enumerate(red_counts):
+            if not n_r:
+                continue
+            for b, n_b in enumerate(blue_counts):
+                prize = grid[r][b]
+                if n_b and prize.amount:
+                    n = n_r * n_b
+                    total += n * prize.amount
+                    levels[prize.level] += n
+        return total, levels
+
+    @staticmethod
+    def table(game_type: GameType):
+        """(amounts, level codes) indexed by [red_hits, blue_hits]; read-only."""
+        return _TABLES[game_type]
+
+def hit_combinations(n_picked: int, hits: int, n_bankers: int, banker_hits: int, select: int) -> list:
+    """
+    Bets with 0..select hits among the comb(n_picked - n_bankers, select - n_bankers)
+    single bets of one pool: bankers always play, the rest is a choice of drags.
+    """
+    drags, drag_hits, k = n_picked - n_bankers, hits - banker_hits, select - n_bankers
+    counts = [0] * (select + 1)
+    for j in range(min(drag_hits, k) + 1):
+        counts[banker_hits + j] = comb(drag_hits, j) * comb(drags - drag_hits, k - j)
+    return counts
+
+# --- Lookup Tables ---
+
+def _build_tables():
+    """
+    Every (red_hits, blue_hits) outcome is priced once with the rule chains above.
+    """
+    results = {}
+    tables = {}
+    rules = {GameType.SSQ: PrizeCalculator.calc_ssq, GameType.DLT: PrizeCalculator.calc_dlt}
+    for game_type, rule in rules.items():
+        config = get_config(game_type)
+        grid = [[rule(r, b) for b in range(config.blue_count + 1)] for r in range(config.red_count + 1)]
+        amounts = np.array([[res.amount for res in row] for row in grid], dtype=np.int64)
+        codes = np.array([[LEVEL_NAMES.index(res.level) for res in row] for row in grid], dtype=np.int8)
+        amounts.flags.writeable = False
+        codes.flags.writeable = False
+        results[game_type] = grid
+        tables[game_type] = (amounts, codes)
+    return results, tables
+
+_RESULTS, _TABLES = _build_tables()
@@ -0,0 +1,68 @@
+import hashlib
+from datetime import datetime, timedelta
+import pandas as pd
+from core.analysis import Predictor
+from core.db import Database
+from core.draw_calendar import next_draw_time
+from core.lottery import GameType
+from core.metrics import span
+from core.snapshot import load_features
+
+# Tickets pre-generated per user and day (the prediction page's default count)
+DEFAULT_COUNT = 5
+
+# Users with a bet or a recommendation this recent count as active
+ACTIVE_DAYS = 30
+
+def daily_seed(user_id: str, day: datetime = None) -> int:
+    """Seed of a user's recommendations for one day (default: today)."""
+    date_str = (day or datetime.now()).strftime("%Y%m%d")
+    seed_str = f"{date_str}_{user_id}"
+    return int(hashlib.sha256(seed_str.encode()).hexdigest(), 16) % (2**32)
+
+def recommendation_days(game_type: GameType, now: datetime = None) -> list:
+    """
+    Days served by the current data: today up to and including the next draw day.
+    The history can't change before that draw, so their tickets are final.
+    """
+    now = now or datetime.now()
+    last = next_draw_time(game_type, now).date()
+    day = now.date()
+    days = []
+    while day <= last:
+        days.append(datetime.combine(day, datetime.min.time()))
+        day += timedelta(days=1)
+    return days
+
+@span("recommend.pregenerate")
+def pregenerate_daily_recommendations(db: Database, game_type: GameType, df: pd.DataFrame, days: list = None, user_ids: list = None, count: int = DEFAULT_COUNT) -> int:
+    """
+    Generate and store every active user's recommendations for `days` in bulk.
+
+    Features are computed once (or restored from the snapshot) and shared; each
+    user's tickets use daily_seed, so they equal what the prediction page would
+    generate on demand. Users who already have a row for a day keep it.
+    Returns the number of rows inserted.
+    """
+    if df.empty:
+        return 0
+    days = days or recommendation_days(game_type)
+    if user_ids is None:
+        since = (datetime.now() - timedelta(days=ACTIVE_DAYS)).strftime("%Y-%m-%d")
+        user_ids = db.get_active_users(since)
+    if not user_ids:
+        return 0
+
+    features = load_features(db, game_type, df)
+    rows = []
+    for day in days:
+        date_str = day.strftime("%Y-%m-%d")
+        existing = db.get_recommendation_users(date_str, game_type.value)
+        for user_id in user_ids:
+            if user_id in existing:
+                continue
+            predictions = Predictor.predict_many(game_type, df, count, seed_base=daily_seed(user_id, day), features=features)
+            rows.append((user_id, date_str, game_type.value, predictions))
+
+    db.save_daily_recommendations(rows)
+    return len(rows)
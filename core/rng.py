@@ -0,0 +1,31 @@
+import random
+import numpy as np
+
+# Predictors and simulators draw from an explicit numpy Generator instead of the
+# global `random` module, so concurrent sessions and worker threads never share
+# (or reseed) one another's state. A Generator must not be shared between
+# threads either: give each its own, spawned from one seed.
+
+def make_rng(rng=None) -> np.random.Generator:
+    """
+    A numpy Generator from rng: a Generator is used as is, a random.Random
+    seeds a new one from its stream, anything else (None, int, sequence of ints,
+    SeedSequence) goes to np.random.default_rng (None = fresh OS entropy).
+    """
+    if isinstance(rng, np.random.Generator):
+        return rng
+    if isinstance(rng, random.Random):
+        return np.random.default_rng(rng.getrandbits(128))
+    return np.random.default_rng(rng)
+
+def spawn_rngs(seed, n: int) -> list:
+    """
+    n independent Generators derived from seed (int, sequence of ints,
+    SeedSequence or Generator) by seed-sequence spawning; the same seed always
+    yields the same streams, whichever thread or process uses them.
+    """
+    if isinstance(seed, np.random.Generator):
+        return seed.spawn(n)
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    return [np.random.default_rng(child) for child in seed.spawn(n)]
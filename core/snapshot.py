@@ -0,0 +1,55 @@
+import json
+import pandas as pd
+from core.lottery import GameType
+from core.db import Database
+from core.features import FeatureState
+from core.analysis import Predictor
+from core.aggregates import data_version
+
+# Analytics snapshots: the scheduler computes the per-game features once after
+# each data update and stores them with the data version they were built from.
+# Readers use a snapshot only while its version matches their history.
+
+def _version_key(game_type: GameType, df: pd.DataFrame) -> str:
+    return json.dumps(list(data_version(game_type, df)))
+
+def build_snapshot(game_type: GameType, df: pd.DataFrame) -> dict:
+    """
+    Feature state (what load_features restores for predictions and the
+    scheduler's recommendations) plus the composite kill list for the log.
+    The dashboard has its own per-version cache (core.aggregates).
+    """
+    features = FeatureState.from_history(game_type, df)
+    red_pop, _, _, _, _ = Predictor.composite_weights(game_type, features)
+    config = features.config
+    kill_reds = [n for n in range(config.red_range[0], config.red_range[1] + 1) if n not in set(red_pop.tolist())]
+    return {
+        "features": features.to_dict(),
+        "kill_reds": kill_reds,
+    }
+
+def save_snapshot(db: Database, game_type: GameType, df: pd.DataFrame) -> dict:
+    """Compute and persist the snapshot for df. Called by the scheduler after an update."""
+    snapshot = build_snapshot(game_type, df)
+    db.save_snapshot(game_type.value, _version_key(game_type, df), snapshot)
+    return snapshot
+
+def load_snapshot(db: Database, game_type: GameType, df: pd.DataFrame):
+    """The stored snapshot if it was built from df's data version, else None."""
+    row = db.get_snapshot(game_type.value)
+    if row is None:
+        return None
+    version, snapshot = row
+    if version != _version_key(game_type, df):
+        return None
+    return snapshot
+
+def load_features(db: Database, game_type: GameType, df: pd.DataFrame) -> FeatureState:
+    """
+    FeatureState for df: restored from the snapshot when it is current,
+    otherwise computed from the history.
+    """
+    snapshot = load_snapshot(db, game_type, df)
+    if snapshot is not None:
+        return FeatureState.from_dict(snapshot["features"])
+    return FeatureState.from_history(game_type, df)
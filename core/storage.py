@@ -2,10 +2,12 @@ import pandas as pd
 from datetime import datetime
 from core.lottery import GameType
 from core.db import Database
+from core.verify import verify_pending_bets
+from core.tickets import classify_ticket, bet_count, ticket_cost
 
 class Storage:
-    def __init__(self):
-        self.db = Database()
+    def __init__(self, db: Database = None):
+        self.db = db or Database()
 
     def load_bets(self, user_id: str = None) -> pd.DataFrame:
         """Load bets from DB, optionally filtered by user_id"""
@@ -14,18 +16,52 @@ class Storage:
             return pd.DataFrame()
         return pd.DataFrame(bets)
 
-    def save_bet(self, game_type: GameType, issue: str, reds: list, blues: list, note: str = "", user_id: str = "default"):
-        bet_data = {
-            "id": datetime.now().strftime("%Y%m%d%H%M%S%f"),
+    def save_bet(self, game_type: GameType, issue: str, reds: list, blues: list, note: str = "", user_id: str = "default",
+                 red_bankers: list = None, blue_bankers: list = None):
+        """
+        Save a single, compound (more balls) or banker (胆拖) ticket.
+        Bankers must also be listed in reds/blues. Raises ValueError for an invalid ticket.
+        """
+        bet_id = datetime.now().strftime("%Y%m%d%H%M%S%f")
+        self.db.add_bet(self._bet_data(bet_id, game_type, issue, reds, blues, note, user_id, red_bankers, blue_bankers))
+        return True
+
+    def save_bets(self, game_type: GameType, issue: str, tickets: list, note: str = "", user_id: str = "default"):
+        """
+        Save many (reds, blues) tickets in one transaction, e.g. the tickets of a wheel.
+        Every ticket is validated first; nothing is saved if one is invalid.
+        """
+        prefix = datetime.now().strftime("%Y%m%d%H%M%S%f")
+        bets = [self._bet_data(f"{prefix}_{i}", game_type, issue, reds, blues, note, user_id)
+                for i, (reds, blues) in enumerate(tickets)]
+        self.db.add_bets(bets)
+        return len(bets)
+
+    @staticmethod
+    def _bet_data(bet_id: str, game_type: GameType, issue: str, reds: list, blues: list, note: str, user_id: str,
+                  red_bankers: list = None, blue_bankers: list = None) -> dict:
+        red_bankers = sorted(red_bankers or [])
+        blue_bankers = sorted(blue_bankers or [])
+        bet_type = classify_ticket(game_type, reds, blues, red_bankers, blue_bankers)
+        sizes = (len(reds), len(blues), len(red_bankers), len(blue_bankers))
+        return {
+            "id": bet_id,
             "user_id": user_id,
             "game_type": game_type.value,
             "issue": issue,
             "reds": reds,
             "blues": blues,
-            "note": note
+            "note": note,
+            "bet_type": bet_type,
+            "red_bankers": red_bankers,
+            "blue_bankers": blue_bankers,
+            "bet_count": bet_count(game_type, *sizes),
+            "cost": ticket_cost(game_type, *sizes),
         }
-        self.db.add_bet(bet_data)
-        return True
 
     def update_bet_status(self, bet_id: str, prize_level: str, win_amount: int):
         return self.db.update_bet_status(bet_id, prize_level, win_amount)
+
+    def verify_pending_bets(self, game_type: GameType, history_df: pd.DataFrame, user_id: str = None):
+        """Check pending bets against drawn issues; returns a Counter of prize levels"""
+        return verify_pending_bets(self.db, game_type, history_df, user_id=user_id)
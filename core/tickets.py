@@ -0,0 +1,49 @@
+from math import comb
+from core.lottery import GameType, get_config
+from core.odds import TICKET_PRICE
+
+# Bet types stored in bets.bet_type
+SINGLE = "single"     # 单式: exactly red_count + blue_count balls
+COMPOUND = "compound" # 复式: more balls in either pool, every combination plays
+BANKER = "banker"     # 胆拖: bankers (胆) in every bet, completed from the drags (拖)
+
+BET_TYPE_NAMES = {SINGLE: "单式", COMPOUND: "复式", BANKER: "胆拖"}
+
+def bet_count(game_type: GameType, n_reds: int, n_blues: int, red_bankers: int = 0, blue_bankers: int = 0) -> int:
+    """Single bets a ticket expands to (ball counts include the bankers)."""
+    config = get_config(game_type)
+    return comb(n_reds - red_bankers, config.red_count - red_bankers) * \
+           comb(n_blues - blue_bankers, config.blue_count - blue_bankers)
+
+def ticket_cost(game_type: GameType, n_reds: int, n_blues: int, red_bankers: int = 0, blue_bankers: int = 0) -> int:
+    return bet_count(game_type, n_reds, n_blues, red_bankers, blue_bankers) * TICKET_PRICE
+
+def classify_ticket(game_type: GameType, reds: list, blues: list, red_bankers: list = (), blue_bankers: list = ()) -> str:
+    """
+    Validate a ticket and return its bet type. Bankers are part of reds/blues.
+    Raises ValueError (message shown to the user) for an invalid ticket.
+    """
+    config = get_config(game_type)
+    pools = (
+        ("红球", reds, red_bankers, config.red_range, config.red_count),
+        ("蓝球", blues, blue_bankers, config.blue_range, config.blue_count),
+    )
+    for label, balls, bankers, (low, high), pick in pools:
+        if len(set(balls)) != len(balls):
+            raise ValueError(f"{label}号码重复")
+        if any(b < low or b > high for b in balls):
+            raise ValueError(f"{label}号码须在 {low}-{high} 之间")
+        if len(balls) < pick:
+            raise ValueError(f"{label}至少选 {pick} 个")
+        if not set(bankers) <= set(balls) or len(set(bankers)) != len(bankers):
+            raise ValueError(f"{label}胆码须为所选号码之一且不重复")
+        if bankers and len(bankers) >= pick:
+            raise ValueError(f"{label}胆码最多 {pick - 1} 个")
+        if bankers and len(balls) - len(bankers) <= pick - len(bankers):
+            raise ValueError(f"{label}拖码须多于 {pick - len(bankers)} 个")
+
+    if red_bankers or blue_bankers:
+        return BANKER
+    if len(reds) > config.red_count or len(blues) > config.blue_count:
+        return COMPOUND
+    return SINGLE
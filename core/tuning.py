@@ -0,0 +1,206 @@
+import itertools
+import json
+import multiprocessing
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from core import bitmask
+from core.aggregates import data_version
+from core.analysis import Predictor, sample_composite
+from core.features import FeatureState, get_ball_matrix
+from core.lottery import GameType
+from core.metrics import span
+from core.odds import TICKET_PRICE
+from core.params import CompositeParams, TUNING_DIR, PARAMS_PATH, save_params
+from core.prize import PrizeCalculator
+
+# Values tried per parameter (fields not listed keep their defaults).
+# blue_weight scales every blue weight alike, which doesn't change the sampling,
+# so it is not searched.
+SEARCH_SPACE = {
+    "kill_count": [0, 3, 5],
+    "repeat_boost": [1.0, 2.5, 4.0],
+    "cold_boost": [1.0, 1.5, 2.0],
+    "road_boost": [1.0, 1.2],
+    "odd_even_boost": [1.0, 1.2],
+    "sum_low": [0.8, 0.9],
+    "sum_high": [1.1, 1.2],
+}
+
+METRICS = ("roi", "net_profit", "win_rate", "bet_win_rate")
+
+# --- Search Space ---
+
+def grid_configs(space: dict = SEARCH_SPACE) -> list:
+    """Every combination of the space's values."""
+    names = list(space)
+    return [CompositeParams(**dict(zip(names, values))) for values in itertools.product(*space.values())]
+
+def random_configs(space: dict = SEARCH_SPACE, n: int = 40, seed: int = 0) -> list:
+    """n distinct random combinations (all of them if the grid is smaller)."""
+    total = int(np.prod([len(v) for v in space.values()]))
+    rng = random.Random(seed)
+    seen = {}
+    while len(seen) < min(n, total):
+        params = CompositeParams(**{name: rng.choice(values) for name, values in space.items()})
+        seen.setdefault(params.key(), params)
+    return list(seen.values())
+
+# --- Evaluation ---
+
+def build_context(game_type: GameType, history_df: pd.DataFrame, test_count: int) -> dict:
+    """
+    Everything a backtest of the composite strategy needs that doesn't depend on
+    the parameters: the composite inputs before each tested issue (features are
+    advanced once through the window) and the drawn numbers as bitmasks.
+    """
+    n = len(history_df)
+    start = n - test_count
+    red_matrix = get_ball_matrix(history_df, 'red')
+    blue_matrix = get_ball_matrix(history_df, 'blue')
+    features = FeatureState.from_history(game_type, history_df.iloc[:start])
+    inputs = []
+    for i in range(start, n):
+        inputs.append(Predictor.composite_inputs(game_type, features))
+        features.advance(red_matrix[i].tolist(), blue_matrix[i].tolist())
+    return {
+        "inputs": inputs,
+        "issues": [int(issue) for issue in history_df['issue'].iloc[start:]],
+        "red_masks": bitmask.encode_matrix(red_matrix[start:]),
+        "blue_masks": bitmask.encode_matrix(blue_matrix[start:]),
+    }
+
+def evaluate(game_type: GameType, params: CompositeParams, context: dict, bets_per_issue: int = 10) -> dict:
+    """
+    Backtest metrics of params over the context's issues. Tickets are seeded by
+    issue exactly like Backtester.run_backtest with the composite strategy.
+    """
+    n_issues = len(context["issues"])
+    red_tickets = np.zeros((n_issues, bets_per_issue), dtype=np.uint64)
+    blue_tickets = np.zeros((n_issues, bets_per_issue), dtype=np.uint64)
+    for t, (issue, inputs) in enumerate(zip(context["issues"], context["inputs"])):
+        weights = Predictor.weights_from_inputs(game_type, inputs, params)
+        reds, blues = sample_composite(game_type, weights, bets_per_issue, np.random.default_rng(issue), params.max_retries)
+        red_tickets[t] = bitmask.encode_matrix(reds)
+        blue_tickets[t] = bitmask.encode_matrix(blues)
+
+    red_hits = bitmask.hits(red_tickets, context["red_masks"][:, None])
+    blue_hits = bitmask.hits(blue_tickets, context["blue_masks"][:, None])
+    amounts, _ = PrizeCalculator.calculate_many(game_type, red_hits, blue_hits)
+    prize = int(amounts.sum())
+    cost = TICKET_PRICE * bets_per_issue * n_issues
+    return {
+        "prize": prize,
+        "cost": cost,
+        "net_profit": prize - cost,
+        "roi": (prize - cost) / cost,
+        "win_rate": float((amounts.sum(axis=1) > 0).mean()),
+        "bet_win_rate": float((amounts > 0).mean()),
+    }
+
+# Process pool workers receive the shared context once, through the initializer
+_worker = {}
+
+def _init_worker(game_type: GameType, context: dict, bets_per_issue: int):
+    _worker.update(game_type=game_type, context=context, bets_per_issue=bets_per_issue)
+
+def _evaluate_in_worker(params: CompositeParams) -> dict:
+    return evaluate(_worker["game_type"], params, _worker["context"], _worker["bets_per_issue"])
+
+# --- Result Cache ---
+
+class ResultCache:
+    """
+    Backtest metrics per (data version, test window, bets, params), in one JSON
+    file per game, so repeated or widened searches only run new configurations.
+    """
+    def __init__(self, game_type: GameType, cache_dir: str = TUNING_DIR):
+        self.path = os.path.join(cache_dir, f"{game_type.value}_results.json")
+        self.results = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.results = json.load(f)
+
+    @staticmethod
+    def key(version: tuple, test_count: int, bets_per_issue: int, params: CompositeParams) -> str:
+        return json.dumps([list(version), test_count, bets_per_issue, params.key()])
+
+    def get(self, key: str):
+        return self.results.get(key)
+
+    def put(self, key: str, metrics: dict):
+        self.results[key] = metrics
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.results, f)
+        os.replace(tmp_path, self.path)
+
+# --- Search ---
+
+@span("tuning.tune")
+def tune(game_type: GameType, history_df: pd.DataFrame, configs: list, test_count: int = 200, bets_per_issue: int = 10,
+         workers: int = None, metric: str = "roi", cache_dir: str = TUNING_DIR, progress_callback=None) -> pd.DataFrame:
+    """
+    Backtest every configuration (plus the defaults, as the baseline) over the
+    last test_count issues and rank them by metric.
+
+    The parameter-free inputs are built once and shared; uncached configurations
+    are fanned out over a process pool (workers=1 runs them in this process).
+    Returns one row per configuration, best first: the parameters, the metrics
+    and 'cached'.
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric {metric}, expected one of {METRICS}")
+    if len(history_df) < test_count + 10:
+        raise ValueError(f"Need at least {test_count + 10} draws to tune over {test_count} issues")
+
+    configs = list({p.key(): p for p in [CompositeParams(), *configs]}.values())
+    version = data_version(game_type, history_df)
+    cache = ResultCache(game_type, cache_dir)
+    keys = [ResultCache.key(version, test_count, bets_per_issue, p) for p in configs]
+    todo = [j for j, key in enumerate(keys) if cache.get(key) is None]
+    cached = set(range(len(configs))) - set(todo)
+
+    if todo:
+        context = build_context(game_type, history_df, test_count)
+        workers = workers or os.cpu_count() or 1
+        if workers <= 1:
+            results = (evaluate(game_type, configs[j], context, bets_per_issue) for j in todo)
+        else:
+            # Spawned like the backtest pool: no fork of a process holding threads and open handles
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                       initializer=_init_worker, initargs=(game_type, context, bets_per_issue))
+            results = pool.map(_evaluate_in_worker, [configs[j] for j in todo], chunksize=max(1, len(todo) // (workers * 4)))
+        try:
+            for done, (j, metrics) in enumerate(zip(todo, results), start=1):
+                cache.put(keys[j], metrics)
+                if progress_callback:
+                    progress_callback(done / len(todo))
+        finally:
+            if workers > 1:
+                pool.shutdown()
+            cache.save()
+
+    rows = [{**p.to_dict(), **cache.get(key), "cached": j in cached} for j, (p, key) in enumerate(zip(configs, keys))]
+    return pd.DataFrame(rows).sort_values(metric, ascending=False, kind="stable").reset_index(drop=True)
+
+def save_best(game_type: GameType, history_df: pd.DataFrame, ranking: pd.DataFrame, test_count: int, bets_per_issue: int, metric: str = "roi", path: str = PARAMS_PATH) -> CompositeParams:
+    """Save the top row of a tune() ranking as the game's parameters for predict_many."""
+    best = ranking.iloc[0].to_dict()
+    params = CompositeParams.from_dict(best)
+    info = {
+        "metric": metric,
+        "metrics": {name: getattr(best[name], "item", lambda: best[name])() for name in ("prize", "cost", *METRICS)},
+        "data_version": list(data_version(game_type, history_df)),
+        "test_count": test_count,
+        "bets_per_issue": bets_per_issue,
+        "tuned_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    save_params(game_type, params, info, path)
+    return params
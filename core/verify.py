@@ -0,0 +1,93 @@
+import json
+from collections import Counter
+import numpy as np
+import pandas as pd
+from core import bitmask
+from core.db import Database
+from core.features import get_ball_matrix
+from core.lottery import GameType
+from core.prize import PrizeCalculator, LEVEL_NAMES
+from core.tickets import SINGLE
+
+def verify_pending_bets(db: Database, game_type: GameType, history_df: pd.DataFrame, user_id: str = None) -> Counter:
+    """
+    Check every pending bet of game_type whose issue is in history_df.
+    
+    Bets are joined to draws through an issue -> row index, hits are counted
+    with bitmask popcounts for all bets at once and the results are written
+    with one executemany. Compound and banker tickets are priced from their
+    hit counts (PrizeCalculator.calculate_ticket) and get the highest level
+    they won plus a per-level prize_detail.
+    Returns a Counter of prize levels for updated bets.
+    """
+    if history_df.empty:
+        return Counter()
+    
+    pending = db.get_pending_bets(game_type.value, user_id)
+    if not pending:
+        return Counter()
+    
+    issue_index = {issue: i for i, issue in enumerate(history_df['issue'].astype(str))}
+    
+    bet_ids = []
+    draw_rows = []
+    red_masks = []
+    blue_masks = []
+    tickets = {} # position -> (red bankers, blue bankers) of compound / banker tickets
+    for row in pending:
+        i = issue_index.get(str(row['issue']))
+        if i is None:
+            continue # Not drawn yet
+        try:
+            reds = json.loads(row['reds'])
+            blues = json.loads(row['blues'])
+            if (row['bet_type'] or SINGLE) != SINGLE:
+                tickets[len(bet_ids)] = (json.loads(row['red_bankers'] or '[]'), json.loads(row['blue_bankers'] or '[]'))
+            red_masks.append(bitmask.encode(reds))
+            blue_masks.append(bitmask.encode(blues))
+        except Exception as e:
+            print(f"Error verifying bet {row['id']}: {e}")
+            continue
+        bet_ids.append(row['id'])
+        draw_rows.append(i)
+    
+    if not bet_ids:
+        return Counter()
+    
+    draw_red_masks = bitmask.encode_matrix(get_ball_matrix(history_df, 'red'))
+    draw_blue_masks = bitmask.encode_matrix(get_ball_matrix(history_df, 'blue'))
+    draw_rows = np.array(draw_rows)
+    red_masks = np.array(red_masks, dtype=np.uint64)
+    blue_masks = np.array(blue_masks, dtype=np.uint64)
+    red_hits = bitmask.hits(red_masks, draw_red_masks[draw_rows])
+    blue_hits = bitmask.hits(blue_masks, draw_blue_masks[draw_rows])
+    amounts, codes = PrizeCalculator.calculate_many(game_type, red_hits, blue_hits)
+    
+    level_names = [LEVEL_NAMES[c] for c in codes.tolist()]
+    amounts = amounts.tolist()
+    details = [None] * len(bet_ids)
+    
+    # Multi-bet tickets: count the winning bets per level instead of expanding
+    if tickets:
+        positions = list(tickets)
+        rows = draw_rows[positions]
+        red_bankers = np.array([bitmask.encode(r) for r, _ in tickets.values()], dtype=np.uint64)
+        blue_bankers = np.array([bitmask.encode(b) for _, b in tickets.values()], dtype=np.uint64)
+        red_banker_hits = bitmask.hits(red_bankers, draw_red_masks[rows]).tolist()
+        blue_banker_hits = bitmask.hits(blue_bankers, draw_blue_masks[rows]).tolist()
+        n_reds = bitmask.popcount(red_masks[positions]).tolist()
+        n_blues = bitmask.popcount(blue_masks[positions]).tolist()
+        red_hit_list, blue_hit_list = red_hits.tolist(), blue_hits.tolist()
+        for k, (pos, (ticket_red_bankers, ticket_blue_bankers)) in enumerate(tickets.items()):
+            total, won = PrizeCalculator.calculate_ticket(
+                game_type, red_hit_list[pos], blue_hit_list[pos], n_reds[k], n_blues[k],
+                len(ticket_red_bankers), red_banker_hits[k], len(ticket_blue_bankers), blue_banker_hits[k])
+            amounts[pos] = total
+            level_names[pos] = min(won, key=LEVEL_NAMES.index) if won else LEVEL_NAMES[0]
+            details[pos] = json.dumps(dict(won), ensure_ascii=False)
+    
+    updates = list(zip(level_names, amounts, details, bet_ids))
+    levels = Counter(level_names)
+    
+    db.update_bet_statuses(updates)
+    return levels
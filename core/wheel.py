@@ -0,0 +1,168 @@
+import json
+import os
+from itertools import combinations
+from math import comb
+import numpy as np
+from core import bitmask
+from core.lottery import GameType, get_config
+from core.metrics import span
+
+# Computed designs, one JSON file per (ticket size, n, k, m)
+WHEEL_DIR = os.path.join("data", "wheels")
+
+# Largest incidence (subsets x neighbours) built in memory, ~4 bytes each
+MAX_INCIDENCE = 60_000_000
+
+# Wheels (旋转矩阵) are covering designs: from n chosen reds, a small set of
+# t-ball tickets such that whenever m of the drawn reds are among the n, at
+# least one ticket holds k of them ("k if m", e.g. 5-if-6). Subsets of range(n)
+# are bitmasks; the design is a greedy set cover over all t-subsets, pruned
+# of redundant tickets.
+
+def _subsets(n: int, size: int) -> tuple:
+    """All size-subsets of range(n): (sorted bitmasks, member positions per mask)."""
+    members = np.array(list(combinations(range(n), size)), dtype=np.int64).reshape(comb(n, size), size)
+    masks = np.left_shift(np.int64(1), members).sum(axis=1)
+    order = np.argsort(masks)
+    return masks[order], members[order]
+
+def _neighbors(n: int, a: int, b: int, k: int) -> np.ndarray:
+    """
+    For every a-subset of range(n) (in _subsets order), the indices of the
+    b-subsets sharing at least k elements with it: an (C(n, a), D) int32 array.
+    Each neighbour is the union of j members and b - j non-members.
+    """
+    masks, members = _subsets(n, a)
+    b_masks, _ = _subsets(n, b)
+    is_member = (masks[:, None] >> np.arange(n)) & 1
+    outside = np.nonzero(is_member == 0)[1].reshape(len(masks), n - a)
+    member_bits = np.left_shift(np.int64(1), members)
+    outside_bits = np.left_shift(np.int64(1), outside)
+
+    parts = []
+    for j in range(k, min(a, b) + 1):
+        if b - j > n - a:
+            continue
+        inner = np.array(list(combinations(range(a), j)), dtype=np.int64).reshape(comb(a, j), j)
+        outer = np.array(list(combinations(range(n - a), b - j)), dtype=np.int64).reshape(comb(n - a, b - j), b - j)
+        inner_masks = member_bits[:, inner].sum(axis=2)  # (rows, C(a, j))
+        outer_masks = outside_bits[:, outer].sum(axis=2) # (rows, C(n - a, b - j))
+        union = (inner_masks[:, :, None] | outer_masks[:, None, :]).reshape(len(masks), -1)
+        parts.append(np.searchsorted(b_masks, union).astype(np.int32))
+    return np.concatenate(parts, axis=1)
+
+def incidence_size(n: int, t: int, k: int, m: int) -> int:
+    """Entries of the ticket -> m-subset incidence (memory / time estimate)."""
+    per_ticket = sum(comb(t, j) * comb(n - t, m - j) for j in range(k, min(t, m) + 1))
+    return comb(n, t) * per_ticket
+
+def feasible(n: int, t: int, k: int, m: int) -> bool:
+    """True if the k-if-m wheel on n reds is small enough to compute (see MAX_INCIDENCE)."""
+    return 2 * incidence_size(n, t, k, m) <= MAX_INCIDENCE
+
+def _check(n: int, t: int, k: int, m: int):
+    if not (1 <= k <= min(t, m) and m <= n and t <= n):
+        raise ValueError(f"Invalid wheel: n={n}, ticket size {t}, {k}-if-{m}")
+    if not feasible(n, t, k, m):
+        raise ValueError(f"Wheel n={n} {k}-if-{m} is too large to compute ({incidence_size(n, t, k, m):,} incidences)")
+
+@span("wheel.covering_design")
+def covering_design(n: int, t: int, k: int, m: int, restarts: int = 4, seed: int = 0) -> np.ndarray:
+    """
+    Tickets (rows of t positions in range(n)) covering every m-subset of
+    range(n) in at least k positions.
+
+    Greedy set cover: repeatedly take the ticket covering the most uncovered
+    m-subsets (gains are updated through the reverse incidence), then drop
+    tickets whose m-subsets are all covered elsewhere. Ties are broken by a
+    random order; the smallest design of `restarts` runs is kept.
+    """
+    _check(n, t, k, m)
+    _, tickets = _subsets(n, t)
+    if k == t == m:
+        return tickets # every ticket is needed: the full compound ticket
+    covers = _neighbors(n, t, m, k)                     # ticket -> m-subsets it covers
+    covered_by = covers if t == m else _neighbors(n, m, t, k) # m-subset -> covering tickets
+    n_targets = len(covered_by)
+    rng = np.random.default_rng(seed)
+
+    best = None
+    for _ in range(restarts):
+        # Gains are kept in a shuffled ticket order, so argmax breaks ties randomly
+        order = rng.permutation(len(tickets))
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        gain = np.full(len(tickets), covers.shape[1], dtype=np.int64)
+        covered = np.zeros(n_targets, dtype=bool)
+        n_covered = 0
+        chosen = []
+        while n_covered < n_targets:
+            pick = order[np.argmax(gain)]
+            targets = covers[pick]
+            new = targets[~covered[targets]]
+            covered[new] = True
+            n_covered += len(new)
+            gain -= np.bincount(rank[covered_by[new].ravel()], minlength=len(tickets))
+            chosen.append(pick)
+
+        # Prune: a ticket whose targets are all covered twice is redundant
+        counts = np.bincount(covers[chosen].ravel(), minlength=n_targets)
+        kept = []
+        for pick in reversed(chosen):
+            targets = covers[pick]
+            if counts[targets].min() >= 2:
+                counts[targets] -= 1
+            else:
+                kept.append(pick)
+        if best is None or len(kept) < len(best):
+            best = kept
+    return tickets[np.sort(best)]
+
+def is_covering(design: np.ndarray, n: int, k: int, m: int) -> bool:
+    """True if every m-subset of range(n) meets some ticket in at least k positions."""
+    design = np.asarray(design, dtype=np.int64)
+    if m > n:
+        return True
+    ticket_masks = np.left_shift(np.int64(1), design).sum(axis=1)
+    target_masks, _ = _subsets(n, m)
+    for start in range(0, len(target_masks), 4096):
+        chunk = target_masks[start:start + 4096]
+        shared = bitmask.popcount((chunk[:, None] & ticket_masks[None, :]).astype(np.uint64))
+        if not (shared >= k).any(axis=1).all():
+            return False
+    return True
+
+# --- Cached Wheels ---
+
+def wheel_path(t: int, n: int, k: int, m: int, cache_dir: str = WHEEL_DIR) -> str:
+    return os.path.join(cache_dir, f"wheel_t{t}_n{n}_{k}if{m}.json")
+
+def get_wheel(game_type: GameType, n: int, k: int, m: int, cache_dir: str = WHEEL_DIR) -> list:
+    """
+    Wheel for n reds of game_type with a k-if-m guarantee, as lists of positions
+    into the sorted chosen reds. Designs only depend on the ticket size, so
+    both games share the cache for equal sizes; computed once, then read from disk.
+    """
+    t = get_config(game_type).red_count
+    path = wheel_path(t, n, k, m, cache_dir)
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)["tickets"]
+
+    tickets = covering_design(n, t, k, m).tolist()
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"t": t, "n": n, "k": k, "m": m, "tickets": tickets}, f)
+    os.replace(tmp_path, path)
+    return tickets
+
+def wheel_tickets(game_type: GameType, reds: list, k: int, m: int, cache_dir: str = WHEEL_DIR) -> list:
+    """The wheel applied to the chosen reds: one sorted red list per ticket."""
+    config = get_config(game_type)
+    reds = sorted(reds)
+    if len(set(reds)) != len(reds) or any(r < config.red_range[0] or r > config.red_range[1] for r in reds):
+        raise ValueError("红球号码无效或重复")
+    if len(reds) < config.red_count:
+        raise ValueError(f"红球至少选 {config.red_count} 个")
+    return [[reds[p] for p in ticket] for ticket in get_wheel(game_type, len(reds), k, m, cache_dir)]
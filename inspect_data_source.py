@@ -1,7 +1,11 @@
+import os
+import sys
 import requests
 import pandas as pd
 from io import StringIO
 
+FIXTURE_DIR = os.path.join("fixtures", "500com")
+
 def inspect_columns(url, name):
     print(f"--- Inspecting {name} ---")
     try:
@@ -26,6 +30,32 @@ def inspect_columns(url, name):
     except Exception as e:
         print(f"Error: {e}")
 
+def record_fixture(game: str, limit: int = 150):
+    """
+    Save the page exactly as served (bytes, original charset) as the stand-in
+    fixture of verify_fetcher.py, plus the draws it lists as CSV. Check the CSV
+    against the site before committing it: it is what the parser is tested against.
+    """
+    from core.lottery import GameType
+    from core.parser import parse_history_page
+    url = f"https://datachart.500.com/{game}/history/newinc/history.php?limit={limit}&sort=0"
+    headers = {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+    }
+    response = requests.get(url, headers=headers, timeout=30)
+    response.raise_for_status()
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    with open(os.path.join(FIXTURE_DIR, f"{game}_history.html"), "wb") as f:
+        f.write(response.content)
+    df = parse_history_page(response.content, GameType(game)).to_frame()
+    df.to_csv(os.path.join(FIXTURE_DIR, f"{game}_history.csv"), index=False)
+    print(f"Recorded {game}: {len(response.content)} bytes, {len(df)} draws")
+
+if "--record" in sys.argv:
+    record_fixture("ssq")
+    record_fixture("dlt")
+    sys.exit(0)
+
 # SSQ
 inspect_columns("https://datachart.500.com/ssq/history/newinc/history.php?limit=5&sort=0", "SSQ")
 # DLT
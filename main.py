@@ -1,17 +1,29 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from datetime import datetime, timedelta
+from datetime import datetime
 import time
 import os
-import hashlib
+import cProfile
+import io
+import pstats
 
 from core.data import DataLoader
 from core.lottery import GameType, get_config
-from core.analysis import Simulator, Predictor, Backtester, calculate_omission
+from core.analysis import Simulator, Predictor, Backtester
+from core.aggregates import get_dashboard_aggregates
+from core.snapshot import load_features
+from core.recommend import daily_seed
+from core.draw_calendar import next_draw_time
+from core.odds import ticket_expectation, tier_probabilities, issue_win_probability, TICKET_PRICE
+from core.tickets import bet_count, ticket_cost, BET_TYPE_NAMES
+from core.wheel import feasible, wheel_tickets
 from core.storage import Storage
-from core.prize import PrizeCalculator
 from core.auth import AuthManager
+from core import metrics
+
+# Process pool size of the parallel backtest (each worker holds a copy of the history)
+MAX_BACKTEST_WORKERS = 4
 
 st.set_page_config(page_title="彩票分析预测平台", layout="wide", initial_sidebar_state="expanded")
 
@@ -36,6 +48,33 @@ if st.sidebar.button("退出登录"):
     del st.session_state['user']
     st.rerun()
 
+# --- Performance Panel (optional) ---
+@st.cache_resource
+def start_metrics_server():
+    # One /metrics endpoint per process: METRICS_PORT=9109 -> http://127.0.0.1:9109/metrics
+    if os.environ.get("METRICS_PORT"):
+        return metrics.start_http_server(int(os.environ["METRICS_PORT"]))
+
+def stop_perf_run():
+    """Turn off this run's span recording and profiler (the session's, if any)."""
+    metrics.registry.stop_recording()
+    leftover = st.session_state.pop("perf_profiler", None)
+    if leftover is not None:
+        leftover.disable()
+
+start_metrics_server()
+# st.rerun() / st.stop() end a run before the cleanup at the bottom, and a rerun
+# starts over on the same thread: first stop whatever the cut-short run left on.
+stop_perf_run()
+show_perf = st.sidebar.checkbox("⏱ 性能面板", value=False)
+profiler = None
+if show_perf:
+    if st.sidebar.button("cProfile 分析本次运行"):
+        profiler = st.session_state.perf_profiler = cProfile.Profile()
+        profiler.enable()
+    perf_spans = metrics.registry.start_recording()
+    rerun_start = time.perf_counter()
+
 st.sidebar.divider()
 st.sidebar.title("功能菜单")
 
@@ -71,37 +110,8 @@ def verify_pending_bets():
     # Only verify if we have data
     if df.empty: return
     
-    my_bets = storage.load_bets(user_id)
-    if my_bets.empty: return
-    
-    # Filter for pending bets of current game type
-    pending = my_bets[(my_bets['status'] == 'pending') & (my_bets['game_type'] == game_type.value)]
-    
-    updates = 0
-    for idx, row in pending.iterrows():
-        # Match issue
-        match = df[df['issue'] == str(row['issue'])]
-        if not match.empty:
-            actual_row = match.iloc[0]
-            if game_type == GameType.SSQ:
-                act_reds = [int(actual_row[f'red{j}']) for j in range(1, 7)]
-                act_blues = [int(actual_row['blue'])]
-            else:
-                act_reds = [int(actual_row[f'red{j}']) for j in range(1, 6)]
-                act_blues = [int(actual_row[f'blue{j}']) for j in range(1, 3)]
-            
-            try:
-                bet_reds = eval(row['reds']) if isinstance(row['reds'], str) else row['reds']
-                bet_blues = eval(row['blues']) if isinstance(row['blues'], str) else row['blues']
-                
-                red_hits = len(set(bet_reds) & set(act_reds))
-                blue_hits = len(set(bet_blues) & set(act_blues))
-                
-                prize_res = PrizeCalculator.calculate(game_type, red_hits, blue_hits)
-                storage.update_bet_status(row['id'], prize_res.level, prize_res.amount)
-                updates += 1
-            except Exception as e:
-                print(f"Error verifying bet {row['id']}: {e}")
+    levels = storage.verify_pending_bets(game_type, df, user_id=user_id)
+    updates = sum(levels.values())
 
     if updates > 0:
         st.toast(f"自动核验完成：更新了 {updates} 条中奖记录！", icon="💰")
@@ -112,27 +122,6 @@ if 'verified' not in st.session_state:
     st.session_state.verified = True
 
 # --- Helpers ---
-def get_next_draw_time(game_type):
-    now = datetime.now()
-    if game_type == GameType.SSQ:
-        # Tue(1), Thu(3), Sun(6) 21:15
-        draw_days = [1, 3, 6]
-        draw_time = "21:15"
-    else:
-        # Mon(0), Wed(2), Sat(5) 21:25
-        draw_days = [0, 2, 5]
-        draw_time = "21:25"
-    
-    # Simple logic to find next
-    for i in range(0, 7):
-        future = now + timedelta(days=i)
-        if future.weekday() in draw_days:
-            # If today, check time
-            target = datetime.strptime(f"{future.strftime('%Y-%m-%d')} {draw_time}", "%Y-%m-%d %H:%M")
-            if target > now:
-                return target
-    return now # Should not happen
-
 def draw_balls(reds, blues):
     html = '<div style="display: flex; gap: 5px; flex-wrap: wrap;">'
     for r in reds:
@@ -142,13 +131,8 @@ def draw_balls(reds, blues):
     html += '</div>'
     st.markdown(html, unsafe_allow_html=True)
 
-def get_daily_seed(user_id):
-    date_str = datetime.now().strftime("%Y%m%d")
-    seed_str = f"{date_str}_{user_id}"
-    return int(hashlib.sha256(seed_str.encode()).hexdigest(), 16) % (2**32)
-
 # --- Info Section ---
-next_draw = get_next_draw_time(game_type)
+next_draw = next_draw_time(game_type)
 time_delta = next_draw - datetime.now()
 hours = int(time_delta.total_seconds() // 3600)
 mins = int((time_delta.total_seconds() % 3600) // 60)
@@ -189,60 +173,36 @@ if mode == "数据走势 (Dashboard)":
 
     tab1, tab2, tab3 = st.tabs(["历史数据", "冷热分析", "遗漏分析"])
     
+    # Computed once per data version and shared by all sessions (read-only)
+    aggregates = get_dashboard_aggregates(game_type, df)
+    
     with tab1:
         st.subheader("历史数据概览")
-        display_df = df.copy()
-        
-        # Optimize for mobile: Select only essential columns
-        cols = []
-        display_cols = []
-        if game_type == GameType.SSQ:
-            cols = ['issue', 'date', 'red1', 'red2', 'red3', 'red4', 'red5', 'red6', 'blue']
-            display_cols = ['期号', '日期', '红1', '红2', '红3', '红4', '红5', '红6', '蓝']
-        else:
-            cols = ['issue', 'date', 'red1', 'red2', 'red3', 'red4', 'red5', 'blue1', 'blue2']
-            display_cols = ['期号', '日期', '红1', '红2', '红3', '红4', '红5', '蓝1', '蓝2']
-        
-        # Handle missing date column gracefully
-        if 'date' not in display_df.columns:
-            cols.remove('date')
-            display_cols.remove('日期')
-            
-        try:
-            display_df = display_df[cols]
-            display_df.columns = display_cols
-            st.dataframe(
-                display_df.sort_values('期号', ascending=False).head(20), 
-                use_container_width=True,
-                hide_index=True
-            )
-        except Exception as e:
-             st.error(f"数据列格式错误: {e}")
+        st.dataframe(
+            aggregates.recent_draws, 
+            use_container_width=True,
+            hide_index=True
+        )
 
     with tab2:
         col1, col2 = st.columns(2)
         with col1:
             st.subheader("🔥 红球热度")
-            red_cols = [c for c in df.columns if 'red' in c]
-            all_reds = df[red_cols].values.flatten()
-            red_counts = pd.Series(all_reds).value_counts().sort_index()
+            red_counts = aggregates.red_counts
             fig_red = px.bar(x=red_counts.index, y=red_counts.values)
             fig_red.update_traces(marker_color='#f44336')
             st.plotly_chart(fig_red, use_container_width=True)
             
         with col2:
             st.subheader("💧 蓝球热度")
-            blue_cols = [c for c in df.columns if 'blue' in c]
-            all_blues = df[blue_cols].values.flatten()
-            blue_counts = pd.Series(all_blues).value_counts().sort_index()
+            blue_counts = aggregates.blue_counts
             fig_blue = px.bar(x=blue_counts.index, y=blue_counts.values)
             fig_blue.update_traces(marker_color='#2196f3')
             st.plotly_chart(fig_blue, use_container_width=True)
 
     with tab3:
         st.subheader("📉 红球遗漏")
-        omission = calculate_omission(df, config.red_range[1], 'red')
-        omission_series = pd.Series(omission).sort_index()
+        omission_series = aggregates.red_omission
         fig_omission = px.bar(x=omission_series.index, y=omission_series.values)
         fig_omission.update_traces(marker_color='#FF9800')
         st.plotly_chart(fig_omission, use_container_width=True)
@@ -264,15 +224,17 @@ elif mode == "智能预测 (Prediction)":
                  predictions = existing_pred[:count]
                  st.success(f"已加载今日推荐 (共{len(existing_pred)}注)")
             else:
-                 needed = count - len(existing_pred)
-                 daily_seed = get_daily_seed(user_id)
-                 new_preds = Predictor.predict_many(game_type, df, needed, seed_base=daily_seed + len(existing_pred))
-                 predictions = existing_pred + new_preds
+                 # Batches only reproduce at the same size: the new tickets are the
+                 # tail of today's full-size batch, whatever the list grew from
+                 features = load_features(storage.db, game_type, df)
+                 full_batch = Predictor.predict_many(game_type, df, count, seed_base=daily_seed(user_id), features=features)
+                 predictions = existing_pred + full_batch[len(existing_pred):]
                  storage.db.save_daily_recommendation(user_id, date_str, game_type.value, predictions)
                  st.success("已补充生成新号码")
         else:
-            daily_seed = get_daily_seed(user_id)
-            predictions = Predictor.predict_many(game_type, df, count, seed_base=daily_seed)
+            # Normally pre-generated by the scheduler; this is the fallback for new users
+            features = load_features(storage.db, game_type, df)
+            predictions = Predictor.predict_many(game_type, df, count, seed_base=daily_seed(user_id), features=features)
             storage.db.save_daily_recommendation(user_id, date_str, game_type.value, predictions)
             
         st.session_state.prediction_result = predictions
@@ -306,33 +268,46 @@ elif mode == "智能预测 (Prediction)":
 elif mode == "策略回测 (Backtest)":
     st.title("📈 策略回测")
     
-    algo = st.selectbox("选择算法", [
-        "增强型智能趋势算法 (Enhanced Smart Trend)",
-        "随机选号 (Random)", 
-        "热号加权 (Frequency Weighted)",
-        "遗漏回补 (Omission Rebound)"
-    ], format_func=lambda x: x.split(" (")[0] if "(" in x else x)
+    strategies = {
+        "增强型智能趋势算法 (Enhanced Smart Trend)": Predictor.composite_predict,
+        "随机选号 (Random)": Predictor.random_predict,
+        "热号加权 (Frequency Weighted)": Predictor.frequency_predict,
+        "遗漏回补 (Omission Rebound)": Predictor.omission_predict,
+    }
+    short_name = lambda x: x.split(" (")[0] if "(" in x else x
+    algo = st.selectbox("选择算法", list(strategies), format_func=short_name)
     
     col1, col2 = st.columns(2)
     with col1:
         test_count = st.slider("回测期数", 10, 100, 30)
     with col2:
         bets_per_issue = st.number_input("每期注数", 1, 100, 5)
+    parallel = st.checkbox("多进程并行回测", value=False, help="按期号分片到多个进程计算，结果与单进程一致")
+    
+    # Exact random baseline (closed form, no simulation)
+    baseline = ticket_expectation(game_type)
+    baseline_win_rate = issue_win_probability(game_type, bets_per_issue) * 100
+    st.caption("随机选号理论基准 (精确计算)")
+    b1, b2, b3, b4 = st.columns(4)
+    b1.metric("单注期望奖金", f"¥{baseline['expected_prize']:.3f}")
+    b2.metric("理论 ROI", f"{baseline['roi'] * 100:.1f}%")
+    b3.metric("单注中奖概率", f"{baseline['win_probability'] * 100:.2f}%")
+    b4.metric("每期中奖概率", f"{baseline_win_rate:.1f}%")
+    with st.expander("各奖级中奖概率"):
+        tiers = pd.DataFrame(tier_probabilities(game_type))
+        tiers['odds'] = tiers['odds'].map(lambda x: f"1 / {x:,.0f}")
+        st.dataframe(
+            tiers[['level', 'description', 'amount', 'odds']].rename(columns={'level': '奖级', 'description': '条件', 'amount': '奖金', 'odds': '概率'}),
+            use_container_width=True, hide_index=True
+        )
     
     if st.button("开始回测"):
         progress_bar = st.progress(0)
         with st.spinner("计算中..."):
-            strategy = None
-            if algo == "随机选号 (Random)":
-                strategy = Predictor.random_predict
-            elif algo == "热号加权 (Frequency Weighted)":
-                strategy = Predictor.frequency_predict
-            elif algo == "遗漏回补 (Omission Rebound)":
-                strategy = Predictor.omission_predict
-            elif algo == "增强型智能趋势算法 (Enhanced Smart Trend)":
-                strategy = Predictor.composite_predict
+            strategy = strategies[algo]
                 
-            res_df = Backtester.run_backtest(game_type, strategy, df, test_count, bets_per_issue=bets_per_issue, progress_callback=progress_bar.progress)
+            workers = min(MAX_BACKTEST_WORKERS, os.cpu_count() or 1) if parallel else None
+            res_df = Backtester.run_backtest(game_type, strategy, df, test_count, bets_per_issue=bets_per_issue, progress_callback=progress_bar.progress, workers=workers)
             progress_bar.progress(100)
             
             if not res_df.empty:
@@ -345,8 +320,8 @@ elif mode == "策略回测 (Backtest)":
                 c1, c2, c3, c4 = st.columns(4)
                 c1.metric("投入", f"¥{total_cost}")
                 c2.metric("收益", f"¥{total_win}")
-                c3.metric("ROI", f"{roi:.1f}%", delta_color="normal" if roi < 0 else "inverse")
-                c4.metric("中奖率", f"{win_rate:.1f}%")
+                c3.metric("ROI", f"{roi:.1f}%", delta=f"{roi - baseline['roi'] * 100:+.1f}% vs 随机基准")
+                c4.metric("中奖率", f"{win_rate:.1f}%", delta=f"{win_rate - baseline_win_rate:+.1f}% vs 随机基准")
                 
                 st.line_chart(res_df.set_index('issue')['net_profit'].cumsum())
                 
@@ -355,29 +330,121 @@ elif mode == "策略回测 (Backtest)":
                     use_container_width=True
                 )
 
+    st.divider()
+    st.subheader("📊 多策略对比")
+    st.caption("所有策略共用每期特征，一次性向量化计算命中与奖金")
+    full_history = st.checkbox("使用全部历史期数", value=False)
+    
+    if st.button("对比全部策略"):
+        progress_bar = st.progress(0)
+        with st.spinner("计算中..."):
+            summary, curves = Backtester.compare_strategies(
+                game_type, {short_name(k): v for k, v in strategies.items()}, df,
+                None if full_history else test_count, bets_per_issue=bets_per_issue, progress_callback=progress_bar.progress
+            )
+            progress_bar.progress(100)
+        
+        if not summary.empty:
+            summary['roi'] = (summary['roi'] * 100).round(1)
+            summary['win_rate'] = (summary['win_rate'] * 100).round(1)
+            summary['bet_win_rate'] = (summary['bet_win_rate'] * 100).round(2)
+            st.dataframe(
+                summary.drop(columns=['issues']).rename(columns={
+                    'strategy': '策略', 'bets': '注数', 'failed_bets': '失败注数', 'cost': '投入', 'prize': '收益', 'net_profit': '净利润',
+                    'roi': 'ROI(%)', 'win_rate': '每期中奖率(%)', 'bet_win_rate': '单注中奖率(%)', 'max_drawdown': '最大回撤'
+                }),
+                use_container_width=True, hide_index=True
+            )
+            st.caption(f"随机理论基准 ROI: {baseline['roi'] * 100:.1f}%")
+            st.line_chart(curves)
+
 elif mode == "模拟投注 (My Bets)":
     st.title("📝 模拟投注")
     
-    tab1, tab2 = st.tabs(["手动投注", "投注记录"])
+    tab1, tab_wheel, tab2 = st.tabs(["手动投注", "旋转矩阵", "投注记录"])
+    
+    def parse_numbers(text):
+        return sorted([int(x) for x in text.replace("，", ",").split(",") if x.strip()])
     
     with tab1:
+        bet_kind = st.radio("投注方式", ["单式/复式", "胆拖"], horizontal=True)
         with st.form("bet_form"):
-            red_input = st.text_input(f"红球 (逗号分隔)", placeholder="01,05,12,18,25,30")
-            blue_input = st.text_input(f"蓝球", placeholder="08")
+            if bet_kind == "胆拖":
+                red_banker_input = st.text_input(f"红球胆码 (1-{config.red_count - 1}个)", placeholder="05,12")
+                red_input = st.text_input("红球拖码", placeholder="01,18,25,30,33")
+                blue_banker_input = st.text_input(f"蓝球胆码 (可空)", placeholder="") if config.blue_count > 1 else ""
+                blue_input = st.text_input("蓝球拖码" if config.blue_count > 1 else "蓝球", placeholder="08")
+            else:
+                red_banker_input = blue_banker_input = ""
+                red_input = st.text_input(f"红球 (逗号分隔, {config.red_count}个以上为复式)", placeholder="01,05,12,18,25,30")
+                blue_input = st.text_input(f"蓝球", placeholder="08")
             note = st.text_input("备注")
             if st.form_submit_button("提交"):
                 try:
-                    reds = sorted([int(x) for x in red_input.replace("，", ",").split(",") if x.strip()])
-                    blues = sorted([int(x) for x in blue_input.replace("，", ",").split(",") if x.strip()])
-                    if len(reds) != config.red_count or len(blues) != config.blue_count:
-                        st.error("号码数量错误")
-                    else:
-                        last_issue = df.iloc[-1]['issue']
-                        next_issue = str(int(last_issue) + 1)
-                        storage.save_bet(game_type, next_issue, reds, blues, note, user_id=user_id)
-                        st.success("已保存")
+                    red_bankers = parse_numbers(red_banker_input)
+                    blue_bankers = parse_numbers(blue_banker_input)
+                    reds = sorted(red_bankers + parse_numbers(red_input))
+                    blues = sorted(blue_bankers + parse_numbers(blue_input))
                 except:
                     st.error("格式错误")
+                else:
+                    try:
+                        if bet_kind == "胆拖" and not red_bankers:
+                            raise ValueError("请填写红球胆码")
+                        last_issue = df.iloc[-1]['issue']
+                        next_issue = str(int(last_issue) + 1)
+                        storage.save_bet(game_type, next_issue, reds, blues, note, user_id=user_id,
+                                         red_bankers=red_bankers, blue_bankers=blue_bankers)
+                        n_bets = bet_count(game_type, len(reds), len(blues), len(red_bankers), len(blue_bankers))
+                        st.success(f"已保存: {n_bets} 注, 共 {ticket_cost(game_type, len(reds), len(blues), len(red_bankers), len(blue_bankers))} 元")
+                    except ValueError as e:
+                        st.error(str(e))
+
+    with tab_wheel:
+        st.caption("从所选红球中生成最少的注数：开奖红球中有 m 个在所选号码内时，至少一注中 k 个。")
+        wheel_reds_input = st.text_input("红球 (逗号分隔, 最多20个)", placeholder="01,03,05,08,12,15,18,21,25,30", key="wheel_reds")
+        wheel_blues_input = st.text_input(f"蓝球 (多选则每注为复式)", placeholder="08", key="wheel_blues")
+        # Offer only the guarantees computable for the reds entered (20 until they parse)
+        try:
+            wheel_n = len(parse_numbers(wheel_reds_input))
+        except ValueError:
+            wheel_n = 0
+        if not config.red_count <= wheel_n <= 20:
+            wheel_n = 20
+        guarantees = [(k, m) for m in range(config.red_count, 2, -1) for k in range(m, 2, -1)]
+        too_large = [g for g in guarantees if not feasible(wheel_n, config.red_count, *g)]
+        guarantees = [g for g in guarantees if g not in too_large]
+        k, m = st.selectbox("保证条件", guarantees, format_func=lambda g: f"中{g[1]}保{g[0]}")
+        if too_large:
+            st.caption(f"{wheel_n} 个红球时计算量过大, 不提供: " + ", ".join(f"中{g[1]}保{g[0]}" for g in too_large))
+        
+        if st.button("生成旋转矩阵"):
+            try:
+                wheel_reds = parse_numbers(wheel_reds_input)
+                wheel_blues = parse_numbers(wheel_blues_input)
+                if len(wheel_reds) > 20:
+                    raise ValueError("红球最多选 20 个")
+                if len(wheel_blues) < config.blue_count:
+                    raise ValueError(f"蓝球至少选 {config.blue_count} 个")
+                with st.spinner("计算中..."):
+                    tickets = [(reds, wheel_blues) for reds in wheel_tickets(game_type, wheel_reds, k, m)]
+                st.session_state.wheel = {"game": game_type.value, "tickets": tickets, "label": f"中{m}保{k}"}
+            except ValueError as e:
+                st.error(str(e) or "格式错误")
+        
+        wheel = st.session_state.get("wheel")
+        if wheel and wheel["game"] == game_type.value:
+            tickets = wheel["tickets"]
+            per_ticket = bet_count(game_type, config.red_count, len(tickets[0][1]))
+            st.write(f"**{wheel['label']}**: {len(tickets)} 组红球, 共 {len(tickets) * per_ticket} 注, {len(tickets) * per_ticket * TICKET_PRICE} 元")
+            st.dataframe(pd.DataFrame({"红球": [t[0] for t in tickets], "蓝球": [t[1] for t in tickets]}), use_container_width=True, height=240)
+            if st.button("全部保存到投注记录", type="primary"):
+                try:
+                    next_issue = str(int(df.iloc[-1]['issue']) + 1)
+                    saved = storage.save_bets(game_type, next_issue, tickets, f"旋转矩阵-{wheel['label']}", user_id=user_id)
+                    st.success(f"已保存 {saved} 注")
+                except ValueError as e:
+                    st.error(str(e))
 
     with tab2:
         my_bets = storage.load_bets(user_id)
@@ -389,8 +456,10 @@ elif mode == "模拟投注 (My Bets)":
                 st.rerun()
             
             # Display
-            display_bets = my_bets[['created_at', 'issue', 'reds', 'blues', 'prize_level', 'win_amount']].copy()
-            display_bets.columns = ['时间', '期号', '红球', '蓝球', '状态', '奖金']
+            display_bets = my_bets[['created_at', 'issue', 'bet_type', 'reds', 'blues', 'red_bankers', 'bet_count', 'cost', 'prize_level', 'prize_detail', 'win_amount']].copy()
+            display_bets['bet_type'] = display_bets['bet_type'].map(BET_TYPE_NAMES).fillna("单式")
+            display_bets['prize_detail'] = display_bets['prize_detail'].map(lambda d: ", ".join(f"{k}×{v}" for k, v in d.items()) if isinstance(d, dict) else "")
+            display_bets.columns = ['时间', '期号', '类型', '红球', '蓝球', '红胆', '注数', '金额', '状态', '中奖明细', '奖金']
             display_bets['状态'] = display_bets['状态'].fillna('未开奖').replace('', '未开奖')
             st.dataframe(display_bets.sort_values('时间', ascending=False), use_container_width=True)
         else:
@@ -402,5 +471,20 @@ elif mode == "模拟摇奖 (Simulator)":
         r, b = Simulator.simulate_draw(game_type)
         draw_balls(r, b)
 
+stop_perf_run()
+if show_perf:
+    with st.sidebar.expander("⏱ 本次运行耗时", expanded=True):
+        st.write(f"总耗时: {(time.perf_counter() - rerun_start) * 1000:.1f} ms")
+        if perf_spans:
+            st.dataframe(
+                pd.DataFrame([{"环节": "　" * depth + name, "耗时(ms)": round(seconds * 1000, 2)} for name, depth, seconds in perf_spans]),
+                use_container_width=True, hide_index=True
+            )
+    if profiler is not None:
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(25)
+        with st.sidebar.expander("cProfile (按累计耗时)"):
+            st.code(out.getvalue())
+
 st.markdown("---")
 st.caption("本系统仅供娱乐与技术研究，请理性购彩。")
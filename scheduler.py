@@ -1,99 +1,207 @@
-import time
-import schedule
-import pandas as pd
-from datetime import datetime
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timedelta
 from core.data import DataLoader
 from core.storage import Storage
-from core.prize import PrizeCalculator
 from core.lottery import GameType
+from core.snapshot import save_snapshot
+from core.recommend import pregenerate_daily_recommendations
+from core.draw_calendar import next_draw_time, draw_times_between
+from core import metrics
+from core.metrics import span
 
+# Prometheus text written after every run (node_exporter textfile collector)
+METRICS_PATH = os.path.join("data", "metrics", "scheduler.prom")
+
+# One loader for the life of the process: its fetcher keeps the pooled
+# connections and the ETag/Last-Modified validators between runs
+dl = DataLoader()
+
+# Job timing relative to each draw
+JOB_DELAY = timedelta(minutes=30)       # results are published shortly after the draw
+RETRY_INTERVAL = timedelta(minutes=15)  # data not there yet / fetch failed
+MAX_ATTEMPTS = 8
+CATCHUP_WINDOW = timedelta(days=7)      # missed draws older than this are not replayed
+MAX_SLEEP = 3600                        # re-plan at least hourly (clock changes, suspend)
+
+LEDGER_FORMAT = "%Y-%m-%d %H:%M"
+
+def process_game(game_type: GameType, df, storage: Storage):
+    """Post-update work for one game: analytics snapshot, bet verification and daily recommendations."""
+    print(f"✅ {game_type.value} 数据已更新，最新期号: {df.iloc[-1]['issue']}")
+    
+    # Materialize the feature snapshot (predictions and recommendations restore it instead of re-deriving features)
+    with span("scheduler.snapshot"):
+        snapshot = save_snapshot(storage.db, game_type, df)
+    print(f"  ✅ 分析快照已生成 (杀号: {snapshot['kill_reds']})")
+    
+    # Verify Pending Bets (For ALL users, one bulk pass)
+    with span("scheduler.verify"):
+        levels = storage.verify_pending_bets(game_type, df)
+    updates = sum(levels.values())
+    
+    if updates == 0:
+        print(f"  无待核验记录")
+    else:
+        for level, n in levels.most_common():
+            print(f"    - {level}: {n} 注")
+        print(f"  ✅ {game_type.value} 核验完成，更新了 {updates} 条记录")
+    
+    # Pre-generate active users' daily recommendations until the next draw
+    with span("scheduler.recommend"):
+        generated = pregenerate_daily_recommendations(storage.db, game_type, df)
+    print(f"  ✅ 已预生成 {generated} 份每日推荐")
+
+@span("scheduler.run_task")
 def run_task():
+    """Update and process every game once (manual run)."""
     print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 开始执行定时任务...")
     
-    dl = DataLoader()
     storage = Storage()
+    game_types = [GameType.SSQ, GameType.DLT]
+    
+    # Force Update Data (all games fetched concurrently)
+    with span("scheduler.update"):
+        frames = dl.load_all(game_types, force_update=True)
     
-    # Iterate both game types
-    for game_type in [GameType.SSQ, GameType.DLT]:
+    for game_type in game_types:
         print(f"正在处理: {game_type.value} ...")
-        
         try:
-            # 1. Force Update Data
-            df = dl.load_data(game_type, force_update=True)
+            df = frames[game_type]
             if df.empty:
                 print(f"❌ {game_type.value} 数据更新失败或为空")
                 continue
-            
-            print(f"✅ {game_type.value} 数据已更新，最新期号: {df.iloc[-1]['issue']}")
-            
-            # 2. Verify Pending Bets (For ALL users)
-            # load_bets(user_id=None) returns all bets
-            all_bets = storage.load_bets(user_id=None)
-            
-            if all_bets.empty:
-                print(f"  无投注记录")
-                continue
-                
-            # Filter for pending and current game type
-            pending = all_bets[(all_bets['status'] == 'pending') & (all_bets['game_type'] == game_type.value)]
-            
-            if pending.empty:
-                print(f"  无待核验记录")
-                continue
-                
-            print(f"  发现 {len(pending)} 条待核验记录，开始核对...")
-            
-            updates = 0
-            for idx, row in pending.iterrows():
-                # Match issue
-                match = df[df['issue'] == str(row['issue'])]
-                if not match.empty:
-                    actual_row = match.iloc[0]
-                    
-                    if game_type == GameType.SSQ:
-                        act_reds = [int(actual_row[f'red{j}']) for j in range(1, 7)]
-                        act_blues = [int(actual_row['blue'])]
-                    else:
-                        act_reds = [int(actual_row[f'red{j}']) for j in range(1, 6)]
-                        act_blues = [int(actual_row[f'blue{j}']) for j in range(1, 3)]
-                    
-                    try:
-                        # Handle potential string format from CSV/DB if not parsed
-                        bet_reds = row['reds']
-                        bet_blues = row['blues']
-                        
-                        # If they are strings (e.g. "[1, 2]"), verify if storage.load_bets parses them
-                        # storage.load_bets calls db.get_bets which does json.loads.
-                        # So they should be lists.
-                        
-                        red_hits = len(set(bet_reds) & set(act_reds))
-                        blue_hits = len(set(bet_blues) & set(act_blues))
-                        
-                        prize_res = PrizeCalculator.calculate(game_type, red_hits, blue_hits)
-                        
-                        storage.update_bet_status(row['id'], prize_res.level, prize_res.amount)
-                        updates += 1
-                        print(f"    - 订单 {row['id']} (用户 {row['user_id']}): {prize_res.level}")
-                        
-                    except Exception as e:
-                        print(f"    ❌ 核验出错 {row['id']}: {e}")
-            
-            print(f"  ✅ {game_type.value} 核验完成，更新了 {updates} 条记录")
-            
+            process_game(game_type, df, storage)
         except Exception as e:
             print(f"❌ 任务执行出错 ({game_type.value}): {e}")
 
     print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 任务结束。\n")
 
-if __name__ == "__main__":
-    print("🚀 定时任务服务已启动 (每天 21:20 执行)")
+def run_instrumented(task=run_task, *args):
+    """Run a task with a per-stage timing log, then write the metrics textfile."""
+    with metrics.registry.record() as spans:
+        result = task(*args)
+    for name, depth, seconds in spans:
+        print(f"  ⏱ {'  ' * depth}{name}: {seconds * 1000:.1f} ms")
+    try:
+        metrics.write_textfile(METRICS_PATH)
+    except Exception as e:
+        print(f"❌ 写入监控指标失败: {e}")
+    return result
+
+def data_covers_draw(df, draw_time: datetime) -> bool:
+    """Whether the history already contains the draw held at draw_time."""
+    if df.empty:
+        return False
+    if 'date' not in df.columns:
+        return True # Can't tell; trust the update
+    return str(df['date'].iloc[-1]) >= draw_time.strftime("%Y-%m-%d")
+
+class DrawScheduler:
+    """
+    Runs one job per game per draw, JOB_DELAY after the draw (see core.draw_calendar).
     
-    # Schedule at 21:20 Beijing Time
-    schedule.every().day.at("21:20").do(run_task)
+    Jobs of different games run in parallel on a bounded pool; one game never
+    has two jobs at once. Every job outcome goes to the job ledger in the
+    database, so after a restart missed draws (within CATCHUP_WINDOW) are caught
+    up with a single job per game and finished draws are never redone. A job
+    whose data isn't published yet is retried every RETRY_INTERVAL, up to
+    MAX_ATTEMPTS.
+    """
+    def __init__(self, game_types: list = None, storage: Storage = None, loader: DataLoader = None, workers: int = None):
+        self.game_types = list(game_types or GameType)
+        self.storage = storage or Storage()
+        self.loader = loader or dl
+        self.workers = workers or len(self.game_types)
+        self._stop = threading.Event()
+
+    def plan(self, game_type: GameType, now: datetime):
+        """
+        Next job of game_type as (run_at, draw_time, covered_draws).
+        covered_draws are all the draws the job settles (missed ones included).
+        """
+        db = self.storage.db
+        last_done = db.last_done_job(game_type.value)
+        since = now - CATCHUP_WINDOW
+        if last_done:
+            since = max(since, datetime.strptime(last_done, LEDGER_FORMAT))
+        
+        # Draws whose job time has passed without a completed job
+        missed = [d for d in draw_times_between(game_type, since, now) if d + JOB_DELAY <= now]
+        if missed:
+            target = missed[-1]
+            job = db.get_job(game_type.value, target.strftime(LEDGER_FORMAT))
+            if job is None:
+                return now, target, missed
+            if job['status'] == 'retry':
+                return datetime.strptime(job['next_run_at'], LEDGER_FORMAT), target, missed
+            # 'failed': gave up on this draw, wait for the next one
+        
+        upcoming = next_draw_time(game_type, now - JOB_DELAY)
+        return upcoming + JOB_DELAY, upcoming, [upcoming]
+
+    @span("scheduler.game_job")
+    def run_job(self, game_type: GameType, draw_time: datetime, covered: list):
+        db = self.storage.db
+        key = draw_time.strftime(LEDGER_FORMAT)
+        previous = db.get_job(game_type.value, key)
+        attempts = (previous['attempts'] if previous else 0) + 1
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {game_type.value} 开奖 {key} 任务 (第 {attempts} 次)")
+        
+        try:
+            with span("scheduler.update"):
+                df = self.loader.load_data(game_type, force_update=True)
+            if not data_covers_draw(df, draw_time):
+                raise RuntimeError("开奖数据尚未发布")
+            process_game(game_type, df, self.storage)
+        except Exception as e:
+            if attempts >= MAX_ATTEMPTS:
+                print(f"❌ {game_type.value} {key} 放弃: {e}")
+                db.record_jobs(game_type.value, [key], 'failed', attempts, detail=str(e))
+            else:
+                next_run = (datetime.now() + RETRY_INTERVAL).strftime(LEDGER_FORMAT)
+                print(f"⚠️ {game_type.value} {key} 稍后重试 ({next_run}): {e}")
+                db.record_jobs(game_type.value, [key], 'retry', attempts, next_run_at=next_run, detail=str(e))
+            return False
+        
+        db.record_jobs(game_type.value, [d.strftime(LEDGER_FORMAT) for d in covered], 'done', attempts)
+        if len(covered) > 1:
+            print(f"  ✅ 补跑完成，覆盖 {len(covered)} 期开奖")
+        return True
+
+    def run_forever(self):
+        running = {} # game_type -> Future
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while not self._stop.is_set():
+                now = datetime.now()
+                plans = {g: self.plan(g, now) for g in self.game_types if g not in running}
+                for game_type, (run_at, draw_time, covered) in plans.items():
+                    if run_at <= now:
+                        running[game_type] = pool.submit(run_instrumented, self.run_job, game_type, draw_time, covered)
+                
+                waiting = [p[0] for g, p in plans.items() if g not in running]
+                timeout = MAX_SLEEP
+                if waiting:
+                    next_at = min(waiting)
+                    timeout = min(timeout, max(0.0, (next_at - datetime.now()).total_seconds()))
+                    print(f"💤 下一个任务: {next_at.strftime('%Y-%m-%d %H:%M')}")
+                
+                if running:
+                    done, _ = wait(list(running.values()), timeout=timeout, return_when=FIRST_COMPLETED)
+                    for game_type in [g for g, f in running.items() if f in done]:
+                        running.pop(game_type)
+                else:
+                    self._stop.wait(timeout)
+
+    def stop(self):
+        self._stop.set()
+
+if __name__ == "__main__":
+    print("🚀 定时任务服务已启动 (按开奖日历执行)")
     
-    # Also run once on startup for verification (optional, maybe unsafe if data not ready? Let's skip)
-    # run_task() 
+    # Optional live endpoint: METRICS_PORT=9108 -> http://127.0.0.1:9108/metrics
+    if os.environ.get("METRICS_PORT"):
+        metrics.start_http_server(int(os.environ["METRICS_PORT"]))
     
-    while True:
-        schedule.run_pending()
-        time.sleep(60)
+    DrawScheduler().run_forever()
@@ -0,0 +1,74 @@
+"""
+Tune the composite strategy's parameters by backtesting.
+
+    python tune.py --game ssq --search random --trials 40
+    python tune.py --game dlt --search grid --param kill_count=0,3 --param repeat_boost=1,2.5,4 --workers 4
+
+The best configuration is saved to data/tuning/composite_params.json, where
+Predictor.predict_many picks it up; results are cached per data version.
+"""
+import argparse
+import sys
+import time
+import pandas as pd
+from core.data import DataLoader
+from core.lottery import GameType
+from core.params import CompositeParams
+from core.tuning import SEARCH_SPACE, METRICS, grid_configs, random_configs, tune, save_best
+
+def parse_space(overrides: list) -> dict:
+    """SEARCH_SPACE with `name=v1,v2,...` overrides (a single value fixes the parameter)."""
+    space = dict(SEARCH_SPACE)
+    types = {name: type(value) for name, value in CompositeParams().to_dict().items()}
+    for item in overrides or []:
+        name, _, values = item.partition("=")
+        if name not in types or not values:
+            raise SystemExit(f"Bad --param {item!r}; parameters: {', '.join(types)}")
+        space[name] = [types[name](v) for v in values.split(",")]
+    return space
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Composite strategy parameter search")
+    parser.add_argument("--game", default="ssq", choices=[g.value for g in GameType])
+    parser.add_argument("--search", default="random", choices=["grid", "random"])
+    parser.add_argument("--trials", type=int, default=40, help="configurations tried by random search")
+    parser.add_argument("--param", action="append", help="search values, e.g. repeat_boost=1,2.5,4 (repeatable)")
+    parser.add_argument("--test-count", type=int, default=200, help="issues backtested per configuration")
+    parser.add_argument("--bets", type=int, default=10, help="bets per issue")
+    parser.add_argument("--metric", default="roi", choices=METRICS)
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: CPU count)")
+    parser.add_argument("--seed", type=int, default=0, help="random search seed")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--no-save", action="store_true", help="only print the ranking")
+    args = parser.parse_args(argv)
+
+    game_type = GameType(args.game)
+    space = parse_space(args.param)
+    configs = grid_configs(space) if args.search == "grid" else random_configs(space, args.trials, args.seed)
+    df = DataLoader().load_data(game_type)
+    if df.empty:
+        print("❌ No history data")
+        return 1
+
+    print(f"{game_type.value}: {len(configs)} configurations x {args.test_count} issues x {args.bets} bets")
+    start = time.perf_counter()
+    ranking = tune(game_type, df, configs, args.test_count, args.bets, args.workers, args.metric,
+                   progress_callback=lambda p: print(f"\r  {p:6.1%}", end="", flush=True))
+    print(f"\nDone in {time.perf_counter() - start:.1f}s ({int(ranking['cached'].sum())} cached)")
+
+    varied = [name for name, values in space.items() if len(values) > 1]
+    columns = varied + ["prize", "net_profit", "roi", "win_rate"]
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(ranking[columns].head(args.top).to_string())
+
+    default = CompositeParams().to_dict()
+    baseline = ranking[(ranking[list(default)] == pd.Series(default)).all(axis=1)].iloc[0]
+    best = ranking.iloc[0]
+    print(f"\nBest {args.metric}: {best[args.metric]:.4f} (defaults: {baseline[args.metric]:.4f})")
+    if not args.no_save:
+        save_best(game_type, df, ranking, args.test_count, args.bets, args.metric)
+        print("✅ Saved as the composite parameters for predict_many")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
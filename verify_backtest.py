@@ -0,0 +1,183 @@
+import os
+import random
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from core.analysis import Predictor, Backtester, Simulator, calculate_omission, check_consecutive, consecutive_counts
+from core.lottery import GameType
+from core.data import DataLoader
+from core.params import CompositeParams, load_params
+from core.rng import make_rng, spawn_rngs
+from core.tuning import tune, build_context, evaluate, random_configs, save_best
+
+def test_parallel_equivalence():
+    print("Testing Serial vs Parallel Backtest...")
+    dl = DataLoader()
+    for game_type in [GameType.SSQ, GameType.DLT]:
+        df = dl.load_data(game_type)
+        for strategy in [Predictor.composite_predict, Predictor.frequency_predict, Predictor.omission_predict, Predictor.random_predict]:
+            serial = Backtester.run_backtest(game_type, strategy, df, test_count=40, bets_per_issue=5)
+
+            progress = []
+            parallel = Backtester.run_backtest(game_type, strategy, df, test_count=40, bets_per_issue=5,
+                                               progress_callback=progress.append, workers=max(2, min(4, os.cpu_count() or 2)))
+
+            assert serial.equals(parallel), f"{game_type.value} {strategy.__name__}: parallel result differs from serial"
+            assert progress and progress[-1] == 1.0, f"Progress should end at 1.0, got {progress[-1:]}"
+            print(f"  {game_type.value} {strategy.__name__}: {len(serial)} issues identical")
+    print("✅ Parallel Backtest Passed")
+
+def test_compare_strategies():
+    print("\nTesting Multi-Strategy Comparison...")
+    dl = DataLoader()
+    strategies = {"composite": Predictor.composite_predict, "random": Predictor.random_predict,
+                  "frequency": Predictor.frequency_predict, "omission": Predictor.omission_predict}
+    for game_type in [GameType.SSQ, GameType.DLT]:
+        df = dl.load_data(game_type)
+        summary, curves = Backtester.compare_strategies(game_type, strategies, df, test_count=40, bets_per_issue=5)
+
+        assert list(summary['strategy']) == list(strategies) and list(curves.columns) == list(strategies)
+        assert len(curves) == 40 and list(curves.index) == list(df['issue'].iloc[-40:])
+        assert (curves.iloc[-1].to_numpy() == summary['net_profit'].to_numpy()).all(), "Curves should end at each strategy's net profit"
+
+        # Both engines draw the same tickets, so every strategy's totals agree
+        for name, strategy in strategies.items():
+            single = Backtester.run_backtest(game_type, strategy, df, test_count=40, bets_per_issue=5)
+            row = summary.set_index('strategy').loc[name]
+            assert row['prize'] == single['prize'].sum() and row['cost'] == single['cost'].sum(), f"{name}: engines disagree"
+        print(f"  {game_type.value}: {len(strategies)} strategies x 40 issues x 5 bets")
+    print("✅ Multi-Strategy Comparison Passed")
+
+def flaky_predict(game_type, history_df, seed=None):
+    """Fails for every other bet (module level so it pickles)."""
+    if seed % 2:
+        raise RuntimeError("no prediction")
+    return Predictor.random_predict(game_type, history_df, rng=seed)
+
+def test_failed_bets():
+    print("\nTesting Failed Predictions...")
+    df = DataLoader().load_data(GameType.SSQ)
+    single = Backtester.run_backtest(GameType.SSQ, flaky_predict, df, test_count=20, bets_per_issue=4)
+    # As before the engines were shared: every bet is charged, failed ones win nothing
+    assert (single['bets_count'] == 4).all() and (single['cost'] == 8).all(), "Every bet should be charged"
+    summary, _ = Backtester.compare_strategies(GameType.SSQ, {"flaky": flaky_predict}, df, test_count=20, bets_per_issue=4)
+    row = summary.iloc[0]
+    assert row['bets'] == 80 and row['failed_bets'] == 40 and row['cost'] == single['cost'].sum() and row['prize'] == single['prize'].sum()
+    print(f"  20 issues: {row['bets']} bets charged, {row['failed_bets']} failed")
+    print("✅ Failed Predictions Passed")
+
+def _baseline_omission(df, max_num, prefix='red'):
+    # The row-by-row loop calculate_omission replaced, kept as the reference.
+    omission_counts = {i: 0 for i in range(1, max_num + 1)}
+    cols = [c for c in df.columns if prefix in c]
+    reversed_df = df.iloc[::-1]
+    for num in range(1, max_num + 1):
+        count = 0
+        for _, row in reversed_df.iterrows():
+            if num in row[cols].values:
+                break
+            count += 1
+        omission_counts[num] = count
+    return omission_counts
+
+def test_omission_baseline():
+    print("\nTesting Omission Against Baseline Loop...")
+    rng = np.random.default_rng(11)
+    rows = []
+    for i in range(40):
+        # 33 and 16 are never drawn
+        reds = np.sort(rng.choice(np.arange(1, 33), 6, replace=False))
+        row = {'issue': f"2024{i + 1:03d}", 'date': f"2024-01-{i % 28 + 1:02d}"}
+        row.update({f"red_{j + 1}": int(r) for j, r in enumerate(reds)})
+        row['blue_1'] = int(rng.integers(1, 16))
+        rows.append(row)
+    df = pd.DataFrame(rows)
+
+    for max_num, prefix in ((33, 'red'), (16, 'blue')):
+        current = calculate_omission(df, max_num, prefix)
+        assert current == _baseline_omission(df, max_num, prefix), prefix
+        assert current[max_num] == len(df)
+    empty = df.iloc[:0]
+    assert calculate_omission(empty, 33, 'red') == _baseline_omission(empty, 33, 'red')
+    print("✅ Omission Baseline Passed")
+
+def test_consecutive_rule():
+    print("\nTesting Consecutive Rule...")
+    rng = np.random.default_rng(3)
+    reds = np.sort(np.array([rng.choice(np.arange(1, 34), 6, replace=False) for _ in range(500)]), axis=1)
+    counts = consecutive_counts(reds)
+    for row, count in zip(reds.tolist(), counts.tolist()):
+        expected = sum(1 for a, b in zip(row, row[1:]) if b == a + 1)
+        assert check_consecutive(row[::-1]) == count == expected
+    assert check_consecutive([]) == 0 and check_consecutive([5]) == 0
+    print("✅ Consecutive Rule Passed")
+
+def test_rng_streams():
+    print("\nTesting Isolated RNG Streams...")
+    df = DataLoader().load_data(GameType.SSQ)
+    strategies = [Predictor.random_predict, Predictor.frequency_predict, Predictor.omission_predict, Predictor.composite_predict]
+
+    def run(seed):
+        # Every strategy draws 20 tickets from its own sub-stream of seed
+        return [[s(GameType.SSQ, df, rng=rng) for _ in range(20)] for s, rng in zip(strategies, spawn_rngs(seed, len(strategies)))]
+
+    expected = {seed: run(seed) for seed in range(4)}
+    assert expected[0] != expected[1], "Different seeds should give different tickets"
+    # Concurrent threads (and the global random module) must not disturb each other
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [(seed, pool.submit(run, seed)) for seed in list(range(4)) * 4]
+        random.seed(123)
+        random.random()
+        for seed, future in futures:
+            assert future.result() == expected[seed], f"Seed {seed} not reproducible under threads"
+
+    assert make_rng(random.Random(5)).random() == make_rng(random.Random(5)).random()
+    assert Simulator.simulate_draw(GameType.DLT, np.random.default_rng(9)) == Simulator.simulate_draw(GameType.DLT, np.random.default_rng(9))
+    print(f"  {len(futures)} threaded runs reproducible")
+    print("✅ Isolated RNG Streams Passed")
+
+def test_parameter_tuning():
+    print("\nTesting Composite Parameter Tuning...")
+    dl = DataLoader()
+    df = dl.load_data(GameType.SSQ)
+
+    # The shared-context evaluation reproduces the backtester's composite results
+    params = load_params(GameType.SSQ)
+    metrics = evaluate(GameType.SSQ, params, build_context(GameType.SSQ, df, 40), bets_per_issue=5)
+    single = Backtester.run_backtest(GameType.SSQ, Predictor.composite_predict, df, test_count=40, bets_per_issue=5)
+    assert metrics['prize'] == single['prize'].sum() and metrics['cost'] == single['cost'].sum()
+
+    # Explicit defaults give the same tickets as the old hard-coded constants
+    assert Predictor.predict_many(GameType.SSQ, df, 5, seed_base=7, params=CompositeParams()) == \
+           Predictor.predict_many(GameType.SSQ, df, 5, seed_base=7, params=CompositeParams.from_dict(CompositeParams().to_dict()))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        configs = random_configs(n=6, seed=1)
+        serial = tune(GameType.SSQ, df, configs, test_count=40, bets_per_issue=5, workers=1, cache_dir=os.path.join(tmp, "serial"))
+        parallel = tune(GameType.SSQ, df, configs, test_count=40, bets_per_issue=5, workers=2, cache_dir=os.path.join(tmp, "parallel"))
+        assert len(serial) == 7 and serial.equals(parallel), "Parallel tuning should match serial"
+        assert not serial['cached'].any()
+        again = tune(GameType.SSQ, df, configs, test_count=40, bets_per_issue=5, workers=2, cache_dir=os.path.join(tmp, "serial"))
+        assert again['cached'].all() and again.drop(columns='cached').equals(serial.drop(columns='cached'))
+        assert (serial['roi'].diff().dropna() <= 0).all(), "Ranking should be best first"
+
+        path = os.path.join(tmp, "params.json")
+        best = save_best(GameType.SSQ, df, serial, 40, 5, path=path)
+        assert load_params(GameType.SSQ, path) == best
+        assert load_params(GameType.DLT, path) == CompositeParams()
+        print(f"  best of {len(serial)}: roi {serial['roi'].iloc[0]:.3f} (kill {best.kill_count}, repeat x{best.repeat_boost})")
+    print("✅ Composite Parameter Tuning Passed")
+
+if __name__ == "__main__":
+    try:
+        test_parallel_equivalence()
+        test_compare_strategies()
+        test_failed_bets()
+        test_omission_baseline()
+        test_consecutive_rule()
+        test_rng_streams()
+        test_parameter_tuning()
+        print("\n🎉 All Verification Tests Passed!")
+    except Exception as e:
+        print(f"\n❌ Test Failed: {e}")
@@ -0,0 +1,353 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import pandas as pd
+import benchmark
+from core.data import DataLoader, LotteryFetcher, window_continues
+from core.history import DrawHistory
+from core.lottery import GameType
+from core.parser import parse_history_page
+
+# --- Local stand-in for datachart.500.com ---
+
+# Pages of the site (GB2312, as served) and the draws they list, see fixtures/500com/README.md
+FIXTURE_DIR = os.path.join("fixtures", "500com")
+
+def _split_page(page: bytes) -> tuple:
+    """(head, draw rows newest first, tail) of a recorded history page."""
+    body_start = page.index(b'<tbody id="tdata">') + len(b'<tbody id="tdata">')
+    body_end = page.index(b"</tbody>", body_start)
+    rows = re.findall(rb"<tr\b.*?</tr>", page[body_start:body_end], flags=re.S)
+    return page[:body_start], rows, page[body_end:]
+
+class StandInServer:
+    """
+    Serves /<game>/history/newinc/history.php?limit=N from the recorded pages,
+    cut to the newest N draw rows like the site, and records every request
+    as (game, limit) and its status in `statuses`.
+    
+    `hidden[game] = n` withholds the newest n rows (draws not published yet).
+    Pages carry an ETag and answer If-None-Match with 304. `fail_next` makes
+    the next N requests fail with 503 and `delay` slows every response down.
+    """
+    def __init__(self, delay: float = 0.0):
+        self.pages = {}
+        for game_type in GameType:
+            with open(os.path.join(FIXTURE_DIR, f"{game_type.value}_history.html"), "rb") as f:
+                self.pages[game_type] = _split_page(f.read())
+        self.hidden = {game_type: 0 for game_type in GameType}
+        self.requests = []
+        self.statuses = []
+        self.fail_next = 0
+        self.delay = delay
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1" # keep-alive, so pooled connections are reused
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                game_type = GameType(url.path.strip("/").split("/")[0])
+                limit = int(parse_qs(url.query).get("limit", ["30"])[0])
+                time.sleep(server.delay)
+                with server._lock:
+                    server.requests.append((game_type, limit))
+                    failing = server.fail_next > 0
+                    if failing:
+                        server.fail_next -= 1
+                    hidden = server.hidden[game_type]
+
+                head, rows, tail = server.pages[game_type]
+                body = head + b"\r\n".join(rows[hidden:hidden + limit]) + tail
+                etag = '"' + hashlib.md5(body).hexdigest() + '"'
+                if failing:
+                    status, body = 503, b"busy"
+                elif self.headers.get("If-None-Match") == etag:
+                    status, body = 304, b""
+                else:
+                    status = 200
+                with server._lock:
+                    server.statuses.append(status)
+
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=gb2312")
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+def _site_histories():
+    """The draws listed on the recorded pages, oldest first."""
+    return {g: pd.read_csv(os.path.join(FIXTURE_DIR, f"{g.value}_history.csv"), dtype={'issue': str}) for g in GameType}
+
+def _same_draws(a: pd.DataFrame, b: pd.DataFrame) -> bool:
+    balls = [c for c in a.columns if c not in ('issue', 'date')]
+    return list(a['issue']) == list(b['issue']) and list(a['date']) == list(b['date']) \
+        and (a[balls].to_numpy(dtype=float) == b[balls].to_numpy(dtype=float)).all()
+
+# --- Tests ---
+
+def test_incremental_append():
+    print("Testing Incremental Update...")
+    site = _site_histories()
+    with StandInServer() as server, tempfile.TemporaryDirectory() as tmp:
+        dl = DataLoader(tmp, fetcher=LotteryFetcher(base_url=server.base_url))
+        for game_type in GameType:
+            path = dl.get_data_path(game_type)
+            site[game_type].iloc[:-5].to_csv(path, index=False)
+            with open(path, "rb") as f:
+                before = f.read()
+
+            df = dl.update_data(game_type)
+            assert server.requests[-1] == (game_type, 30), f"Expected a limit=30 request, got {server.requests[-1]}"
+            assert _same_draws(df, site[game_type]), "Merged history differs from site history"
+            with open(path, "rb") as f:
+                after = f.read()
+            assert after.startswith(before) and len(after) > len(before), "CSV should be appended, not rewritten"
+            assert _same_draws(pd.read_csv(path, dtype={'issue': str}), site[game_type]), "CSV on disk differs from site history"
+            assert len(dl.load_history(game_type)) == len(site[game_type])
+
+            # Nothing new: no rewrite, one small request, store and memo kept
+            history = dl.load_history(game_type)
+            version = DrawHistory.read_meta(dl.get_history_dir(game_type))["version"]
+            df = dl.update_data(game_type)
+            with open(path, "rb") as f:
+                assert f.read() == after, "Up-to-date CSV should not change"
+            assert server.requests[-1] == (game_type, 30)
+            assert DrawHistory.read_meta(dl.get_history_dir(game_type))["version"] == version, "Up-to-date poll rewrote the store"
+            assert dl.load_history(game_type) is history, "Up-to-date poll dropped the memo"
+
+            # A window starting right after the newest local issue is not a gap
+            site[game_type].iloc[:-30].to_csv(path, index=False)
+            df = dl.update_data(game_type)
+            assert server.requests[-1] == (game_type, 30) and _same_draws(df, site[game_type])
+            print(f"  {game_type.value}: appended 5 draws, then 30 without a full fetch")
+    print("✅ Incremental Update Passed")
+
+def test_gap_falls_back_to_full():
+    print("\nTesting Gap Fallback...")
+    site = _site_histories()
+    with StandInServer() as server, tempfile.TemporaryDirectory() as tmp:
+        dl = DataLoader(tmp, fetcher=LotteryFetcher(base_url=server.base_url))
+        for game_type in GameType:
+            site[game_type].iloc[:-100].to_csv(dl.get_data_path(game_type), index=False)
+            df = dl.update_data(game_type)
+            assert server.requests[-2:] == [(game_type, 30), (game_type, 100000)], f"Expected incremental then full request, got {server.requests[-2:]}"
+            assert _same_draws(df, site[game_type]), "Full fetch should return the site history"
+            print(f"  {game_type.value}: gap of 100 draws -> full fetch")
+    print("✅ Gap Fallback Passed")
+
+def test_year_rollover():
+    print("\nTesting Issue Numbers across New Year...")
+    for game_type, df in _site_histories().items():
+        first = df.index[df['issue'].str.endswith("001")][0]
+        # The local history ends with the year's last draw: 001 continues it
+        assert window_continues(game_type, df.iloc[:first], df.iloc[first:])
+        # One draw of the old year is missing: a gap
+        assert not window_continues(game_type, df.iloc[:first - 1], df.iloc[first:])
+        # Without a date the rollover can't be checked: treated as a gap
+        assert not window_continues(game_type, df.iloc[:first].drop(columns='date'), df.iloc[first:])
+        print(f"  {game_type.value}: {df['issue'].iloc[first - 1]} -> {df['issue'].iloc[first]}")
+    print("✅ Issue Numbers across New Year Passed")
+
+def test_conditional_get():
+    print("\nTesting Conditional GET...")
+    site = _site_histories()
+    with StandInServer() as server:
+        fetcher = LotteryFetcher(base_url=server.base_url)
+        for game_type in GameType:
+            server.hidden[game_type] = 1
+            first = fetcher.fetch_data(game_type, limit=30)
+            second = fetcher.fetch_data(game_type, limit=30)
+            assert server.statuses[-2:] == [200, 304], f"Expected 200 then 304, got {server.statuses[-2:]}"
+            assert first.equals(second), "304 should return the previously parsed table"
+
+            # The page changes: a new draw arrives
+            server.hidden[game_type] = 0
+            third = fetcher.fetch_data(game_type, limit=30)
+            assert server.statuses[-1] == 200 and third['issue'].iloc[-1] == site[game_type]['issue'].iloc[-1]
+            print(f"  {game_type.value}: unchanged page -> 304")
+    print("✅ Conditional GET Passed")
+
+def test_retry_backoff():
+    print("\nTesting Retry with Backoff...")
+    site = _site_histories()
+    with StandInServer() as server:
+        fetcher = LotteryFetcher(base_url=server.base_url, retries=3, backoff=0.01)
+        server.fail_next = 2
+        df = fetcher.fetch_data(GameType.SSQ, limit=30)
+        assert server.statuses == [503, 503, 200], f"Expected two retries, got {server.statuses}"
+        assert len(df) == 30
+
+        server.fail_next = 10
+        try:
+            fetcher.fetch_data(GameType.SSQ, limit=30)
+            raise AssertionError("Persistent 503 should raise")
+        except Exception as e:
+            assert "503" in str(e), f"Unexpected error: {e}"
+        assert server.statuses[3:] == [503] * 4, "Should give up after retries + 1 attempts"
+    print("✅ Retry with Backoff Passed")
+
+def test_concurrent_load_all():
+    print("\nTesting Concurrent Update...")
+    site = _site_histories()
+    with StandInServer(delay=0.5) as server, tempfile.TemporaryDirectory() as tmp:
+        dl = DataLoader(tmp, fetcher=LotteryFetcher(base_url=server.base_url))
+        for game_type in GameType:
+            site[game_type].iloc[:-5].to_csv(dl.get_data_path(game_type), index=False)
+
+        start = time.perf_counter()
+        frames = dl.load_all(list(GameType), force_update=True)
+        elapsed = time.perf_counter() - start
+        for game_type in GameType:
+            assert _same_draws(frames[game_type], site[game_type]), f"{game_type.value} history differs from site history"
+        assert elapsed < 0.5 * len(GameType), f"Fetches should overlap, took {elapsed:.2f}s"
+        print(f"  {len(GameType)} games updated in {elapsed:.2f}s (0.5s per request)")
+    print("✅ Concurrent Update Passed")
+
+def _load_store_version(data_dir: str, game_type: GameType) -> str:
+    history = DataLoader(data_dir).load_history(game_type)
+    return DrawHistory.read_meta(DataLoader(data_dir).get_history_dir(game_type))["version"], len(history)
+
+def test_concurrent_rebuild():
+    print("\nTesting Locked Cache Rebuild...")
+    site = _site_histories()
+    with tempfile.TemporaryDirectory() as tmp:
+        dl = DataLoader(tmp)
+        for game_type in GameType:
+            site[game_type].to_csv(dl.get_data_path(game_type), index=False)
+        # Two processes find the store missing at once: one builds, the other waits and reuses it
+        with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("spawn")) as pool:
+            results = list(pool.map(_load_store_version, [tmp] * 4, [GameType.SSQ, GameType.SSQ, GameType.DLT, GameType.DLT]))
+        assert results[0] == results[1] and results[2] == results[3], f"Store built more than once: {results}"
+        assert not [e for e in os.listdir(tmp) if e.endswith(".tmp")]
+        print(f"  ssq and dlt built once each by 2 processes")
+    print("✅ Locked Cache Rebuild Passed")
+
+def test_history_store_swap():
+    print("\nTesting Versioned History Store...")
+    df = _site_histories()[GameType.SSQ]
+    old, new = DrawHistory.from_frame(GameType.SSQ, df.iloc[:-50]), DrawHistory.from_frame(GameType.SSQ, df)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = os.path.join(tmp, "ssq_history")
+        old.save(store, source=[1, 2])
+        errors = []
+        stop = threading.Event()
+
+        def reader():
+            # Every load must be one whole version: its issues and balls agree
+            while not stop.is_set():
+                try:
+                    h = DrawHistory.load(store)
+                except Exception as e:
+                    errors.append(repr(e))
+                    continue
+                expected = new if len(h) == len(new) else old
+                if not ((h.issues == expected.issues).all() and (h.reds == expected.reds).all()):
+                    errors.append(len(h))
+                time.sleep(0.001)
+
+        threads = [threading.Thread(target=reader) for _ in range(2)]
+        for t in threads:
+            t.start()
+        for j in range(20):
+            (new if j % 2 == 0 else old).save(store, source=[j])
+            time.sleep(0.01)
+        stop.set()
+        for t in threads:
+            t.join()
+        assert not errors, f"Readers saw mixed versions: {errors[:5]}"
+        assert DrawHistory.read_meta(store)["source"] == [19] and len(DrawHistory.load(store)) == len(old)
+        versions = [e for e in os.listdir(store) if e.startswith("v")]
+        assert len(versions) == 2, f"Old versions should be pruned, found {versions}"
+        assert not [e for e in os.listdir(store) if e.endswith(".tmp")]
+        print(f"  20 swaps under 2 concurrent readers, {len(versions)} versions kept")
+    print("✅ Versioned History Store Passed")
+
+def test_benchmark_smoke():
+    print("\nTesting Benchmark Smoke Run...")
+    # With two repeats load_data_csv drops an existing history store, so a
+    # store layout change the benchmark doesn't know about shows up here
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "bench.json")
+        assert benchmark.main(["run", "--sizes", "300", "--bets", "2000", "--games", "ssq", "--repeat", "2", "--output", output]) == 0
+        with open(output) as f:
+            names = {r["name"] for r in json.load(f)["results"]}
+    assert {"load_data_csv", "load_data_cache", "load_data_memo", "run_backtest_100x10"} <= names, names
+    print("✅ Benchmark Smoke Run Passed")
+
+def test_parser_layout():
+    print("\nTesting Streaming Parser...")
+    site = _site_histories()
+    for game_type in GameType:
+        with open(os.path.join(FIXTURE_DIR, f"{game_type.value}_history.html"), "rb") as f:
+            history = parse_history_page(f.read(), game_type)
+        assert history.issues.dtype.name == "int32" and history.reds.dtype.name == "int8"
+        assert _same_draws(history.to_frame(), site[game_type]), "Parsed page differs from site history"
+        print(f"  {game_type.value}: {len(history)} draws")
+
+    # Columns found from the header, not fixed positions: date first, an extra
+    # grouped column, commented-out cells and a footer row
+    page = """<table><tr><th>开奖日期</th><th>期号</th><th colspan="3">销售</th><th colspan="7">中奖号码</th></tr>
+<tr><!--<td>x</td>--><td>2024-01-02</td><td>24001</td><td>1</td><td>2</td><td>3</td>
+<td>01</td><td>05</td><td>09</td><td>13</td><td>20</td><td>33</td><td>16</td></tr>
+<tr><td colspan="12">合计</td></tr></table>"""
+    df = parse_history_page(page.encode("utf-8"), GameType.SSQ).to_frame()
+    assert df.to_dict("records") == [{'issue': '24001', 'red1': 1, 'red2': 5, 'red3': 9, 'red4': 13, 'red5': 20, 'red6': 33, 'blue': 16, 'date': '2024-01-02'}], df.to_dict("records")
+
+    # <td> header cells after a search form, a GB2312 page, and a row with an
+    # out-of-range ball (skipped)
+    page = """<html><head><meta http-equiv="Content-Type" content="text/html; charset=gb2312" /></head><body>
+<table><tr><td>期号</td><td><input name="start"></td></tr></table>
+<table><tr class="th"><td rowspan="2">期号</td><td colspan="7" rowspan="2">中奖号码</td><td rowspan="2">开奖日期</td></tr>
+<tr><td>24002</td><td>02</td><td>06</td><td>10</td><td>14</td><td>21</td><td>34</td><td>16</td><td>2024-01-04</td></tr>
+<tr><td>24001</td><td>01</td><td>05</td><td>09</td><td>13</td><td>20</td><td>33</td><td>16</td><td>2024-01-02</td></tr>
+</table></body></html>"""
+    df = parse_history_page(page.encode("gb2312"), GameType.SSQ).to_frame()
+    assert list(df['issue']) == ['24001'] and list(df['date']) == ['2024-01-02'], df.to_dict("records")
+
+    try:
+        parse_history_page(b"<html><body><p>maintenance</p></body></html>", GameType.SSQ)
+        raise AssertionError("A page without the draw table should raise")
+    except ValueError:
+        pass
+    print("✅ Streaming Parser Passed")
+
+if __name__ == "__main__":
+    try:
+        test_incremental_append()
+        test_gap_falls_back_to_full()
+        test_year_rollover()
+        test_conditional_get()
+        test_retry_backoff()
+        test_concurrent_load_all()
+        test_concurrent_rebuild()
+        test_history_store_swap()
+        test_benchmark_smoke()
+        test_parser_layout()
+        print("\n🎉 All Verification Tests Passed!")
+    except Exception as e:
+        print(f"\n❌ Test Failed: {e}")
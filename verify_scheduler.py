@@ -0,0 +1,127 @@
+import tempfile
+import os
+from datetime import datetime, timedelta
+import pandas as pd
+import scheduler
+from scheduler import DrawScheduler, JOB_DELAY, MAX_ATTEMPTS, LEDGER_FORMAT
+from core.db import Database
+from core.draw_calendar import next_draw_time, draw_times_between, DRAW_SCHEDULE
+from core.lottery import GameType
+from core.storage import Storage
+from core.analysis import Predictor
+from core.snapshot import save_snapshot, load_snapshot, load_features
+from core.recommend import daily_seed, recommendation_days, pregenerate_daily_recommendations, DEFAULT_COUNT
+
+class FixedLoader:
+    """Serves the local history, with the newest draw re-dated to `latest_date`."""
+    def __init__(self):
+        self.latest_date = None
+        self.calls = 0
+
+    def load_data(self, game_type, force_update=False):
+        self.calls += 1
+        df = pd.read_csv(os.path.join("data", f"{game_type.value}_history.csv"), dtype={'issue': str})
+        df.loc[df.index[-1], 'date'] = self.latest_date
+        return df
+
+def test_draw_calendar():
+    print("Testing Draw Calendar...")
+    start = datetime(2024, 3, 4, 0, 7)
+    for game_type, (days, draw_time) in DRAW_SCHEDULE.items():
+        now = start
+        while now < start + timedelta(days=14):
+            draw = next_draw_time(game_type, now)
+            assert draw > now and draw.weekday() in days and draw.strftime("%H:%M") == draw_time
+            assert draw - now <= timedelta(days=3), f"{game_type.value}: draw {draw} too far from {now}"
+            now += timedelta(minutes=97)
+        draws = draw_times_between(game_type, start, start + timedelta(days=14))
+        assert len(draws) == 6 and draws == sorted(draws)
+        print(f"  {game_type.value}: {[d.strftime('%a %H:%M') for d in draws[:3]]}")
+    print("✅ Draw Calendar Passed")
+
+def test_catch_up_and_ledger():
+    print("\nTesting Catch-up and Job Ledger...")
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = Storage(Database(os.path.join(tmp, "ledger.db")))
+        loader = FixedLoader()
+        sched = DrawScheduler([GameType.SSQ], storage=storage, loader=loader)
+
+        # Down for a week: every missed draw is settled by one job for the latest
+        now = datetime.now()
+        run_at, draw, covered = sched.plan(GameType.SSQ, now)
+        assert run_at == now and len(covered) >= 2 and draw == covered[-1]
+        loader.latest_date = draw.strftime("%Y-%m-%d")
+        assert sched.run_job(GameType.SSQ, draw, covered)
+        for d in covered:
+            assert storage.db.get_job("ssq", d.strftime(LEDGER_FORMAT))['status'] == 'done'
+        print(f"  caught up {len(covered)} missed draws with 1 job")
+
+        # Nothing is redone: the next job is the next draw
+        run_at, upcoming, covered = sched.plan(GameType.SSQ, now)
+        assert upcoming > draw and run_at == upcoming + JOB_DELAY and run_at > now
+
+        # Data not published yet: retry, then give up after MAX_ATTEMPTS
+        later = upcoming + JOB_DELAY
+        loader.latest_date = draw.strftime("%Y-%m-%d")
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            _, target, covered = sched.plan(GameType.SSQ, later)
+            assert target == upcoming
+            assert not sched.run_job(GameType.SSQ, target, covered)
+            job = storage.db.get_job("ssq", upcoming.strftime(LEDGER_FORMAT))
+            assert job['attempts'] == attempt
+        assert job['status'] == 'failed'
+        _, target, _ = sched.plan(GameType.SSQ, later)
+        assert target > upcoming, "A failed draw should not be retried forever"
+        print(f"  unpublished draw retried {MAX_ATTEMPTS} times, then skipped")
+        storage.db.close()
+    print("✅ Catch-up and Job Ledger Passed")
+
+def test_pregenerated_recommendations():
+    print("\nTesting Pre-generated Recommendations...")
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "recs.db"))
+        df = FixedLoader().load_data(GameType.SSQ)
+        df = df.iloc[:-1] # keep the CSV's own last date
+        db.save_daily_recommendation("carol", "2000-01-01", "ssq", [])
+        db.add_bet({'id': 'b1', 'user_id': 'alice', 'game_type': 'ssq', 'issue': '1', 'reds': [1, 2, 3, 4, 5, 6], 'blues': [7], 'note': ''})
+        since = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+        assert db.get_active_users(since) == ["alice", "carol"]
+
+        # Covers every day up to the next draw, including non-draw days
+        now = datetime(2024, 3, 6, 22, 0) # Wed after the DLT draw; next SSQ draw is Thu
+        assert [d.day for d in recommendation_days(GameType.SSQ, now)] == [6, 7]
+        assert len(recommendation_days(GameType.SSQ, datetime(2024, 3, 7, 22, 0))) == 4 # Thu night -> Sun
+
+        # Page extended bob's row: it must not be overwritten
+        today = datetime.now()
+        date_str = today.strftime("%Y-%m-%d")
+        db.save_daily_recommendation("bob", date_str, "ssq", [[[1, 2, 3, 4, 5, 6], [7]]])
+        n = pregenerate_daily_recommendations(db, GameType.SSQ, df, days=[today], user_ids=["alice", "bob", "carol"])
+        assert n == 2
+        assert db.get_daily_recommendation("bob", date_str, "ssq") == [[[1, 2, 3, 4, 5, 6], [7]]]
+
+        # Same tickets as generating on demand, and a prefix for smaller counts
+        for user in ("alice", "carol"):
+            stored = db.get_daily_recommendation(user, date_str, "ssq")
+            on_demand = Predictor.predict_many(GameType.SSQ, df, DEFAULT_COUNT, seed_base=daily_seed(user))
+            assert stored == [[list(r), list(b)] for r, b in on_demand], f"{user}: pre-generated tickets differ from on-demand ones"
+            assert Predictor.predict_many(GameType.SSQ, df, 3, seed_base=daily_seed(user)) == on_demand[:3]
+
+        assert pregenerate_daily_recommendations(db, GameType.SSQ, df, days=[today], user_ids=["alice"]) == 0
+
+        # The snapshot holds only what its readers use, and restores the same features
+        save_snapshot(db, GameType.SSQ, df)
+        assert set(load_snapshot(db, GameType.SSQ, df)) == {"features", "kill_reds"}
+        assert Predictor.predict_many(GameType.SSQ, df, 5, seed_base=1, features=load_features(db, GameType.SSQ, df)) == \
+               Predictor.predict_many(GameType.SSQ, df, 5, seed_base=1)
+        db.close()
+    print("✅ Pre-generated Recommendations Passed")
+
+if __name__ == "__main__":
+    try:
+        test_draw_calendar()
+        test_catch_up_and_ledger()
+        test_pregenerated_recommendations()
+        print("\n🎉 All Verification Tests Passed!")
+    except Exception as e:
+        print(f"\n❌ Test Failed: {e}")
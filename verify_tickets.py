@@ -0,0 +1,197 @@
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import Counter
+from dataclasses import FrozenInstanceError
+from itertools import combinations
+import pandas as pd
+from core.db import Database, BET_TICKET_COLUMNS
+from core.lottery import GameType, get_config
+from core.prize import PrizeCalculator, PrizeResult
+from core.storage import Storage
+from core.tickets import bet_count, ticket_cost, classify_ticket, SINGLE, COMPOUND, BANKER
+
+def expand(game_type, reds, blues, red_bankers=(), blue_bankers=()):
+    """Every single bet of a ticket (the slow way)."""
+    config = get_config(game_type)
+    red_drags = [r for r in reds if r not in red_bankers]
+    blue_drags = [b for b in blues if b not in blue_bankers]
+    for rs in combinations(red_drags, config.red_count - len(red_bankers)):
+        for bs in combinations(blue_drags, config.blue_count - len(blue_bankers)):
+            yield set(red_bankers) | set(rs), set(blue_bankers) | set(bs)
+
+def brute_force(game_type, draw_reds, draw_blues, reds, blues, red_bankers=(), blue_bankers=()):
+    total, levels = 0, Counter()
+    for rs, bs in expand(game_type, reds, blues, red_bankers, blue_bankers):
+        prize = PrizeCalculator.calculate(game_type, len(rs & draw_reds), len(bs & draw_blues))
+        if prize.amount:
+            total += prize.amount
+            levels[prize.level] += 1
+    return total, levels
+
+def test_prize_lookup():
+    print("Testing Prize Lookup Tables...")
+    for game_type, rule in [(GameType.SSQ, PrizeCalculator.calc_ssq), (GameType.DLT, PrizeCalculator.calc_dlt)]:
+        config = get_config(game_type)
+        for r in range(config.red_count + 1):
+            for b in range(config.blue_count + 1):
+                assert PrizeCalculator.calculate(game_type, r, b) == rule(r, b)
+        # Outside the table: no prize, as with the rule chains' fallback
+        for r, b in [(-1, 0), (0, -1), (config.red_count + 1, 0), (0, config.blue_count + 1)]:
+            assert PrizeCalculator.calculate(game_type, r, b) == PrizeResult("未中奖", 0, "未达标")
+        try:
+            PrizeCalculator.calculate(game_type, config.red_count, config.blue_count).amount = 1
+            raise AssertionError("shared PrizeResult is mutable")
+        except FrozenInstanceError:
+            pass
+        assert PrizeCalculator.calculate(game_type, config.red_count, config.blue_count).amount == 10000000
+
+        amounts, _ = PrizeCalculator.calculate_many(game_type, [config.red_count, 0], [config.blue_count, 0])
+        assert amounts.tolist() == [10000000, 0]
+        for bad in ([-1], [config.red_count + 1]):
+            try:
+                PrizeCalculator.calculate_many(game_type, bad, [0])
+                raise AssertionError(f"calculate_many accepted {bad}")
+            except ValueError:
+                pass
+    print("✅ Prize Lookup Tables Passed")
+
+def test_bet_count_and_cost():
+    print("Testing Bet Count and Cost...")
+    assert bet_count(GameType.SSQ, 6, 1) == 1 and ticket_cost(GameType.SSQ, 6, 1) == 2
+    assert bet_count(GameType.SSQ, 10, 3) == 630
+    assert bet_count(GameType.SSQ, 20, 1) == 38760
+    assert bet_count(GameType.SSQ, 9, 2, red_bankers=2) == 35 * 2 # C(7,4) * C(2,1)
+    assert bet_count(GameType.DLT, 7, 4, red_bankers=1, blue_bankers=1) == 15 * 3
+    assert classify_ticket(GameType.SSQ, [1, 2, 3, 4, 5, 6], [1]) == SINGLE
+    assert classify_ticket(GameType.SSQ, [1, 2, 3, 4, 5, 6], [1, 2]) == COMPOUND
+    assert classify_ticket(GameType.SSQ, list(range(1, 9)), [1], red_bankers=[1, 2]) == BANKER
+    for bad in (([1, 2, 3, 4, 5], [1], [], []),              # too few reds
+                ([1, 2, 3, 4, 5, 34], [1], [], []),          # out of range
+                ([1, 2, 3, 4, 5, 6, 7], [1], [9], []),       # banker not selected
+                ([1, 2, 3, 4, 5, 6, 7], [1], [1, 2, 3, 4, 5, 6], []), # too many bankers
+                ([1, 2, 3, 4, 5, 6], [1], [1], [])):         # no choice left
+        try:
+            classify_ticket(GameType.SSQ, *bad)
+        except ValueError:
+            continue
+        raise AssertionError(f"{bad} should be rejected")
+    print("✅ Bet Count and Cost Passed")
+
+def test_combinatorial_prizes():
+    print("\nTesting Combinatorial Prizes vs Expansion...")
+    rng = random.Random(7)
+    checked = 0
+    for game_type in (GameType.SSQ, GameType.DLT):
+        config = get_config(game_type)
+        red_pool = range(config.red_range[0], config.red_range[1] + 1)
+        blue_pool = range(config.blue_range[0], config.blue_range[1] + 1)
+        for _ in range(300):
+            draw_reds = set(rng.sample(red_pool, config.red_count))
+            draw_blues = set(rng.sample(blue_pool, config.blue_count))
+            # Bias the ticket towards the draw so higher tiers show up
+            n_reds = rng.randint(config.red_count, config.red_count + 5)
+            n_blues = rng.randint(config.blue_count, config.blue_count + 2)
+            reds = sorted(set(rng.sample(sorted(draw_reds), rng.randint(0, config.red_count))) |
+                          set(rng.sample(red_pool, n_reds)))[:n_reds]
+            while len(reds) < n_reds:
+                reds = sorted(set(reds) | {rng.choice(red_pool)})
+            blues = sorted(set(rng.sample(blue_pool, n_blues)))
+            red_bankers = rng.sample(reds, rng.randint(0, min(config.red_count - 1, len(reds) - config.red_count - 1))) if len(reds) > config.red_count + 1 else []
+            blue_bankers = rng.sample(blues, 1) if config.blue_count > 1 and len(blues) > config.blue_count + 1 and rng.random() < 0.5 else []
+
+            expected = brute_force(game_type, draw_reds, draw_blues, reds, blues, red_bankers, blue_bankers)
+            got = PrizeCalculator.calculate_ticket(
+                game_type, len(set(reds) & draw_reds), len(set(blues) & draw_blues), len(reds), len(blues),
+                len(red_bankers), len(set(red_bankers) & draw_reds), len(blue_bankers), len(set(blue_bankers) & draw_blues))
+            assert got == expected, f"{game_type.value} {reds}+{blues} bankers {red_bankers}/{blue_bankers}: {got} != {expected}"
+            checked += 1
+    print(f"  {checked} random compound/banker tickets match their expansion")
+
+    # A 20-red compound ticket (38,760 bets) prices in microseconds
+    start = time.perf_counter()
+    for _ in range(1000):
+        total, levels = PrizeCalculator.calculate_ticket(GameType.SSQ, 6, 1, 20, 1)
+    per_ticket = (time.perf_counter() - start) / 1000
+    assert levels["一等奖"] == 1 and levels["二等奖"] == 0 and sum(levels.values()) == bet_count(GameType.SSQ, 20, 1)
+    print(f"  20-red ticket: {per_ticket * 1e6:.1f} us, {sum(levels.values())} winning bets, {total} 元")
+    assert per_ticket < 1e-3
+    print("✅ Combinatorial Prizes Passed")
+
+def test_verify_multi_bets():
+    print("\nTesting Verification of Compound and Banker Bets...")
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = Storage(Database(os.path.join(tmp, "tickets.db")))
+        df = pd.read_csv(os.path.join("data", "ssq_history.csv"), dtype={'issue': str})
+        last = df.iloc[-1]
+        draw_reds = [int(last[f'red{i}']) for i in range(1, 7)]
+        draw_blue = int(last['blue'])
+        others = [n for n in range(1, 34) if n not in draw_reds]
+
+        storage.save_bet(GameType.SSQ, last['issue'], draw_reds, [draw_blue], user_id="u")
+        compound_reds = sorted(draw_reds[:5] + others[:5])
+        storage.save_bet(GameType.SSQ, last['issue'], compound_reds, [draw_blue, draw_blue % 16 + 1], user_id="u")
+        banker_reds = sorted(draw_reds[:4] + others[:4])
+        storage.save_bet(GameType.SSQ, last['issue'], banker_reds, [draw_blue], user_id="u", red_bankers=draw_reds[:2])
+
+        levels = storage.verify_pending_bets(GameType.SSQ, df)
+        bets = {b['bet_type']: b for b in storage.db.get_bets(user_id="u")}
+        assert bets[SINGLE]['win_amount'] == 10000000 and bets[SINGLE]['prize_detail'] is None
+        for bet_type, reds, blues, bankers in ((COMPOUND, compound_reds, [draw_blue, draw_blue % 16 + 1], []),
+                                               (BANKER, banker_reds, [draw_blue], draw_reds[:2])):
+            bet = bets[bet_type]
+            total, won = brute_force(GameType.SSQ, set(draw_reds), {draw_blue}, reds, blues, bankers)
+            assert bet['win_amount'] == total and bet['prize_detail'] == dict(won)
+            assert bet['bet_count'] == bet_count(GameType.SSQ, len(reds), len(blues), len(bankers))
+            assert bet['cost'] == 2 * bet['bet_count']
+            print(f"  {bet_type}: {bet['bet_count']} 注, {bet['prize_level']}, {bet['win_amount']} 元 {bet['prize_detail']}")
+        assert bets[COMPOUND]['prize_level'] == "三等奖"
+        assert sum(levels.values()) == 3
+        storage.db.close()
+    print("✅ Verification of Compound and Banker Bets Passed")
+
+def test_concurrent_migration():
+    print("\nTesting Concurrent Schema Migration...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "old.db")
+        old = sqlite3.connect(path, isolation_level=None)
+        old.execute("PRAGMA journal_mode=WAL")
+        old.execute("CREATE TABLE bets (id TEXT PRIMARY KEY, user_id TEXT NOT NULL, game_type TEXT NOT NULL, issue TEXT NOT NULL, "
+                    "reds TEXT NOT NULL, blues TEXT NOT NULL, status TEXT DEFAULT 'pending', prize_level TEXT, "
+                    "win_amount INTEGER DEFAULT 0, note TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
+        # Another process is migrating: columns added but not committed yet
+        old.execute("BEGIN IMMEDIATE")
+        for name, decl in BET_TICKET_COLUMNS:
+            old.execute(f"ALTER TABLE bets ADD COLUMN {name} {decl}")
+        errors = []
+
+        def open_db():
+            try:
+                Database(path)
+            except Exception as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=open_db)
+        thread.start()
+        time.sleep(0.5) # the new connection has seen the old columns and waits for the lock
+        old.execute("COMMIT")
+        thread.join()
+        assert not errors, f"Second migration failed: {errors}"
+        columns = [row[1] for row in old.execute("PRAGMA table_info(bets)")]
+        assert all(columns.count(name) == 1 for name, _ in BET_TICKET_COLUMNS)
+        old.close()
+    print("✅ Concurrent Schema Migration Passed")
+
+if __name__ == "__main__":
+    try:
+        test_prize_lookup()
+        test_bet_count_and_cost()
+        test_combinatorial_prizes()
+        test_verify_multi_bets()
+        test_concurrent_migration()
+        print("\n🎉 All Verification Tests Passed!")
+    except Exception as e:
+        print(f"\n❌ Test Failed: {e}")
@@ -0,0 +1,89 @@
+import os
+import tempfile
+import time
+from itertools import combinations
+from core.db import Database
+from core.lottery import GameType, get_config
+from core.storage import Storage
+from core.wheel import covering_design, is_covering, feasible, get_wheel, wheel_tickets, wheel_path
+
+def test_covering_designs():
+    print("Testing Covering Designs...")
+    for n, t, k, m in [(8, 6, 5, 6), (10, 6, 5, 6), (12, 6, 4, 4), (10, 5, 4, 5), (9, 5, 3, 3), (7, 6, 6, 6)]:
+        design = covering_design(n, t, k, m)
+        assert design.shape[1] == t and len({tuple(row) for row in design.tolist()}) == len(design)
+        assert is_covering(design, n, k, m), f"{n} {k}-if-{m} not covered"
+        # Brute-force check on the small ones
+        if n <= 10:
+            for drawn in combinations(range(n), m):
+                assert any(len(set(drawn) & set(row)) >= k for row in design.tolist())
+        print(f"  n={n} t={t} {k}-if-{m}: {len(design)} tickets")
+    assert len(covering_design(7, 6, 6, 6)) == 7 # the full compound ticket
+    assert len(covering_design(8, 6, 5, 6)) <= 5
+    print("✅ Covering Designs Passed")
+
+def test_n20_wheels():
+    print("\nTesting n=20 Wheels...")
+    for t, k, m in [(6, 5, 6), (6, 4, 4), (5, 4, 5)]:
+        start = time.perf_counter()
+        design = covering_design(20, t, k, m)
+        elapsed = time.perf_counter() - start
+        assert is_covering(design, 20, k, m)
+        print(f"  n=20 t={t} {k}-if-{m}: {len(design)} tickets in {elapsed:.2f}s")
+        assert elapsed < 30
+    # The wheel tab only offers feasible guarantees; the rest are refused up front
+    too_large = [(k, m) for m in range(6, 2, -1) for k in range(m, 2, -1) if not feasible(20, 6, k, m)]
+    assert too_large == [(4, 6), (3, 6), (3, 5)], too_large
+    for k, m in too_large:
+        try:
+            covering_design(20, 6, k, m)
+            assert False, f"{k}-if-{m} should be refused"
+        except ValueError as e:
+            assert "too large" in str(e)
+    assert all(feasible(20, 5, k, m) for m in range(5, 2, -1) for k in range(m, 2, -1))
+    print(f"  n=20 t=6 refused: {too_large}")
+    print("✅ n=20 Wheels Passed")
+
+def test_cache_and_export():
+    print("\nTesting Wheel Cache and Export...")
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_dir = os.path.join(tmp, "wheels")
+        wheel = get_wheel(GameType.SSQ, 12, 5, 6, cache_dir)
+        assert os.path.exists(wheel_path(6, 12, 5, 6, cache_dir))
+        start = time.perf_counter()
+        assert get_wheel(GameType.SSQ, 12, 5, 6, cache_dir) == wheel
+        print(f"  cached read: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+        reds = [2, 5, 7, 11, 13, 17, 19, 23, 26, 29, 31, 33]
+        tickets = wheel_tickets(GameType.SSQ, reds, 5, 6, cache_dir)
+        assert len(tickets) == len(wheel) and all(len(t) == 6 and set(t) <= set(reds) for t in tickets)
+
+        storage = Storage(Database(os.path.join(tmp, "wheel.db")))
+        saved = storage.save_bets(GameType.SSQ, "2099001", [(t, [3, 9]) for t in tickets], "旋转矩阵", user_id="w")
+        bets = storage.db.get_bets(user_id="w")
+        assert saved == len(bets) == len(tickets)
+        assert all(b['bet_type'] == 'compound' and b['bet_count'] == 2 and b['cost'] == 4 for b in bets)
+        print(f"  exported {saved} tickets ({sum(b['cost'] for b in bets)} 元)")
+
+        # One invalid ticket: nothing is saved
+        try:
+            storage.save_bets(GameType.SSQ, "2099001", [(tickets[0], [3]), ([1, 2, 3], [3])], user_id="w")
+            raise AssertionError("invalid ticket accepted")
+        except ValueError:
+            pass
+        assert len(storage.db.get_bets(user_id="w")) == saved
+
+        # DLT tickets have 5 reds
+        dlt_tickets = wheel_tickets(GameType.DLT, list(range(1, 11)), 4, 5, cache_dir)
+        assert all(len(t) == get_config(GameType.DLT).red_count for t in dlt_tickets)
+        storage.db.close()
+    print("✅ Wheel Cache and Export Passed")
+
+if __name__ == "__main__":
+    try:
+        test_covering_designs()
+        test_n20_wheels()
+        test_cache_and_export()
+        print("\n🎉 All Verification Tests Passed!")
+    except Exception as e:
+        print(f"\n❌ Test Failed: {e}")